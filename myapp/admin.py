@@ -1,6 +1,129 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
-from .models import Treasurer, Fund, Transaction
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from . import balances
+from .corrections import CorrectionError, refresh_fund_labels, reverse_transactions
+from .models import AuditEntry, Treasurer, Fund, Transaction, TransactionSplit
+from .treasurers import apply_action
+
+
+# --- LARGE CHANGELIST SUPPORT ---
+
+def estimated_row_count(model, using):
+    """The planner's row estimate for model's table, or None where the backend has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql, params = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table]
+    elif connection.vendor == 'sqlite':
+        # Only present once ANALYZE has run; the first number of a stat row is the table size
+        sql, params = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs a COUNT(*) over a whole large table.
+
+    Unfiltered lists use the table estimate once it passes
+    ADMIN_EXACT_COUNT_LIMIT. Filtered lists are counted exactly: the count
+    decides which pages can be reached and the "select all" total, and
+    the filters keep it to the matching rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return queryset.count()
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Foreign key filter backed by the admin autocomplete view.
+
+    The stock related filter renders a link for every row of the related
+    table; this renders a single select2 box that searches the related
+    model's admin (which needs search_fields) as you type.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.form_field = self.build_form_field(field, model_admin.admin_site)
+
+    @staticmethod
+    def build_form_field(field, admin_site):
+        return forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, admin_site),
+            required=False,
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        try:
+            value = self.field.target_field.to_python(self.lookup_val)
+        except ValidationError:
+            value = None
+        query_string = changelist.get_query_string(remove=[self.lookup_kwarg])
+        widget = self.form_field.widget.render(self.lookup_kwarg, value, attrs={
+            'id': f"filter_{self.field_path}",
+            'class': 'autocomplete-filter',
+            'style': 'width: 100%',
+            'data-lookup-kwarg': self.lookup_kwarg,
+            'data-query-string': query_string,
+        })
+        yield {
+            'selected': value is None,
+            'query_string': query_string,
+            'display': 'All',
+            'widget': widget,
+        }
+
+
+class AutocompleteFilterAdmin(admin.ModelAdmin):
+    """Adds the select2 assets needed by any AutocompleteFilter in list_filter."""
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, tuple) and list_filter[1] is AutocompleteFilter:
+                field = self.model._meta.get_field(list_filter[0])
+                media += AutocompleteFilter.build_form_field(field, self.admin_site).widget.media
+                media += forms.Media(js=['javascript/admin_autocomplete_filter.js'])
+        return media
+
+
+class LedgerAdmin(AutocompleteFilterAdmin):
+    """Changelist settings for the append-heavy ledger tables."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 # --- Treasurer Admin ---
 @admin.register(Treasurer)
@@ -27,6 +150,7 @@ class TreasurerAdmin(UserAdmin):
     search_fields = ('username', 'email', 'first_name', 'last_name', 'church_branch')
     ordering = ('-date_created',)
     readonly_fields = ('date_created',)
+    actions = ('approve_selected', 'disable_selected', 'enable_selected')
 
     # --- Re-defining the FIELDSETS for editing existing users ---
     fieldsets = (
@@ -48,27 +172,151 @@ class TreasurerAdmin(UserAdmin):
         }),
     )
 
+    # --- Bulk status actions (one UPDATE each, see myapp/treasurers.py) ---
+    @admin.action(description='Approve selected treasurers', permissions=['change'])
+    def approve_selected(self, request, queryset):
+        changed = apply_action(request.user, queryset, 'approve')
+        self.message_user(request, f"Approved {changed} treasurer(s).", messages.SUCCESS)
+
+    @admin.action(description='Disable selected treasurers', permissions=['change'])
+    def disable_selected(self, request, queryset):
+        changed = apply_action(request.user, queryset, 'disable')
+        self.message_user(request, f"Disabled {changed} treasurer(s).", messages.SUCCESS)
+
+    @admin.action(description='Enable selected treasurers', permissions=['change'])
+    def enable_selected(self, request, queryset):
+        changed = apply_action(request.user, queryset, 'enable')
+        self.message_user(request, f"Enabled {changed} treasurer(s).", messages.SUCCESS)
+
 
 # --- Fund Admin ---
 @admin.register(Fund)
-class FundAdmin(admin.ModelAdmin):
-    list_display = ('name', 'fund_type', 'current_balance', 'created_by', 'date_created')
-    list_filter = ('fund_type', 'created_by')
+class FundAdmin(AutocompleteFilterAdmin):
+    list_display = ('name', 'fund_type', 'balance', 'created_by', 'date_created')
+    list_filter = ('fund_type', ('created_by', AutocompleteFilter))
+    list_select_related = ('created_by',)
     search_fields = ('name', 'description')
-    readonly_fields = ('current_balance', 'date_created') 
+    readonly_fields = ('current_balance', 'balance', 'date_created') 
     ordering = ('fund_type', 'name')
 
+    def get_queryset(self, request):
+        return balances.with_balance(super().get_queryset(request))
+
+    @admin.display(description='Balance', ordering='balance')
+    def balance(self, obj):
+        # current_balance plus sharded deltas not yet compacted
+        return obj.balance
+
 
 # --- Transaction Admin ---
+class TransactionSplitInline(admin.TabularInline):
+    """Read-only: splits only change together with the fund balances they moved."""
+    model = TransactionSplit
+    fields = ('fund', 'amount_allocated')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('fund')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('transaction_type', 'fund', 'amount', 'created_by', 'transaction_date')
-    list_filter = ('transaction_type', 'fund', 'created_by')
-    search_fields = ('description', 'fund__name')
-    date_hierarchy = 'transaction_date' 
-    readonly_fields = ('transaction_date',)
+class TransactionAdmin(LedgerAdmin):
+    # fund_label is denormalized, so the fund column needs no join
+    list_display = ('transaction_type', 'fund_label', 'amount', 'split_count', 'created_by', 'transaction_date')
+    list_filter = (
+        'transaction_type',
+        ('fund', AutocompleteFilter),
+        ('created_by', AutocompleteFilter),
+        'transaction_date',
+    )
+    list_select_related = ('created_by',)
+    search_fields = ('description', 'fund_label')
+    readonly_fields = ('transaction_date', 'split_count', 'split_summary', 'fund_label')
     raw_id_fields = ('created_by',)
+    autocomplete_fields = ('fund',)
     ordering = ('-transaction_date',)
+    inlines = (TransactionSplitInline,)
+    actions = ('reverse_selected', 'refresh_labels')
+
+    def get_actions(self, request):
+        # Deleting through the admin does not reverse fund balances; reverse_selected does
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    # --- Set-based ledger actions (see myapp/corrections.py) ---
+    @admin.action(description='Delete selected transactions and reverse their balances', permissions=['delete'])
+    def reverse_selected(self, request, queryset):
+        try:
+            removed = reverse_transactions(request.user, queryset)
+        except CorrectionError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        self.message_user(request, f"Reversed {removed} transaction(s).", messages.SUCCESS)
+
+    @admin.action(description="Refresh fund labels from the funds' current names", permissions=['change'])
+    def refresh_labels(self, request, queryset):
+        changed = refresh_fund_labels(queryset)
+        self.message_user(request, f"Updated {changed} fund label(s).", messages.SUCCESS)
 
     def __str__(self):
-        return f"{self.get_transaction_type_display()} - ₱{self.amount}"
\ No newline at end of file
+        return f"{self.get_transaction_type_display()} - ₱{self.amount}"
+
+
+# --- Transaction Split Admin (read-only) ---
+@admin.register(TransactionSplit)
+class TransactionSplitAdmin(LedgerAdmin):
+    list_display = ('parent_transaction', 'fund', 'amount_allocated')
+    list_filter = (('fund', AutocompleteFilter),)
+    list_select_related = ('parent_transaction', 'fund')
+    raw_id_fields = ('parent_transaction',)
+    ordering = ('-parent_transaction',)
+    actions = ('reverse_parents',)
+
+    # An allocation can't be undone on its own (its parent's total would no
+    # longer add up), so this reverses the whole transactions it belongs to
+    @admin.action(description='Delete the transactions of selected allocations and reverse their balances')
+    def reverse_parents(self, request, queryset):
+        if not request.user.has_perm('myapp.delete_transaction'):
+            raise PermissionDenied
+        parents = Transaction.objects.filter(pk__in=queryset.values('parent_transaction'))
+        try:
+            removed = reverse_transactions(request.user, parents)
+        except CorrectionError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        self.message_user(request, f"Reversed {removed} transaction(s).", messages.SUCCESS)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# --- Audit Trail Admin (read-only) ---
+@admin.register(AuditEntry)
+class AuditEntryAdmin(LedgerAdmin):
+    list_display = ('created_at', 'actor_username', 'action', 'object_type', 'object_id')
+    list_filter = ('action', 'object_type', 'created_at')
+    search_fields = ('actor_username', 'object_id')
+    readonly_fields = ('actor', 'actor_username', 'action', 'object_type', 'object_id', 'before', 'after', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
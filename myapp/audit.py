@@ -0,0 +1,86 @@
+"""
+Buffered audit trail.
+
+`record()` only builds an AuditEntry in memory. The entry joins the current
+thread's buffer when its database transaction commits (so rolled-back writes
+leave no trace) and the buffer is written with a single bulk_create once the
+response has been sent (request_finished), keeping the INSERT off the write
+path. Outside a request (shell, management commands) entries are written as
+soon as they commit.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+
+from .models import AuditEntry
+
+logger = logging.getLogger(__name__)
+
+# Fields captured for transaction create/delete/undo entries
+TRANSACTION_FIELDS = ('transaction_type', 'amount', 'fund_id', 'fund_label', 'split_summary', 'description')
+
+_local = threading.local()
+
+
+def _buffer():
+    if not hasattr(_local, 'entries'):
+        _local.entries = []
+        _local.requests = 0
+    return _local
+
+
+def snapshot(instance, fields):
+    """{field: value} of `instance` for the before/after columns (files by name)."""
+    values = {}
+    for field in fields:
+        value = getattr(instance, field)
+        values[field] = (value.name or None) if isinstance(value, FieldFile) else value
+    return values
+
+
+def record(actor, action, object_type, object_id='', before=None, after=None):
+    """Queues an audit entry; it is only written if the surrounding transaction commits."""
+    if actor is not None and not getattr(actor, 'is_authenticated', False):
+        actor = None
+    entry = AuditEntry(
+        actor=actor,
+        actor_username=actor.username if actor else '',
+        action=action,
+        object_type=object_type,
+        object_id=str(object_id or ''),
+        before=before,
+        after=after,
+    )
+    transaction.on_commit(lambda: _buffered(entry))
+
+
+def _buffered(entry):
+    state = _buffer()
+    state.entries.append(entry)
+    if not state.requests or len(state.entries) >= settings.AUDIT_BUFFER_SIZE:
+        flush()
+
+
+def flush(**kwargs):
+    """Writes every buffered entry of this thread in one batch."""
+    state = _buffer()
+    entries, state.entries = state.entries, []
+    if not entries:
+        return
+    try:
+        AuditEntry.objects.bulk_create(entries, batch_size=settings.AUDIT_BUFFER_SIZE)
+    except Exception:
+        logger.exception("Failed to write %d audit entries", len(entries))
+
+
+def request_started(**kwargs):
+    _buffer().requests += 1
+
+
+def request_finished(**kwargs):
+    state = _buffer()
+    state.requests = max(state.requests - 1, 0)
+    flush()
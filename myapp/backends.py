@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+def user_cache_key(user_id):
+    return f"treasurer:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """Drops the cached Treasurer so the next request reloads it from the database."""
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_cached_users(user_ids):
+    """invalidate_cached_user() for many treasurers, in one cache round trip."""
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that serves the logged-in Treasurer from the shared cache.
+
+    AuthenticationMiddleware calls get_user() on every request, so caching it
+    removes the per-request Treasurer SELECT. Django still verifies the session
+    auth hash against the cached instance, so password changes log users out
+    as before. Entries are dropped by the Treasurer save/delete signals.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            # Always from the primary: request.user is often first read inside a
+            # use_replica view, and a lagging replica row would be cached for
+            # every request, including a just-disabled treasurer's
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.using(DEFAULT_DB_ALIAS).get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if not self.user_can_authenticate(user):
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,248 @@
+"""
+Online database backups and verified restores.
+
+SQLite is copied with the online backup API, BACKUP_PAGES_PER_STEP pages at a
+time with a BACKUP_STEP_SLEEP pause in between, so gunicorn workers only
+ever wait for one step. A write from another connection restarts the copy,
+so every snapshot is consistent. The snapshot is integrity-checked, then
+gzipped. Postgres is dumped with PG_DUMP (pg_dump, or any stand-in taking the
+same arguments).
+
+Every archive gets a JSON sidecar holding the SHA-256 of the archive and of
+its uncompressed contents. Restores refuse an archive whose checksums or
+integrity check fail. Only the newest BACKUP_KEEP archives per database are
+kept.
+
+A restore clears the shared cache afterwards. Balances, report totals, chart
+series, the fund registry stamp and logged-in treasurers are all cached from
+the old data, and running workers would keep serving them.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+CHUNK_SIZE = 1024 * 1024
+EXTENSIONS = {'sqlite': '.sqlite3.gz', 'postgresql': '.sql.gz'}
+
+
+class BackupError(Exception):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _check_vendor(connection):
+    if connection.vendor not in EXTENSIONS:
+        raise BackupError(f"Backups are not supported for the {connection.vendor} backend.")
+
+
+def sidecar(path):
+    return path + '.json'
+
+
+def archives(directory, alias):
+    """Archive paths of `alias` in `directory`, oldest first (names sort by time)."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith(f"{alias}-") and name.endswith(tuple(EXTENSIONS.values()))
+    )
+
+
+# --- SQLITE ---
+
+def _integrity_check(path):
+    with sqlite3.connect(path) as db:
+        result = db.execute('PRAGMA integrity_check').fetchone()[0]
+    db.close()
+    if result != 'ok':
+        raise BackupError(f"Integrity check failed: {result}")
+
+
+def _sqlite_snapshot(connection, path, pages, sleep, progress=None):
+    """Copies the live database into `path` step by step; returns the page count."""
+    connection.ensure_connection()
+    copied = {'pages': 0}
+
+    def step(status, remaining, total):
+        copied['pages'] = total
+        if progress:
+            progress(total - remaining, total)
+
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target, pages=pages, progress=step, sleep=sleep)
+    finally:
+        target.close()
+    _integrity_check(path)
+    return copied['pages']
+
+
+def _compress(source_path, archive_path):
+    with open(source_path, 'rb') as source, gzip.open(archive_path, 'wb', compresslevel=6) as archive:
+        shutil.copyfileobj(source, archive, CHUNK_SIZE)
+
+
+# --- POSTGRES ---
+
+def _pg_env(connection):
+    config = connection.settings_dict
+    env = dict(os.environ)
+    for key, value in (('PGHOST', 'HOST'), ('PGPORT', 'PORT'), ('PGUSER', 'USER'), ('PGPASSWORD', 'PASSWORD')):
+        if config.get(value):
+            env[key] = str(config[value])
+    return env
+
+
+def _pg_dump(connection, archive_path):
+    command = [settings.PG_DUMP, '--no-owner', '--no-privileges', '--clean', '--if-exists',
+               '--dbname', connection.settings_dict['NAME']]
+    with gzip.open(archive_path, 'wb', compresslevel=6) as archive:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=_pg_env(connection))
+        shutil.copyfileobj(process.stdout, archive, CHUNK_SIZE)
+        _, errors = process.communicate()
+    if process.returncode:
+        raise BackupError(f"{settings.PG_DUMP} failed: {errors.decode(errors='replace').strip()}")
+
+
+# --- BACKUP / VERIFY / RESTORE ---
+
+def backup(connection, directory, keep, pages=None, sleep=None, progress=None):
+    """Writes a new archive of `connection` into `directory`; returns its metadata."""
+    _check_vendor(connection)
+    os.makedirs(directory, exist_ok=True)
+    pages = settings.BACKUP_PAGES_PER_STEP if pages is None else pages
+    sleep = settings.BACKUP_STEP_SLEEP if sleep is None else sleep
+
+    created = datetime.now(dt_timezone.utc)
+    name = f"{connection.alias}-{created:%Y%m%dT%H%M%S.%fZ}{EXTENSIONS[connection.vendor]}"
+    archive_path = os.path.join(directory, name)
+    partial = archive_path + '.partial'
+    meta = {'alias': connection.alias, 'vendor': connection.vendor, 'created': created.isoformat()}
+
+    try:
+        if connection.vendor == 'sqlite':
+            with tempfile.TemporaryDirectory(dir=directory) as workdir:
+                snapshot = os.path.join(workdir, 'snapshot.sqlite3')
+                meta['pages'] = _sqlite_snapshot(connection, snapshot, pages, sleep, progress)
+                meta['size'] = os.path.getsize(snapshot)
+                meta['content_sha256'] = _sha256(snapshot)
+                _compress(snapshot, partial)
+        else:
+            _pg_dump(connection, partial)
+            meta['size'], meta['content_sha256'] = _content_digest(partial)
+        meta['compressed_size'] = os.path.getsize(partial)
+        meta['sha256'] = _sha256(partial)
+        os.replace(partial, archive_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    with open(sidecar(archive_path), 'w', encoding='utf-8') as output:
+        json.dump(meta, output, indent=2)
+
+    meta['path'] = archive_path
+    meta['removed'] = rotate(directory, connection.alias, keep)
+    return meta
+
+
+def rotate(directory, alias, keep):
+    """Deletes all but the newest `keep` archives of `alias`; returns the removed paths."""
+    removed = archives(directory, alias)[:-keep] if keep > 0 else []
+    for path in removed:
+        for stale in (path, sidecar(path)):
+            if os.path.exists(stale):
+                os.remove(stale)
+    return removed
+
+
+def _content_digest(archive_path):
+    """(size, sha256) of an archive's uncompressed contents."""
+    digest = hashlib.sha256()
+    size = 0
+    with gzip.open(archive_path, 'rb') as archive:
+        for block in iter(lambda: archive.read(CHUNK_SIZE), b''):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def verify(archive_path, extract_to=None):
+    """
+    Checks an archive against its sidecar (and, for SQLite, runs an integrity
+    check on the extracted copy). Returns the metadata; raises BackupError.
+
+    With `extract_to` the verified SQLite database is left at that path.
+    """
+    try:
+        with open(sidecar(archive_path), encoding='utf-8') as source:
+            meta = json.load(source)
+    except (OSError, ValueError) as e:
+        raise BackupError(f"Missing or unreadable checksum file for {archive_path}: {e}")
+
+    if _sha256(archive_path) != meta['sha256']:
+        raise BackupError(f"Checksum mismatch: {archive_path} is corrupt or was modified.")
+
+    if meta['vendor'] == 'sqlite':
+        with tempfile.TemporaryDirectory() as workdir:
+            extracted = extract_to or os.path.join(workdir, 'verify.sqlite3')
+            with gzip.open(archive_path, 'rb') as archive, open(extracted, 'wb') as output:
+                shutil.copyfileobj(archive, output, CHUNK_SIZE)
+            if _sha256(extracted) != meta['content_sha256']:
+                raise BackupError('Checksum mismatch in the uncompressed database.')
+            _integrity_check(extracted)
+    elif _content_digest(archive_path)[1] != meta['content_sha256']:
+        raise BackupError('Checksum mismatch in the uncompressed dump.')
+    return meta
+
+
+def restore(connection, archive_path):
+    """
+    Verifies `archive_path`, replaces the contents of `connection`'s database
+    with it and clears the shared cache.
+    """
+    _check_vendor(connection)
+    with tempfile.TemporaryDirectory() as workdir:
+        extracted = os.path.join(workdir, 'restore.sqlite3')
+        meta = verify(archive_path, extract_to=extracted if connection.vendor == 'sqlite' else None)
+        if meta['vendor'] != connection.vendor:
+            raise BackupError(f"Archive holds a {meta['vendor']} database, not {connection.vendor}.")
+
+        if connection.vendor == 'sqlite':
+            # Copied in one step through the live connection, so other
+            # connections see either the old or the restored database
+            connection.ensure_connection()
+            source = sqlite3.connect(extracted)
+            try:
+                source.backup(connection.connection)
+            finally:
+                source.close()
+        else:
+            command = [settings.PSQL, '--quiet', '--set', 'ON_ERROR_STOP=1', '--single-transaction',
+                       '--dbname', connection.settings_dict['NAME']]
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       stdout=subprocess.DEVNULL, env=_pg_env(connection))
+            with gzip.open(archive_path, 'rb') as archive:
+                shutil.copyfileobj(archive, process.stdin, CHUNK_SIZE)
+            process.stdin.close()
+            errors = process.stderr.read()
+            if process.wait():
+                raise BackupError(f"{settings.PSQL} failed: {errors.decode(errors='replace').strip()}")
+    cache.clear()
+    return meta
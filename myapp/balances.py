@@ -0,0 +1,157 @@
+"""
+Fund balances, optionally sharded.
+
+Every offering updates its fund's row, and almost all of them update the
+General Fund, so concurrent posts queue on that one row. With
+FUND_BALANCE_SHARDS > 1, add() instead adds the delta to one of that many
+FundBalanceShard rows of the fund, picked at random, and concurrent posts
+rarely touch the same row. The compact_balances command folds the shards
+back into Fund.current_balance.
+
+A fund's balance is therefore current_balance plus its shards. Read it
+through current() / total() / apply(), never from current_balance directly.
+The combined balances are cached for BALANCE_CACHE_TIMEOUT seconds and
+dropped whenever a balance change commits. Withdrawals fold() the fund
+first, under a row lock, so they check the exact balance.
+
+With sharding off (the default) add() is the plain F() update, and the
+shards table stays empty. Deltas are added as integer centavos (myapp.money).
+"""
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Fund, FundBalanceShard
+from .money import MoneyField, to_cents
+
+CACHE_KEY = 'fund_balances'
+ZERO = Decimal('0.00')
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+# --- WRITES ---
+
+def add(fund_id, delta):
+    """Adds `delta` (negative for withdrawals and reversals) to the fund's balance."""
+    shards = settings.FUND_BALANCE_SHARDS
+    if shards > 1:
+        shard = random.randrange(shards)
+        updated = FundBalanceShard.objects.filter(fund_id=fund_id, shard=shard).update(delta=F('delta') + to_cents(delta))
+        if not updated:
+            _create_shard(fund_id, shard, delta)
+    else:
+        Fund.objects.filter(pk=fund_id).update(current_balance=F('current_balance') + to_cents(delta))
+    transaction.on_commit(invalidate)
+
+
+class InsufficientFunds(ValueError):
+    pass
+
+
+@transaction.atomic
+def withdraw(fund_id, amount):
+    """
+    Takes `amount` out of the fund and returns the new balance, or raises
+    InsufficientFunds with the balance unchanged.
+
+    The UPDATE runs before the balance is read, so the transaction holds the
+    write lock from its first statement. A SQLite transaction that reads and
+    then writes can't wait for a writer that got in between and fails at once
+    with "database is locked".
+    """
+    Fund.objects.filter(pk=fund_id).update(current_balance=F('current_balance') - to_cents(amount))
+    balance = fold(fund_id)
+    if balance < ZERO:
+        raise InsufficientFunds('Insufficient funds for withdrawal.')
+    transaction.on_commit(invalidate)
+    return balance
+
+
+def _create_shard(fund_id, shard, delta):
+    # Shard rows are created once and only zeroed by compaction, so this is rare
+    try:
+        with transaction.atomic():
+            FundBalanceShard.objects.create(fund_id=fund_id, shard=shard, delta=delta)
+    except IntegrityError:
+        FundBalanceShard.objects.filter(fund_id=fund_id, shard=shard).update(delta=F('delta') + to_cents(delta))
+
+
+@transaction.atomic
+def fold(fund_id):
+    """Moves the fund's shards into current_balance, with both locked; returns the balance."""
+    balance = Fund.objects.select_for_update().values_list('current_balance', flat=True).get(pk=fund_id)
+    shards = list(
+        FundBalanceShard.objects.select_for_update().filter(fund_id=fund_id).exclude(delta=0)
+        .values_list('id', 'delta')
+    )
+    if shards:
+        balance += sum(delta for _, delta in shards)
+        Fund.objects.filter(pk=fund_id).update(current_balance=balance)
+        FundBalanceShard.objects.filter(id__in=[shard_id for shard_id, _ in shards]).update(delta=0)
+        transaction.on_commit(invalidate)
+    return balance
+
+
+def compact():
+    """Folds every fund with pending shard deltas, one short transaction each; returns their ids."""
+    fund_ids = list(
+        FundBalanceShard.objects.exclude(delta=0).values_list('fund_id', flat=True).distinct().order_by('fund_id')
+    )
+    for fund_id in fund_ids:
+        fold(fund_id)
+    return fund_ids
+
+
+# --- READS ---
+
+def with_balance(queryset):
+    """Annotates `balance`: current_balance plus the fund's shards, in one query."""
+    pending = FundBalanceShard.objects.filter(fund=OuterRef('pk')).values('fund').annotate(
+        total=Sum('delta'),
+    ).values('total')
+    output = MoneyField()
+    return queryset.annotate(balance=ExpressionWrapper(
+        F('current_balance') + Coalesce(Subquery(pending, output_field=output), Value(0)),
+        output_field=output,
+    ))
+
+
+def current(cached=True):
+    """{fund_id: balance} of every fund. Pass cached=False where the exact value matters."""
+    if not cached:
+        return dict(with_balance(Fund.objects.all()).values_list('id', 'balance'))
+    balances = cache.get(CACHE_KEY)
+    if balances is None:
+        # The entry is shared with requests pinned to the primary, so never fill
+        # it from a replica that may not have the write that just invalidated it
+        funds = Fund.objects.using(DEFAULT_DB_ALIAS)
+        balances = dict(with_balance(funds).values_list('id', 'balance'))
+        cache.set(CACHE_KEY, balances, settings.BALANCE_CACHE_TIMEOUT)
+    return balances
+
+
+def get(fund_id, cached=True):
+    balance = current(cached).get(fund_id)
+    if balance is None and cached:
+        balance = current(cached=False).get(fund_id)
+    return balance if balance is not None else ZERO
+
+
+def total(cached=True):
+    return sum(current(cached).values(), ZERO)
+
+
+def apply(funds):
+    """Sets current_balance on Fund instances about to be displayed to their combined balance."""
+    balances = current()
+    for fund in funds:
+        fund.current_balance = balances.get(fund.id, fund.current_balance)
+    return funds
@@ -0,0 +1,231 @@
+"""
+Batched offering / withdrawal entries.
+
+The offline entry queue in index.js submits up to MAX_ENTRIES entries per
+request. Every valid entry of a batch is written in one atomic unit: the
+transactions and their splits with two bulk INSERTs and the balances with
+one UPDATE per touched fund, however many entries touched it. Invalid
+entries are reported individually and skipped.
+
+Entries carry a client-generated id, stored on the Transaction and unique
+per treasurer, so an entry resent after a dropped response (or flushed by
+two tabs at once) is reported as a duplicate instead of applied twice.
+Withdrawals are checked against the funds' balances under a row lock, as
+handle_transaction does.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from . import audit, balances as fund_balances, events, timeseries
+from .models import Transaction, TransactionSplit
+from .registry import get_registry
+from .reports import invalidate_periods
+
+KINDS = ('quick', 'specific', 'withdrawal')
+MAX_ENTRIES = 200
+CLIENT_ID_LENGTH = Transaction._meta.get_field('client_id').max_length
+TWO_PLACES = Decimal('0.01')
+
+
+class EntryError(ValueError):
+    pass
+
+
+def _amount(value):
+    try:
+        amount = Decimal(str(value).replace(',', '').strip()).quantize(TWO_PLACES)
+    except (InvalidOperation, TypeError):
+        raise EntryError('Invalid amount.')
+    if amount <= Decimal('0.00'):
+        raise EntryError('Amount must be positive.')
+    return amount
+
+
+def _fund(registry, fund_id):
+    try:
+        fund = registry.get(fund_id)
+    except (TypeError, ValueError):
+        fund = None
+    if fund is None:
+        raise EntryError(f'Unknown fund {fund_id}.')
+    return fund
+
+
+def plan_entry(entry, registry):
+    """
+    Validates one entry; returns (Transaction fields, [(fund_id, amount)] splits,
+    {fund_id: balance delta}). Raises EntryError.
+    """
+    kind = entry.get('kind')
+
+    if kind == 'quick':
+        total = _amount(entry.get('amount'))
+        if registry.general_fund is None:
+            raise EntryError("Setup error: 'General Fund' not found to handle allocation differences.")
+        allocations = registry.allocate(total)
+        fields = {
+            'transaction_type': 'OFFERING',
+            'amount': total,
+            'description': f"Quick Split Offering (Total: ₱{total:,.2f})",
+            **Transaction.split_fields([(registry.get(f), a) for f, a in allocations], total),
+        }
+        return fields, allocations, dict(allocations)
+
+    if kind == 'specific':
+        allocations = {}
+        for fund_id, value in (entry.get('allocations') or {}).items():
+            allocations[_fund(registry, fund_id)] = _amount(value)
+        if not allocations:
+            raise EntryError('No fund amounts given.')
+        total = sum(allocations.values(), Decimal('0.00'))
+        deltas = {fund.id: amount for fund, amount in allocations.items()}
+
+        if len(allocations) == 1:
+            fund, amount = next(iter(allocations.items()))
+            fields = {
+                'transaction_type': 'OFFERING',
+                'amount': amount,
+                'fund_id': fund.id,
+                'fund_label': fund.name,
+                'description': f"Specific Offering to {fund.name}",
+            }
+            return fields, [], deltas
+
+        names = [fund.name for fund in allocations]
+        fund_list_str = (
+            f"{names[0]} and {names[1]}" if len(names) == 2
+            else f"{names[0]}, {names[1]}, and {len(names) - 2} other(s)"
+        )
+        fields = {
+            'transaction_type': 'OFFERING',
+            'amount': total,
+            'description': f"Specific Multi-Fund Offering (Allocated to {fund_list_str}) (Total: ₱{total:,.2f})",
+            **Transaction.split_fields(allocations.items(), total),
+        }
+        return fields, list(deltas.items()), deltas
+
+    if kind == 'withdrawal':
+        fund = _fund(registry, entry.get('fund'))
+        amount = _amount(entry.get('amount'))
+        description = (entry.get('description') or '').strip()
+        if not description:
+            raise EntryError('A reason is required for withdrawals.')
+        fields = {
+            'transaction_type': 'WITHDRAWAL',
+            'amount': amount,
+            'fund_id': fund.id,
+            'fund_label': fund.name,
+            'description': description,
+        }
+        return fields, [], {fund.id: -amount}
+
+    raise EntryError(f"Unknown entry kind '{kind}'.")
+
+
+def apply_entries(user, entries):
+    """
+    Applies a batch; returns ([{client_id, status, message, transaction_id}], balances).
+
+    status is 'ok', 'duplicate' (already applied earlier) or 'error'.
+    """
+    try:
+        return _apply_entries(user, entries)
+    except IntegrityError:
+        # A concurrent request stored one of these client ids first; once it
+        # has committed, a second pass reports its entries as duplicates
+        return _apply_entries(user, entries)
+
+
+@transaction.atomic
+def _apply_entries(user, entries):
+    registry = get_registry()
+    results, planned = [], []
+    for entry in entries:
+        client_id = str(entry.get('client_id') or '')
+        result = {'client_id': client_id, 'status': 'ok', 'message': '', 'transaction_id': None}
+        results.append(result)
+        try:
+            if len(client_id) > CLIENT_ID_LENGTH:
+                raise EntryError('Invalid entry id.')
+            # The offline queue is per browser; never file one treasurer's entries under another
+            if entry.get('user') not in (None, user.pk):
+                raise EntryError('Queued by another treasurer.')
+            planned.append((result, *plan_entry(entry, registry)))
+        except EntryError as e:
+            result.update(status='error', message=str(e))
+
+    # Lock the funds withdrawn from and read their exact balance, in id order
+    balances = fund_balances.current(cached=False)
+    withdrawn = {fund_id for _, _, _, entry_deltas in planned for fund_id, delta in entry_deltas.items() if delta < 0}
+    for fund_id in sorted(withdrawn & balances.keys()):
+        balances[fund_id] = fund_balances.fold(fund_id)
+
+    client_ids = [result['client_id'] for result in results if result['client_id']]
+    applied = dict(
+        Transaction.objects.filter(created_by=user, client_id__in=client_ids).values_list('client_id', 'pk')
+    )
+    first = {}
+    pending, deltas = [], {}
+
+    for result, fields, splits, entry_deltas in planned:
+        client_id = result['client_id']
+        if client_id in applied:
+            result['transaction_id'] = applied[client_id]
+            result['status'] = 'duplicate'
+            continue
+        if client_id in first:
+            # Sent twice in this batch
+            result['status'] = 'duplicate'
+            continue
+        try:
+            # Withdrawals are checked against the balance after earlier entries of this batch
+            for fund_id, delta in entry_deltas.items():
+                if balances.get(fund_id, Decimal('0.00')) + delta < Decimal('0.00'):
+                    raise EntryError('Insufficient funds for withdrawal.')
+        except EntryError as e:
+            result.update(status='error', message=str(e))
+            continue
+
+        if client_id:
+            first[client_id] = result
+        for fund_id, delta in entry_deltas.items():
+            balances[fund_id] = balances.get(fund_id, Decimal('0.00')) + delta
+            deltas[fund_id] = deltas.get(fund_id, Decimal('0.00')) + delta
+        pending.append((result, Transaction(created_by=user, client_id=client_id or None, **fields), splits))
+
+    if pending:
+        created = [record for _, record, _ in pending]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Transaction.objects.bulk_create(created)
+        else:
+            for record in created:
+                record.save()
+
+        TransactionSplit.objects.bulk_create([
+            TransactionSplit(parent_transaction=record, fund_id=fund_id, amount_allocated=amount)
+            for _, record, splits in pending
+            for fund_id, amount in splits
+        ])
+
+        # One UPDATE per fund, whatever the number of entries that touched it
+        for fund_id, delta in deltas.items():
+            fund_balances.add(fund_id, delta)
+
+        for result, record, _ in pending:
+            result['transaction_id'] = record.pk
+            audit.record(user, 'transaction.create', 'transaction', record.pk,
+                         after=audit.snapshot(record, audit.TRANSACTION_FIELDS))
+
+        # bulk_create sends no post_save, so do what the Transaction signals would
+        invalidate_periods(timezone.now())
+        timeseries.invalidate()
+        events.transactions_committed(created)
+
+    for result in results:
+        if result['status'] == 'duplicate' and result['transaction_id'] is None:
+            result['transaction_id'] = first[result['client_id']]['transaction_id']
+
+    current = fund_balances.current(cached=False)
+    return results, {str(fund_id): str(balance) for fund_id, balance in current.items()}
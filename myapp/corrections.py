@@ -0,0 +1,97 @@
+"""
+Set-based ledger corrections behind the Transaction admin actions.
+
+reverse_transactions() removes any number of transactions in a fixed number
+of statements: the balance change to undo is summed per fund in SQL, applied
+with one balances.add() per fund, and the rows go with two DELETEs. Deleting
+through the ORM would load every row and send a post_delete for each one,
+and each of those invalidates the caches and pushes a dashboard update of
+its own, so the caches, audit entries and live events are handled here once
+for the whole set.
+
+refresh_fund_labels() rewrites the denormalized fund_label of direct
+transactions from their fund's current name with a single UPDATE.
+"""
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from . import audit, balances, events, timeseries
+from .models import Fund, Transaction, TransactionSplit
+from .money import Money, sum_cents
+from .reports import invalidate_periods
+
+
+class CorrectionError(ValueError):
+    pass
+
+
+def reversal_deltas(transaction_ids):
+    """{fund_id: balance change that undoes these transactions}, summed in two queries."""
+    direct = Transaction.objects.filter(
+        pk__in=transaction_ids, splits__isnull=True, fund__isnull=False,
+    ).values('fund').annotate(
+        offered=sum_cents('amount', filter=Q(transaction_type='OFFERING')),
+        withdrawn=sum_cents('amount', filter=Q(transaction_type='WITHDRAWAL')),
+    ).order_by()
+    allocated = TransactionSplit.objects.filter(
+        parent_transaction__in=transaction_ids,
+    ).values('fund').annotate(
+        offered=sum_cents('amount_allocated', filter=Q(parent_transaction__transaction_type='OFFERING')),
+        withdrawn=sum_cents('amount_allocated', filter=Q(parent_transaction__transaction_type='WITHDRAWAL')),
+    ).order_by()
+
+    cents = {}
+    for row in direct.union(allocated, all=True):
+        change = int(row['withdrawn'] or 0) - int(row['offered'] or 0)
+        cents[row['fund']] = cents.get(row['fund'], 0) + change
+    return {fund_id: Money.from_cents(change) for fund_id, change in cents.items() if change}
+
+
+@transaction.atomic
+def reverse_transactions(actor, queryset):
+    """
+    Deletes the transactions in `queryset` and takes their amounts back out
+    of the fund balances; returns how many were removed.
+
+    Raises CorrectionError, changing nothing, if a fund would be left with a
+    negative balance (reversing offerings that were since withdrawn).
+    """
+    removed = list(queryset.order_by('pk'))
+    if not removed:
+        return 0
+    ids = [record.pk for record in removed]
+    deltas = reversal_deltas(ids)
+
+    # Funds that lose money are locked and read exactly, in id order
+    for fund_id in sorted(fund_id for fund_id, delta in deltas.items() if delta < 0):
+        if balances.fold(fund_id) + deltas[fund_id] < Decimal('0.00'):
+            name = Fund.objects.values_list('name', flat=True).get(pk=fund_id)
+            raise CorrectionError(f"Reversing these transactions would leave {name} with a negative balance.")
+
+    for fund_id, delta in deltas.items():
+        balances.add(fund_id, delta)
+
+    # Plain DELETEs without the per-row post_delete work, which is done once below
+    using = router.db_for_write(Transaction)
+    TransactionSplit.objects.filter(parent_transaction__in=ids)._raw_delete(using)
+    Transaction.objects.filter(pk__in=ids)._raw_delete(using)
+
+    for record in removed:
+        audit.record(actor, 'transaction.delete', 'transaction', record.pk,
+                     before=audit.snapshot(record, audit.TRANSACTION_FIELDS))
+    for day in {timezone.localtime(record.transaction_date).date() for record in removed}:
+        invalidate_periods(day)
+    timeseries.invalidate()
+    events.transactions_committed(removed, deleted=True)
+    return len(removed)
+
+
+def refresh_fund_labels(queryset):
+    """Sets fund_label to the fund's current name on direct transactions in `queryset`; returns the count."""
+    name = Subquery(Fund.objects.filter(pk=OuterRef('fund')).values('name')[:1])
+    return queryset.filter(split_count=0, fund__isnull=False).exclude(
+        fund_label=F('fund__name'),
+    ).update(fund_label=name)
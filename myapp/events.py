@@ -0,0 +1,158 @@
+"""
+Live dashboard events (server-sent events).
+
+Every worker process owns one in-process hub. Connected dashboards each hold a
+small asyncio queue on it; an event is serialized once and pushed to every
+queue, so N open dashboards cost one fan-out instead of N polling loops.
+
+Events are published from `transaction.on_commit` callbacks and fanned out
+locally straight away. With LIVE_EVENTS_RELAY (on when REDIS_URL is set) they
+are also appended to a short log in the shared cache, and one relay task per
+worker tails that log so dashboards connected to other workers get them too.
+The log is numbered with cache.incr(), which only Redis makes atomic: on the
+file-based cache two workers can draw the same number and overwrite each
+other's event, so there the relay stays off and each worker only reaches its
+own dashboards (run a single worker, or set REDIS_URL).
+"""
+import asyncio
+import json
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = 'events:sequence'
+LOG_TIMEOUT = 60 * 5
+QUEUE_SIZE = 100
+
+# Identifies this process, so the relay skips events it already delivered
+WORKER_ID = uuid.uuid4().hex
+
+
+def _event_key(sequence):
+    return f"events:{sequence}"
+
+
+def encode(event, data):
+    """One SSE frame; encoded once per event regardless of the number of listeners."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._relay = None
+
+    def subscribe(self):
+        """Registers a queue for the calling event loop and starts the relay if needed."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((loop, queue))
+            if settings.LIVE_EVENTS_RELAY and (self._relay is None or self._relay.done()):
+                self._relay = loop.create_task(self._run_relay())
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    def broadcast(self, frame):
+        """Thread-safe: called from request threads and the relay alike."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, frame)
+
+    async def _run_relay(self):
+        last = await cache.aget(SEQUENCE_KEY, 0)
+        stalled = None
+        while True:
+            await asyncio.sleep(settings.LIVE_EVENTS_POLL_INTERVAL)
+            with self._lock:
+                if not self._subscribers:
+                    self._relay = None
+                    return
+
+            current = await cache.aget(SEQUENCE_KEY, 0)
+            if current < last:
+                # The cache was cleared; start again from its new position
+                last = current
+            if current == last:
+                continue
+
+            entries = await cache.aget_many([_event_key(n) for n in range(last + 1, current + 1)])
+            for sequence in range(last + 1, current + 1):
+                entry = entries.get(_event_key(sequence))
+                if entry is None and sequence != stalled:
+                    # Numbered but not written yet; give the publisher one more poll
+                    stalled = sequence
+                    break
+                if entry and entry[0] != WORKER_ID:
+                    self.broadcast(entry[1])
+                last = sequence
+
+
+def _offer(queue, frame):
+    try:
+        queue.put_nowait(frame)
+    except asyncio.QueueFull:
+        # Slow client: drop the event, the next balance snapshot supersedes it
+        pass
+
+
+hub = Hub()
+
+
+def publish(event, data):
+    """Sends an event to every dashboard, on this worker and (via the cache log) the others."""
+    frame = encode(event, data)
+    hub.broadcast(frame)
+    if not settings.LIVE_EVENTS_RELAY:
+        return
+    try:
+        try:
+            sequence = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            cache.add(SEQUENCE_KEY, 0, None)
+            sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(_event_key(sequence), (WORKER_ID, frame), LOG_TIMEOUT)
+    except Exception:
+        logger.warning("Could not relay live event %s", event, exc_info=True)
+
+
+def balance_snapshot():
+    from . import balances
+    return {str(fund_id): str(balance) for fund_id, balance in balances.current(cached=False).items()}
+
+
+def transaction_committed(instance, deleted=False):
+    """Queues the dashboard update for a saved or deleted Transaction until commit."""
+    transactions_committed([instance], deleted=deleted)
+
+
+def transactions_committed(instances, deleted=False):
+    """Like transaction_committed, for a batch: one delta each, one balance snapshot."""
+    deltas = [
+        {
+            'id': instance.pk,
+            'type': instance.transaction_type,
+            'amount': str(instance.amount),
+            'fund': instance.fund_id,
+            'deleted': deleted,
+        }
+        for instance in instances
+    ]
+
+    def send():
+        for delta in deltas:
+            publish('transaction', delta)
+        publish('balances', balance_snapshot())
+
+    transaction.on_commit(send)
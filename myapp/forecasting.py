@@ -0,0 +1,167 @@
+"""
+Vectorized per-fund growth forecasts.
+
+Net flows per fund per closed period are loaded (one grouped query, or the
+report cache) into a funds x periods NumPy matrix. Every fund is then fitted
+at once: a least-squares linear trend plus a seasonal profile (month of year
+for monthly series, week of year for weekly ones, which picks up Christmas,
+Holy Week and similar offering peaks) averaged from the detrended residuals.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import balances as fund_balances, reports
+from .registry import get_registry
+
+HORIZONS = (3, 6, 12)
+WEEKS_AHEAD = 4
+CACHE_TIMEOUT = 60 * 60
+
+# Seasonal cycle length per period type
+SEASON_LENGTH = {'month': 12, 'week': 52}
+
+
+def load_series(period, count, fund_ids):
+    """
+    (starts, matrix) for the `count` closed periods before the current one;
+    matrix[i, t] is fund_ids[i]'s net flow in period starts[t].
+    """
+    step = reports.PERIODS[period][1]
+    current = reports.period_start(period, timezone.localdate())
+    first = current - step * count
+    totals = reports.period_totals(period, first, current)
+
+    starts = sorted(totals)
+    row_of = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+    matrix = np.zeros((len(fund_ids), len(starts)))
+    for t, start in enumerate(starts):
+        for fund_id, (income, expense) in totals[start].items():
+            if fund_id in row_of:
+                matrix[row_of[fund_id], t] = float(income - expense)
+    return starts, matrix
+
+
+def season_index(period, starts):
+    """Position of each period start within its seasonal cycle (0-based)."""
+    if period == 'month':
+        return np.array([start.month - 1 for start in starts])
+    return np.array([min(start.isocalendar()[1], 52) - 1 for start in starts])
+
+
+def fit(series, seasons, season_length):
+    """
+    Fits trend + seasonality to every row of `series` (funds x periods).
+
+    Returns (intercept, slope, seasonal) where seasonal is funds x season_length
+    and sums to zero per fund. Seasonality is only estimated once at least two
+    full cycles of history exist.
+    """
+    funds, length = series.shape
+    if length == 0:
+        return np.zeros(funds), np.zeros(funds), np.zeros((funds, season_length))
+
+    t = np.arange(length, dtype=float)
+    t_centered = t - t.mean()
+    denominator = (t_centered ** 2).sum() or 1.0
+    means = series.mean(axis=1)
+    slope = (series - means[:, None]) @ t_centered / denominator
+    intercept = means - slope * t.mean()
+
+    seasonal = np.zeros((funds, season_length))
+    if length >= 2 * season_length:
+        residuals = series - (intercept[:, None] + slope[:, None] * t)
+        one_hot = np.zeros((length, season_length))
+        one_hot[np.arange(length), seasons] = 1.0
+        counts = one_hot.sum(axis=0)
+        seasonal = (residuals @ one_hot) / np.where(counts, counts, 1.0)
+        seasonal -= seasonal.mean(axis=1, keepdims=True)
+    return intercept, slope, seasonal
+
+
+def project(intercept, slope, seasonal, length, future_seasons):
+    """Expected net flow for each future period: funds x len(future_seasons)."""
+    steps = length + np.arange(len(future_seasons), dtype=float)
+    return intercept[:, None] + slope[:, None] * steps + seasonal[:, future_seasons]
+
+
+def _forecast_period(period, count, fund_ids, ahead):
+    step = reports.PERIODS[period][1]
+    starts, series = load_series(period, count, fund_ids)
+    season_length = SEASON_LENGTH[period]
+    intercept, slope, seasonal = fit(series, season_index(period, starts), season_length)
+
+    current = reports.period_start(period, timezone.localdate())
+    future_starts = [current + step * i for i in range(1, ahead + 1)]
+    future = project(intercept, slope, seasonal, series.shape[1], season_index(period, future_starts))
+    return slope, seasonal, future
+
+
+def build_forecast():
+    """
+    Trend, seasonality and projected net flow per fund, before balances.
+
+    Only closed periods are fitted, so the result can be cached until the
+    month or week rolls over.
+    """
+    registry = get_registry()
+    fund_ids = list(registry.funds)
+
+    monthly_slope, monthly_seasonal, monthly = _forecast_period(
+        'month', settings.FORECAST_HISTORY_MONTHS, fund_ids, max(HORIZONS),
+    )
+    _, _, weekly = _forecast_period('week', settings.FORECAST_HISTORY_WEEKS, fund_ids, WEEKS_AHEAD)
+
+    # Cumulative projected net flow at each horizon, for all funds at once
+    cumulative = np.cumsum(monthly, axis=1)[:, [months - 1 for months in HORIZONS]]
+
+    return {
+        'generated': timezone.now().isoformat(),
+        'funds': [
+            {
+                'fund_id': fund_id,
+                'name': registry.funds[fund_id].name,
+                'trend_per_month': round(float(monthly_slope[i]), 2),
+                'seasonal_by_month': [round(float(v), 2) for v in monthly_seasonal[i]],
+                'next_weeks': [round(float(v), 2) for v in weekly[i]],
+                'projected_net': [round(float(v), 2) for v in cumulative[i]],
+            }
+            for i, fund_id in enumerate(fund_ids)
+        ],
+    }
+
+
+def get_forecast():
+    """
+    Forecast for the dashboard and JSON endpoint: the cached fit (keyed by the
+    current month/week and the fund registry version) plus live balances.
+    """
+    today = timezone.localdate()
+    key = 'forecast:{}:{}:{}'.format(
+        reports.period_start('month', today),
+        reports.period_start('week', today),
+        get_registry().version,
+    )
+    fitted = cache.get(key)
+    if fitted is None:
+        fitted = build_forecast()
+        cache.set(key, fitted, CACHE_TIMEOUT)
+
+    balances = fund_balances.current()
+    totals = {str(months): 0.0 for months in HORIZONS}
+    funds = []
+    for entry in fitted['funds']:
+        balance = float(balances.get(entry['fund_id'], 0))
+        projections = {}
+        for months, net in zip(HORIZONS, entry['projected_net']):
+            projections[str(months)] = {'net': net, 'balance': round(balance + net, 2)}
+            totals[str(months)] += balance + net
+        funds.append({**entry, 'balance': balance, 'projections': projections})
+
+    return {
+        'generated': fitted['generated'],
+        'horizons': list(HORIZONS),
+        'funds': funds,
+        'total': {months: round(total, 2) for months, total in totals.items()} if funds else {},
+    }
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .models import Treasurer, Fund, Transaction
+from .thumbnails import schedule_delete, schedule_thumbnails
 
 class TreasurerRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -28,6 +29,17 @@ class TreasurerProfileForm(forms.ModelForm):
             'profile_picture': forms.FileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
         }
 
+    def save(self, commit=True):
+        old_picture = self.initial.get('profile_picture')
+        treasurer = super().save(commit=commit)
+
+        # Thumbnails and cleanup run in the background after the save commits
+        if commit and 'profile_picture' in self.changed_data and treasurer.profile_picture:
+            schedule_thumbnails(treasurer.profile_picture.name)
+            if old_picture and old_picture.name != treasurer.profile_picture.name:
+                schedule_delete(old_picture.name)
+        return treasurer
+
 class TransactionForm(forms.ModelForm):
     transaction_type = forms.ChoiceField(
         choices=Transaction.TRANSACTION_TYPES,
@@ -0,0 +1,67 @@
+"""
+Jinja2 environment for the hot pages (JINJA2_TEMPLATES).
+
+index.html, transaction.html and profile.html have Jinja2 ports in
+templates/jinja2/. The environment gives them what the Django versions
+load: static() and url(), the assets tags as functions, humanize's
+intcomma and the Django filters the pages use. Messages come from the
+same context processors as the Django engine. csrf_input is added to
+every context by Django's Jinja2 backend.
+
+Compiled templates are cached as bytecode in JINJA2_BYTECODE_CACHE_DIR, so
+a freshly started worker loads them instead of compiling them again.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.humanize.templatetags.humanize import intcomma, naturaltime
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment, FileSystemBytecodeCache, Undefined
+
+from .templatetags.assets import avatar, bundle, responsive_image
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args, kwargs=kwargs)
+
+
+# The Django engine converts datetimes to local time before these two filters,
+# and renders a missing variable as ''
+def date(value, arg=None):
+    if isinstance(value, Undefined):
+        return ''
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def time(value, arg=None):
+    if isinstance(value, Undefined):
+        return ''
+    return defaultfilters.time(template_localtime(value), arg)
+
+
+def environment(**options):
+    cache_dir = settings.JINJA2_BYTECODE_CACHE_DIR
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        options.setdefault('bytecode_cache', FileSystemBytecodeCache(cache_dir))
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'bundle': bundle,
+        'responsive_image': responsive_image,
+        'avatar': avatar,
+    })
+    env.filters.update({
+        'intcomma': intcomma,
+        'naturaltime': naturaltime,
+        'floatformat': defaultfilters.floatformat,
+        'date': date,
+        'time': time,
+        'slugify': defaultfilters.slugify,
+        'truncatechars': defaultfilters.truncatechars,
+    })
+    return env
@@ -0,0 +1,166 @@
+"""
+Per-fund ledger with running balances.
+
+A fund's ledger is the UNION ALL of its direct transactions and its split
+allocations, newest first, ordered by (transaction id, split id). Ids follow
+transaction_date (it is auto_now_add), and both branches are served by the
+*_fund_ledger indexes, so each branch reads at most one page of rows.
+
+Running balances are computed in SQL with a window over the page only:
+
+    balance after row = anchor - SUM(signed amount) OVER (rows above it on the page)
+
+The first page is anchored on the fund's current balance, read in the same
+statement. Each next-page cursor carries the last row's position and the
+balance before it, signed so a client cannot alter it. Any page of any
+fund's history costs the same, however long the history is.
+
+Amounts are stored as integer centavos (myapp.money), so the window adds
+integers and the balances are exact.
+"""
+from django.conf import settings
+from django.core import signing
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Fund, FundBalanceShard, Transaction, TransactionSplit, Treasurer
+from .money import Money
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+CURSOR_SALT = 'myapp.ledger'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+LEDGER_SQL = """
+SELECT e.transaction_id, e.split_id, e.cents, e.kind,
+       {anchor} - COALESCE(SUM(CASE WHEN e.kind = 'OFFERING' THEN e.cents ELSE -e.cents END) OVER (
+           ORDER BY e.transaction_id DESC, e.split_id DESC
+           ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+       ), 0) AS balance,
+       t.transaction_date, t.description, t.fund_label, u.username
+FROM (
+    SELECT * FROM (
+        SELECT d.id AS transaction_id, 0 AS split_id,
+               d.amount AS cents, d.transaction_type AS kind
+        FROM {transaction} d
+        WHERE d.fund_id = %s {direct_after}
+          AND NOT EXISTS (SELECT 1 FROM {split} x WHERE x.parent_transaction_id = d.id)
+        ORDER BY d.id DESC
+        LIMIT %s
+    ) direct
+    UNION ALL
+    SELECT * FROM (
+        SELECT s.parent_transaction_id, s.id,
+               s.amount_allocated, p.transaction_type
+        FROM {split} s
+        JOIN {transaction} p ON p.id = s.parent_transaction_id
+        WHERE s.fund_id = %s {split_after}
+        ORDER BY s.parent_transaction_id DESC, s.id DESC
+        LIMIT %s
+    ) allocated
+    ORDER BY transaction_id DESC, split_id DESC
+    LIMIT %s
+) e
+JOIN {transaction} t ON t.id = e.transaction_id
+LEFT JOIN {treasurer} u ON u.id = t.created_by_id
+ORDER BY e.transaction_id DESC, e.split_id DESC
+"""
+
+
+def encode_cursor(fund_id, transaction_id, split_id, balance_cents):
+    return signing.dumps([fund_id, transaction_id, split_id, balance_cents], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(fund_id, cursor):
+    """(transaction_id, split_id, balance_cents) of a cursor issued for this fund."""
+    try:
+        cursor_fund, transaction_id, split_id, balance_cents = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidCursor('Invalid ledger cursor.')
+    if cursor_fund != fund_id:
+        raise InvalidCursor('Cursor belongs to another fund.')
+    return transaction_id, split_id, balance_cents
+
+
+def _to_datetime(value, connection):
+    """What the ORM would return for transaction_date (raw SQLite rows come back naive)."""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, connection.timezone)
+    return value
+
+
+def ledger_page(fund_id, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of the fund's ledger, newest first.
+
+    Returns {'entries': [...], 'next_cursor': str or None}. Each entry has
+    transaction_id, split_id (None for a direct transaction), date, type,
+    amount, balance (after the entry), description, fund_label, recorded_by.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    fetch = limit + 1
+    tables = {
+        'transaction': Transaction._meta.db_table,
+        'split': TransactionSplit._meta.db_table,
+        'treasurer': Treasurer._meta.db_table,
+    }
+
+    if cursor:
+        transaction_id, split_id, balance_cents = decode_cursor(fund_id, cursor)
+        sql = LEDGER_SQL.format(
+            anchor='%s',
+            direct_after='AND d.id < %s',
+            split_after='AND (s.parent_transaction_id < %s OR (s.parent_transaction_id = %s AND s.id < %s))',
+            **tables,
+        )
+        params = [
+            balance_cents,
+            fund_id, transaction_id, fetch,
+            fund_id, transaction_id, transaction_id, split_id, fetch,
+            fetch,
+        ]
+    else:
+        # Anchored on the current balance (plus uncompacted shards, see
+        # myapp.balances), read by the same statement as the rows
+        sql = LEDGER_SQL.format(
+            anchor=(
+                f"((SELECT current_balance FROM {Fund._meta.db_table} WHERE id = %s)"
+                f" + (SELECT COALESCE(SUM(delta), 0) FROM {FundBalanceShard._meta.db_table} WHERE fund_id = %s))"
+            ),
+            direct_after='', split_after='', **tables,
+        )
+        params = [fund_id, fund_id, fund_id, fetch, fund_id, fetch, fetch]
+
+    # Raw SQL bypasses the routers, so ask them which database reads go to
+    connection = connections[router.db_for_read(Transaction)]
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        rows = db.fetchall()
+
+    entries = []
+    for transaction_id, split_id, cents, kind, balance, date, description, fund_label, username in rows[:limit]:
+        entries.append({
+            'transaction_id': transaction_id,
+            'split_id': split_id or None,
+            'date': _to_datetime(date, connection),
+            'type': kind,
+            'amount': Money.from_cents(cents),
+            'balance': Money.from_cents(balance),
+            'description': description,
+            'fund_label': fund_label,
+            'recorded_by': username,
+        })
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        signed = last[2] if last[3] == 'OFFERING' else -last[2]
+        next_cursor = encode_cursor(fund_id, last[0], last[1], last[4] - signed)
+    return {'entries': entries, 'next_cursor': next_cursor}
@@ -0,0 +1,236 @@
+"""
+SQLite maintenance and health figures.
+
+run() is one round of the dbmaintain command:
+
+- ANALYZE when the database has no statistics yet, otherwise PRAGMA
+  optimize, which re-analyzes only the tables whose statistics went stale.
+  analysis_limit (DB_ANALYSIS_LIMIT) keeps ANALYZE on big tables to a sample.
+- PRAGMA incremental_vacuum, handing back up to DB_VACUUM_PAGES of the free
+  pages that deleted and undone transactions leave behind. It needs
+  auto_vacuum=INCREMENTAL; `dbmaintain --enable-incremental-vacuum`
+  converts an existing database (one full VACUUM).
+- PRAGMA wal_checkpoint(TRUNCATE) in WAL mode, so the -wal file is copied
+  back and truncated instead of growing.
+- A MaintenanceRun snapshot of file, table and index sizes and row counts,
+  which the health page compares over time.
+
+Rounds only run inside DB_MAINTENANCE_WINDOW and once nothing has been
+recorded for DB_QUIET_SECONDS, unless forced. The snapshots are written to
+the default database, whichever database was maintained.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.utils import timezone
+
+from .models import MaintenanceRun, Transaction
+
+AUTO_VACUUM = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+class MaintenanceError(Exception):
+    pass
+
+
+def _connection(alias, outside_transaction=False):
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise MaintenanceError(f"Maintenance is only implemented for SQLite, not {connection.vendor}.")
+    if outside_transaction and connection.in_atomic_block:
+        raise MaintenanceError('VACUUM and checkpoints cannot run inside a transaction.')
+    return connection
+
+
+def _pragma(cursor, statement):
+    cursor.execute(f'PRAGMA {statement}')
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# --- FIGURES ---
+
+def _wal_bytes(connection):
+    path = f"{connection.settings_dict['NAME']}-wal"
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+def file_stats(alias=DEFAULT_DB_ALIAS):
+    """Page and file figures; cheap enough for every page view."""
+    connection = _connection(alias)
+    with connection.cursor() as cursor:
+        page_size = _pragma(cursor, 'page_size')
+        page_count = _pragma(cursor, 'page_count')
+        free_pages = _pragma(cursor, 'freelist_count')
+        journal_mode = _pragma(cursor, 'journal_mode')
+        auto_vacuum = AUTO_VACUUM.get(_pragma(cursor, 'auto_vacuum'), 'unknown')
+
+    path = str(connection.settings_dict['NAME'])
+    return {
+        'path': path,
+        # In-memory (test) databases have no file
+        'file_bytes': os.path.getsize(path) if os.path.isfile(path) else page_size * page_count,
+        'wal_bytes': _wal_bytes(connection),
+        'page_size': page_size,
+        'page_count': page_count,
+        'free_pages': free_pages,
+        'fragmentation': free_pages / page_count if page_count else 0.0,
+        'journal_mode': journal_mode,
+        'auto_vacuum': auto_vacuum,
+    }
+
+
+def object_sizes(cursor):
+    """{name: {type, table, bytes, unused, rows}} of every table and index."""
+    cursor.execute(
+        "SELECT name, type, tbl_name FROM sqlite_master "
+        "WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%'"
+    )
+    sizes = {
+        name: {'type': kind, 'table': table, 'bytes': None, 'unused': None, 'rows': None}
+        for name, kind, table in cursor.fetchall()
+    }
+    try:
+        # dbstat reads every page; only available when SQLite was built with it
+        cursor.execute('SELECT name, SUM(pgsize), SUM(unused) FROM dbstat GROUP BY name')
+        for name, size, unused in cursor.fetchall():
+            if name in sizes:
+                sizes[name].update(bytes=size, unused=unused)
+    except OperationalError:
+        pass
+    for name, info in sizes.items():
+        if info['type'] == 'table':
+            cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+            info['rows'] = cursor.fetchone()[0]
+    return sizes
+
+
+# --- SCHEDULING ---
+
+def _window():
+    start, _, end = settings.DB_MAINTENANCE_WINDOW.partition('-')
+    return int(start), int(end)
+
+
+def in_window(moment=None):
+    """Whether `moment` (default: now) falls in DB_MAINTENANCE_WINDOW; windows may wrap midnight."""
+    hour = timezone.localtime(moment).hour
+    start, end = _window()
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def is_quiet(alias=DEFAULT_DB_ALIAS):
+    """No transaction recorded for DB_QUIET_SECONDS (the newest by id, so no scan)."""
+    latest = Transaction.objects.using(alias).order_by('-id').values_list('transaction_date', flat=True).first()
+    return latest is None or timezone.now() - latest >= timedelta(seconds=settings.DB_QUIET_SECONDS)
+
+
+# --- MAINTENANCE ---
+
+def enable_incremental_vacuum(alias=DEFAULT_DB_ALIAS):
+    """Switches auto_vacuum to INCREMENTAL; rewrites the whole file once (VACUUM)."""
+    connection = _connection(alias, outside_transaction=True)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+        return AUTO_VACUUM.get(_pragma(cursor, 'auto_vacuum'))
+
+
+def run(alias=DEFAULT_DB_ALIAS, force=False, analyze=False):
+    """
+    One maintenance round; returns the MaintenanceRun recorded, or None when
+    outside the window or the database is busy (and not `force`).
+    """
+    connection = _connection(alias, outside_transaction=True)
+    if not force and not (in_window() and is_quiet(alias)):
+        return None
+
+    started = time.perf_counter()
+    actions = []
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA analysis_limit = {int(settings.DB_ANALYSIS_LIMIT)}')
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if analyze or cursor.fetchone() is None:
+            cursor.execute('ANALYZE')
+            actions.append('analyze')
+        else:
+            cursor.execute('PRAGMA optimize')
+            actions.append('optimize')
+
+        free_pages = _pragma(cursor, 'freelist_count')
+        if free_pages and _pragma(cursor, 'auto_vacuum') == 2:
+            pages = min(free_pages, settings.DB_VACUUM_PAGES)
+            # The pragma frees one page per step, and execute() only takes the
+            # first step; executescript() runs it to the end
+            connection.connection.executescript(f'PRAGMA incremental_vacuum({pages})')
+            actions.append(f'vacuumed {pages} pages')
+
+        if _pragma(cursor, 'journal_mode') == 'wal':
+            # TRUNCATE reports no frames once it has emptied the log, so note its size first
+            wal_bytes = _wal_bytes(connection)
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            busy = cursor.fetchone()[0]
+            actions.append('checkpoint busy' if busy else f'checkpointed {wal_bytes // 1024} KB of WAL')
+
+        sizes = object_sizes(cursor)
+
+    stats = file_stats(alias)
+    MaintenanceRun.objects.filter(
+        alias=alias, created_at__lt=timezone.now() - timedelta(days=settings.DB_HEALTH_KEEP_DAYS),
+    ).delete()
+    return MaintenanceRun.objects.create(
+        alias=alias,
+        duration_ms=round((time.perf_counter() - started) * 1000),
+        actions=actions,
+        file_bytes=stats['file_bytes'],
+        wal_bytes=stats['wal_bytes'],
+        page_size=stats['page_size'],
+        page_count=stats['page_count'],
+        free_pages=stats['free_pages'],
+        sizes=sizes,
+    )
+
+
+# --- HEALTH PAGE ---
+
+def _change(info, previous, key):
+    if info[key] is None or previous.get(key) is None:
+        return None
+    return info[key] - previous[key]
+
+
+def health(alias=DEFAULT_DB_ALIAS, days=30):
+    """Live file figures plus table/index figures from the latest run, with changes over `days`."""
+    runs = list(MaintenanceRun.objects.filter(
+        alias=alias, created_at__gte=timezone.now() - timedelta(days=days),
+    ).order_by('created_at', 'id'))
+    latest = runs[-1] if runs else MaintenanceRun.objects.filter(alias=alias).first()
+    # Changes are measured against the oldest run in the period
+    first = runs[0] if len(runs) > 1 else None
+
+    objects = []
+    if latest is not None:
+        before = first.sizes if first is not None else {}
+        for name, info in sorted(latest.sizes.items(), key=lambda item: -(item[1]['bytes'] or 0)):
+            previous = before.get(name, {})
+            objects.append({
+                'name': name,
+                **info,
+                'rows_change': _change(info, previous, 'rows'),
+                'bytes_change': _change(info, previous, 'bytes'),
+            })
+
+    return {
+        'alias': alias,
+        'stats': file_stats(alias),
+        'latest': latest,
+        'since': first.created_at if first is not None else None,
+        'objects': objects,
+        'runs': list(reversed(runs[-20:])),
+        'window': settings.DB_MAINTENANCE_WINDOW,
+    }
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from myapp import backups
+
+class Command(BaseCommand):
+    help = 'Take a compressed, checksummed online backup of the database and rotate old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to back up.')
+        parser.add_argument('--output', default=settings.BACKUP_DIR, help='Backup directory (default: BACKUP_DIR).')
+        parser.add_argument('--keep', type=int, default=settings.BACKUP_KEEP,
+                            help='Number of archives to keep (default: BACKUP_KEEP; 0 keeps all).')
+        parser.add_argument('--pages', type=int, default=settings.BACKUP_PAGES_PER_STEP,
+                            help='SQLite pages copied per step (-1 copies everything in one step).')
+        parser.add_argument('--sleep', type=float, default=settings.BACKUP_STEP_SLEEP,
+                            help='Seconds to pause between SQLite steps so writers can get in.')
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections:
+            raise CommandError(f"Unknown database alias '{options['database']}'.")
+        connection = connections[options['database']]
+
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {done}/{total} pages")
+
+        try:
+            meta = backups.backup(connection, options['output'], options['keep'],
+                                  pages=options['pages'], sleep=options['sleep'], progress=progress)
+        except (backups.BackupError, OSError) as e:
+            raise CommandError(f"Backup failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backed up {meta['alias']} to {meta['path']} "
+            f"({meta['size'] / 1024:.1f} KB -> {meta['compressed_size'] / 1024:.1f} KB, sha256 {meta['sha256'][:12]})"
+        ))
+        for path in meta['removed']:
+            self.stdout.write(f"Removed old backup {path}")
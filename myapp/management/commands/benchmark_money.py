@@ -0,0 +1,145 @@
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from myapp.models import Fund, Transaction, TransactionSplit, Treasurer
+from myapp.money import CENTS, Money, sum_cents, to_cents
+from myapp.registry import GENERAL_FUND_NAME, FundInfo, FundRegistry
+
+PERCENTAGES = (Decimal('40'), Decimal('20'), Decimal('15'), Decimal('12.5'), Decimal('7.5'), Decimal('5'))
+
+
+def _decimal_allocate(plan, general_fund_id, total_amount):
+    """The quick split as it was done on Decimals, for comparison."""
+    allocations = []
+    total_allocated = Decimal('0.00')
+    for fund_id, fraction in plan:
+        amount = (total_amount * fraction).quantize(CENTS, rounding=ROUND_HALF_UP)
+        if amount > Decimal('0.00'):
+            allocations.append((fund_id, amount))
+            total_allocated += amount
+    remainder = total_amount - total_allocated
+    if remainder > Decimal('0.00'):
+        allocations.append((general_fund_id, remainder))
+    return allocations
+
+
+class Command(BaseCommand):
+    help = 'Time money aggregation and allocation on integer centavos against the Decimal way (seeds and rolls back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Transactions to seed (rolled back afterwards).')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark; the best one is reported.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.repeat = max(1, options['repeat'])
+
+        with transaction.atomic():
+            fund_ids = self.seed(rng, options['rows'])
+            results = [
+                self.sum_by_fund(fund_ids),
+                self.read_amounts(fund_ids),
+                self.python_totals(fund_ids),
+                self.allocation(rng, options['rows']),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{options['rows']} transactions, best of {self.repeat} runs")
+        self.stdout.write(f"{'benchmark':<28} {'decimal ms':>11} {'centavos ms':>12} {'speedup':>8}")
+        for name, decimal_seconds, cents_seconds in results:
+            self.stdout.write(
+                f"{name:<28} {decimal_seconds * 1000:>11.2f} {cents_seconds * 1000:>12.2f} "
+                f"{decimal_seconds / cents_seconds:>7.1f}x"
+            )
+
+    def best(self, function):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def seed(self, rng, rows):
+        user = Treasurer.objects.create(username='benchmark-money', email='benchmark-money@example.invalid')
+        Fund.objects.bulk_create([
+            Fund(name=f"Benchmark Fund {i}", fund_type=f"benchmark-{i}", created_by=user)
+            for i in range(len(PERCENTAGES))
+        ])
+        fund_ids = [fund.pk for fund in Fund.objects.filter(created_by=user)]
+        Transaction.objects.bulk_create([
+            Transaction(
+                fund_id=rng.choice(fund_ids),
+                transaction_type='OFFERING' if rng.random() < 0.8 else 'WITHDRAWAL',
+                amount=Money.from_cents(rng.randrange(100, 500000)),
+                description='benchmark',
+                created_by=user,
+            )
+            for _ in range(rows)
+        ], batch_size=1000)
+        return fund_ids
+
+    def _as_decimal(self):
+        # What a DECIMAL column amounted to on SQLite: a REAL, converted per value
+        return ExpressionWrapper(F('amount') / Value(100.0), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    def sum_by_fund(self, fund_ids):
+        queryset = Transaction.objects.filter(fund_id__in=fund_ids).values('fund').order_by()
+        decimal = self.best(lambda: list(queryset.annotate(total=Sum(self._as_decimal()))))
+        # As myapp.reports does it: integer SUM, left as centavos
+        cents = self.best(lambda: list(queryset.annotate(total=sum_cents('amount'))))
+        return 'SUM by fund (database)', decimal, cents
+
+    def read_amounts(self, fund_ids):
+        queryset = Transaction.objects.filter(fund_id__in=fund_ids).order_by()
+        decimal = self.best(lambda: list(queryset.annotate(value=self._as_decimal()).values_list('value', flat=True)))
+        cents = self.best(lambda: list(queryset.values_list('amount', flat=True)))
+        return 'read amounts (per row)', decimal, cents
+
+    def python_totals(self, fund_ids):
+        rows = list(Transaction.objects.filter(fund_id__in=fund_ids).values_list('fund_id', 'amount'))
+        decimal_rows = [(fund_id, Decimal(amount)) for fund_id, amount in rows]
+        cent_rows = [(fund_id, amount.cents) for fund_id, amount in rows]
+
+        def total(source, zero):
+            totals = {}
+            for fund_id, amount in source:
+                totals[fund_id] = totals.get(fund_id, zero) + amount
+            return totals
+
+        assert {k: to_cents(v) for k, v in total(decimal_rows, Decimal('0.00')).items()} == total(cent_rows, 0)
+        decimal = self.best(lambda: total(decimal_rows, Decimal('0.00')))
+        cents = self.best(lambda: total(cent_rows, 0))
+        return 'per-fund totals (Python)', decimal, cents
+
+    def allocation(self, rng, count):
+        funds = [
+            FundInfo(i + 1, GENERAL_FUND_NAME if i == 0 else f"Fund {i}", f"fund-{i}", percentage)
+            for i, percentage in enumerate(PERCENTAGES)
+        ]
+        registry = FundRegistry(funds, 'benchmark')
+        plan = [(fund_id, Decimal(share) / Decimal('10000')) for fund_id, share in registry.split_plan]
+        amounts = [Money.from_cents(rng.randrange(100, 5000000)) for _ in range(count)]
+
+        for amount in amounts[:1000]:
+            assert _decimal_allocate(plan, 1, amount) == registry.allocate(amount)
+
+        # Every allocation becomes a TransactionSplit row, so include preparing
+        # the amounts for the INSERT: formatting for DECIMAL, an int for MoneyField
+        connection = connections[DEFAULT_DB_ALIAS]
+        decimal_field = DecimalField(max_digits=10, decimal_places=2)
+        money_field = TransactionSplit._meta.get_field('amount_allocated')
+
+        def split(allocate, field):
+            for amount in amounts:
+                for _, allocated in allocate(amount):
+                    field.get_db_prep_save(allocated, connection)
+
+        decimal = self.best(lambda: split(lambda amount: _decimal_allocate(plan, 1, amount), decimal_field))
+        cents = self.best(lambda: split(registry.allocate, money_field))
+        return 'quick split rows', decimal, cents
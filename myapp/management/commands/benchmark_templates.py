@@ -0,0 +1,148 @@
+import importlib.util
+import random
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import HttpResponse
+from django.template import engines
+from django.template.backends.jinja2 import Jinja2
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from myapp import views
+from myapp.models import Fund, Transaction, Treasurer
+from myapp.money import Money
+
+FUND_NAMES = ('General Fund', 'Building Fund', 'Mission Fund', 'Youth Fund', 'Music Fund', 'Benevolence Fund')
+
+
+def _jinja2_engine(**overrides):
+    """The JINJA2_TEMPLATE_ENGINE backend, built directly (as engines[] would) for when it is not enabled."""
+    params = {key: value for key, value in settings.JINJA2_TEMPLATE_ENGINE.items() if key != 'BACKEND'}
+    return Jinja2({**params, **overrides})
+
+
+class Command(BaseCommand):
+    help = 'Time rendering the hot pages with the Django and Jinja2 engines (seeds and rolls back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Transactions to seed (rolled back afterwards).')
+        parser.add_argument('--renders', type=int, default=200, help='Renders per page and engine in each run.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark; the best one is reported.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('jinja2') is None:
+            raise CommandError('jinja2 is not installed.')
+        self.repeat = max(1, options['repeat'])
+        self.renders = max(1, options['renders'])
+        jinja = engines['jinja2'] if settings.JINJA2_TEMPLATES else _jinja2_engine()
+
+        with transaction.atomic():
+            user = self.seed(random.Random(options['seed']), options['rows'])
+            pages = [
+                self.capture(views.index, self.request('/', AnonymousUser())),
+                self.capture(views.transactions_list_view, self.request('/transactions/', user)),
+                self.capture(views.profile_view, self.request('/profile/', user)),
+            ]
+            results = [(name, *self.compare(jinja, name, context, request)) for name, context, request in pages]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{options['rows']} transactions, {self.renders} renders per run, best of {self.repeat} runs")
+        self.stdout.write(f"{'page':<18} {'django ms':>10} {'jinja2 ms':>10} {'speedup':>8}")
+        for name, django_seconds, jinja_seconds in results:
+            self.stdout.write(
+                f"{name:<18} {django_seconds * 1000 / self.renders:>10.3f} {jinja_seconds * 1000 / self.renders:>10.3f} "
+                f"{django_seconds / jinja_seconds:>7.1f}x"
+            )
+        self.load_times()
+
+    def best(self, function):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def seed(self, rng, rows):
+        user = Treasurer.objects.create(
+            username='benchmark-templates', email='benchmark-templates@example.invalid',
+            first_name='Bench', last_name='Mark', is_approved=True,
+        )
+        Fund.objects.bulk_create([
+            Fund(name=name, fund_type=f"benchmark-{i}", created_by=user, current_balance=Money.from_cents(rng.randrange(10**8)))
+            for i, name in enumerate(FUND_NAMES)
+        ])
+        fund_ids = list(Fund.objects.filter(created_by=user).values_list('pk', flat=True))
+        Transaction.objects.bulk_create([
+            Transaction(
+                fund_id=rng.choice(fund_ids),
+                transaction_type='OFFERING' if rng.random() < 0.8 else 'WITHDRAWAL',
+                amount=Money.from_cents(rng.randrange(100, 500000)),
+                description='benchmark offering ' * rng.randrange(1, 8),
+                created_by=user,
+                fund_label='benchmark',
+            )
+            for _ in range(rows)
+        ], batch_size=1000)
+        return user
+
+    def request(self, path, user):
+        request = RequestFactory().get(path)
+        request.user = user
+        request.session = {}
+        return request
+
+    def capture(self, view, request):
+        """(template name, context) the view renders, with the context exactly as the view builds it."""
+        captured = {}
+
+        def render(request, template_name, context=None, **kwargs):
+            captured.update(name=template_name, context=context)
+            return HttpResponse()
+
+        with mock.patch.object(views, 'render', render):
+            view(request)
+        # Evaluate lazy querysets once, so both engines render the same rows
+        context = {
+            key: list(value) if hasattr(value, '_fetch_all') else value
+            for key, value in captured['context'].items()
+        }
+        return captured['name'], context, request
+
+    def compare(self, jinja, name, context, request):
+        django_template = engines['django'].get_template(name)
+        jinja_template = jinja.get_template(name)
+
+        def run(template):
+            for _ in range(self.renders):
+                template.render(context, request)
+
+        return self.best(lambda: run(django_template)), self.best(lambda: run(jinja_template))
+
+    def load_times(self):
+        """Loading a template in a fresh worker: compiling it, or reading the bytecode cache."""
+        directory = tempfile.mkdtemp()
+        try:
+            def load():
+                with override_settings(JINJA2_BYTECODE_CACHE_DIR=directory):
+                    engine = _jinja2_engine(NAME='jinja2-load')
+                    for name in ('index.html', 'transaction.html', 'profile.html'):
+                        engine.get_template(name)
+
+            started = time.perf_counter()
+            load()
+            compile_seconds = time.perf_counter() - started
+            cached_seconds = self.best(load)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(
+            f"jinja2 cold load of all three: {compile_seconds * 1000:.1f} ms compiling, "
+            f"{cached_seconds * 1000:.1f} ms from the bytecode cache"
+        )
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from myapp import balances
+
+class Command(BaseCommand):
+    help = 'Fold sharded fund balance deltas back into Fund.current_balance (see FUND_BALANCE_SHARDS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and compact every INTERVAL seconds (default: compact once).')
+
+    def handle(self, *args, **options):
+        while True:
+            folded = balances.compact()
+            if folded or options['verbosity'] > 1:
+                self.stdout.write(f"Compacted {len(folded)} fund(s).")
+            if options['interval'] <= 0:
+                break
+            # Don't hold a connection (or a stale SQLite snapshot) between rounds
+            connections.close_all()
+            time.sleep(options['interval'])
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from myapp import maintenance
+
+class Command(BaseCommand):
+    help = 'ANALYZE / PRAGMA optimize, incremental vacuum and WAL checkpoint in quiet windows, and record size figures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to maintain.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and try a round every INTERVAL seconds (default: one round).')
+        parser.add_argument('--force', action='store_true',
+                            help='Run even outside DB_MAINTENANCE_WINDOW or while transactions are coming in.')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Full ANALYZE instead of PRAGMA optimize.')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Switch the database to auto_vacuum=INCREMENTAL first (rewrites the file once).')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f"Unknown database alias '{alias}'.")
+
+        try:
+            if options['enable_incremental_vacuum']:
+                mode = maintenance.enable_incremental_vacuum(alias)
+                self.stdout.write(f"auto_vacuum is now {mode}.")
+
+            while True:
+                run = maintenance.run(alias, force=options['force'], analyze=options['analyze'])
+                if run is not None:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{alias}: {', '.join(run.actions)} in {run.duration_ms} ms; "
+                        f"{run.file_bytes / 1024:.1f} KB, {run.free_pages} free pages"
+                    ))
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f"{alias}: outside the maintenance window or not quiet; skipped.")
+                if options['interval'] <= 0:
+                    break
+                # Don't hold a connection (or a stale SQLite snapshot) between rounds
+                connections.close_all()
+                time.sleep(options['interval'])
+        except maintenance.MaintenanceError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,67 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from myapp import statements
+
+class Command(BaseCommand):
+    help = 'Render year-end giving statements per fund, branch or treasurer in parallel worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', choices=statements.PARTITIONS, default='fund',
+                            help='One statement per fund (default), church branch or treasurer.')
+        parser.add_argument('--year', type=int, default=timezone.localdate().year - 1,
+                            help='Calendar year to cover (default: last year).')
+        parser.add_argument('--output', default=settings.STATEMENTS_DIR,
+                            help='Output directory (default: STATEMENTS_DIR).')
+        parser.add_argument('--format', choices=statements.FORMATS, default='html', dest='fmt',
+                            help='html, or pdf (HTML plus a PDF rendered by WeasyPrint).')
+        parser.add_argument('--workers', type=int, default=settings.STATEMENT_WORKERS,
+                            help='Worker processes (default: STATEMENT_WORKERS).')
+        parser.add_argument('--force', action='store_true',
+                            help='Rewrite every statement even if its content hash is unchanged.')
+
+    def handle(self, *args, **options):
+        if options['fmt'] == 'pdf' and not statements.pdf_available():
+            raise CommandError('PDF output needs WeasyPrint; install it or use --format html.')
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        output_dir = os.path.abspath(options['output'])
+        jobs = statements.jobs(options['by'], options['year'], output_dir, options['fmt'], options['force'])
+        if not jobs:
+            self.stdout.write('Nothing to generate.')
+            return
+
+        manifest = statements.load_manifest(output_dir)
+        counts = {'written': 0, 'unchanged': 0, 'failed': 0}
+        started = time.perf_counter()
+
+        # Workers open their own database connections; they must not share ours
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(options['workers'], len(jobs)), initializer=django.setup) as executor:
+            futures = {executor.submit(statements.render_statement, job): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    counts['failed'] += 1
+                    self.stderr.write(f"   failed  {futures[future]['title']}: {e}")
+                    continue
+                counts[result['status']] += 1
+                manifest[result['name']] = result['hash']
+                self.stdout.write(
+                    f"{result['status']:>9}  {result['name']}  "
+                    f"{result['rows']} rows, {result['bytes'] / 1024:.1f} KB in {result['seconds']:.2f}s"
+                )
+
+        statements.save_manifest(output_dir, manifest)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(jobs)} statement(s) in {time.perf_counter() - started:.2f}s: "
+            f"{counts['written']} written, {counts['unchanged']} unchanged, {counts['failed']} failed -> {output_dir}"
+        ))
@@ -0,0 +1,26 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from myapp.models import Treasurer
+from myapp.thumbnails import generate_thumbnails, legacy_thumbnail_names
+
+class Command(BaseCommand):
+    help = 'Strip metadata from and regenerate thumbnails for every stored profile picture'
+
+    def handle(self, *args, **options):
+        names = Treasurer.objects.exclude(profile_picture='').exclude(
+            profile_picture__isnull=True
+        ).values_list('profile_picture', flat=True)
+
+        for name in names.iterator():
+            try:
+                generate_thumbnails(name)
+                self.stdout.write(f'Processed {name}')
+            except Exception as e:
+                self.stderr.write(f'Failed {name}: {e}')
+
+        # Thumbnails named without the original's extension could be shared by
+        # two pictures; nothing refers to them once every picture is rebuilt
+        for name in names.iterator():
+            for path in legacy_thumbnail_names(name):
+                if default_storage.exists(path):
+                    default_storage.delete(path)
@@ -0,0 +1,60 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from myapp import backups
+
+class Command(BaseCommand):
+    help = 'Verify a backup archive and restore it into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', nargs='?', help='Archive to restore (default: the newest in --output).')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to restore into.')
+        parser.add_argument('--output', default=settings.BACKUP_DIR, help='Backup directory (default: BACKUP_DIR).')
+        parser.add_argument('--verify-only', action='store_true', help='Check the archive without restoring it.')
+        parser.add_argument('--no-safety-backup', action='store_true',
+                            help='Skip the backup of the current database taken before restoring.')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation.')
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections:
+            raise CommandError(f"Unknown database alias '{options['database']}'.")
+        connection = connections[options['database']]
+
+        archive = options['archive']
+        if not archive:
+            found = backups.archives(options['output'], connection.alias)
+            if not found:
+                raise CommandError(f"No backups of '{connection.alias}' in {options['output']}.")
+            archive = found[-1]
+        if not os.path.exists(archive):
+            raise CommandError(f"{archive} does not exist.")
+
+        try:
+            meta = backups.verify(archive)
+        except (backups.BackupError, OSError) as e:
+            raise CommandError(f"Verification failed: {e}")
+        self.stdout.write(f"Verified {archive} (taken {meta['created']}, sha256 {meta['sha256'][:12]}).")
+        if options['verify_only']:
+            return
+
+        if options['interactive']:
+            answer = input(
+                f"This replaces every row in the '{connection.alias}' database with the backup.\n"
+                "Type 'yes' to continue, or 'no' to cancel: "
+            )
+            if answer != 'yes':
+                self.stdout.write('Restore cancelled.')
+                return
+
+        try:
+            if not options['no_safety_backup']:
+                # The backup just taken is exempt from rotation until the next run
+                safety = backups.backup(connection, options['output'], keep=0)
+                self.stdout.write(f"Saved the current database to {safety['path']}.")
+            backups.restore(connection, archive)
+        except (backups.BackupError, OSError) as e:
+            raise CommandError(f"Restore failed: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Restored {connection.alias} from {archive}."))
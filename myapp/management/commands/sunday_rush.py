@@ -0,0 +1,363 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+
+OPERATIONS = ('quick', 'multi', 'withdraw', 'read')
+DEFAULT_MIX = 'quick=35,multi=20,withdraw=15,read=30'
+CSRF_TOKEN = 'sundayrushsundayrushsundayrush32'
+
+SEED_FUNDS = [
+    ('General Fund', 'general', Decimal('50')),
+    ('Building Fund', 'building', Decimal('30')),
+    ('Mission Fund', 'mission', Decimal('20')),
+]
+SEED_BALANCE = Decimal('50000.00')
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        weights[name] = float(weight)
+    return weights
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Session:
+    """One simulated treasurer: their own cookies, their own connection, a weighted op mix."""
+
+    def __init__(self, port, cookies, funds, weights, seed):
+        self.port = port
+        self.cookie_header = '; '.join(f'{k}={v}' for k, v in cookies.items())
+        self.funds = funds
+        self.random = random.Random(seed)
+        self.names = list(weights)
+        self.weights = [weights[name] for name in self.names]
+        self.results = []
+
+    def request(self, method, path, data=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        headers = {'Cookie': self.cookie_header, 'Host': '127.0.0.1'}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers.update({
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-CSRFToken': CSRF_TOKEN,
+                'Referer': f'http://127.0.0.1:{self.port}/',
+            })
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.getheader('Set-Cookie', ''), response.read()
+        finally:
+            conn.close()
+
+    def run_once(self):
+        op = self.random.choices(self.names, self.weights)[0]
+        started = time.perf_counter()
+        try:
+            outcome = getattr(self, f'do_{op}')()
+        except Exception as e:
+            outcome = ('error', str(e))
+        self.results.append((op, time.perf_counter() - started, outcome[0], outcome[1]))
+
+    # --- OPERATIONS ---
+
+    def do_quick(self):
+        amount = self.random.randint(50, 5000)
+        return self.redirect_outcome(*self.request('POST', '/funds/quick-split/', {'total_offering_amount': amount}))
+
+    def do_multi(self):
+        chosen = self.random.sample(self.funds, k=min(2, len(self.funds)))
+        data = {f'fund_{fund_id}_amount': self.random.randint(10, 2000) for fund_id in chosen}
+        return self.redirect_outcome(*self.request('POST', '/funds/specific-multi/', data))
+
+    def do_withdraw(self):
+        data = {
+            'fund': self.random.choice(self.funds),
+            'amount': self.random.randint(10, 1500),
+            'transaction_type': 'Expense',
+            'description': 'Sunday rush withdrawal',
+        }
+        status, _, body = self.request('POST', '/funds/transaction/', data)
+        message = body.decode(errors='replace')
+        if status == 200:
+            return 'ok', ''
+        if status == 400 and 'Insufficient' in message:
+            return 'rejected', 'insufficient funds'
+        return 'error', f'HTTP {status}: {message[:200]}'
+
+    def do_read(self):
+        path = self.random.choice(['/', '/transactions/'])
+        status, _, _ = self.request('GET', path)
+        return ('ok', '') if status == 200 else ('error', f'HTTP {status} on {path}')
+
+    def redirect_outcome(self, status, set_cookie, body):
+        """Offering views always redirect; the outcome is in the flash message they set."""
+        if status != 302:
+            return 'error', f'HTTP {status}'
+        for text, level in self.flash_messages(set_cookie):
+            if level >= 40:
+                return 'error', text
+        return 'ok', ''
+
+    @staticmethod
+    def flash_messages(set_cookie):
+        from django.contrib.messages.storage.cookie import CookieStorage
+
+        cookie = SimpleCookie()
+        cookie.load(set_cookie)
+        morsel = cookie.get(CookieStorage.cookie_name)
+        if not morsel or not morsel.value:
+            return []
+        decoded = CookieStorage(HttpRequest())._decode(morsel.value) or []
+        return [(str(message), message.level) for message in decoded]
+
+
+class Command(BaseCommand):
+    help = 'Replay a Sunday-rush mix of offerings, withdrawals and dashboard reads against a local server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=12, help='Concurrent simulated treasurers')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds to keep posting')
+        parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                            help=f'Weighted operation mix (default: {DEFAULT_MIX})')
+        parser.add_argument('--server', choices=['runserver', 'gunicorn'], default='runserver')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--sqlite-timeout', type=float, help='Override SQLITE_TIMEOUT for the server')
+        parser.add_argument('--seed', type=int, default=7, help='Random seed for the operation mix')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch database and server log')
+        # Internal: run inside a subprocess pointed at the scratch database
+        parser.add_argument('--phase', choices=['prepare', 'verify'], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['phase'] == 'prepare':
+            return self.prepare(options['sessions'])
+        if options['phase'] == 'verify':
+            return self.verify()
+
+        workdir = tempfile.mkdtemp(prefix='sunday_rush_')
+        env = dict(
+            os.environ,
+            SQLITE_PATH=os.path.join(workdir, 'rush.sqlite3'),
+            CACHE_DIR=os.path.join(workdir, 'cache'),
+            DEBUG='True',
+        )
+        env.pop('DB_REPLICA_PATH', None)
+        if options['sqlite_timeout'] is not None:
+            env['SQLITE_TIMEOUT'] = str(options['sqlite_timeout'])
+
+        self.stdout.write(f"Preparing scratch database in {workdir} ...")
+        seeded = json.loads(self.manage(env, '--phase', 'prepare', '--sessions', str(options['sessions'])))
+
+        log_path = os.path.join(workdir, 'server.log')
+        with open(log_path, 'w') as log:
+            server = subprocess.Popen(self.server_command(options), cwd=settings.BASE_DIR, env=env,
+                                      stdout=log, stderr=subprocess.STDOUT)
+            try:
+                self.wait_for_server(options['port'], server)
+                elapsed, sessions = self.rush(options, seeded)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        verified = json.loads(self.manage(env, '--phase', 'verify'))
+        with open(log_path) as log:
+            locked_in_log = log.read().count('database is locked')
+
+        self.report(options, elapsed, sessions, verified, locked_in_log)
+        if options['keep']:
+            self.stdout.write(f"Scratch files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # --- SETUP ---
+
+    def manage(self, env, *args):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'sunday_rush', *args],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr)
+        return result.stdout.strip().splitlines()[-1]
+
+    def server_command(self, options):
+        address = f"127.0.0.1:{options['port']}"
+        if options['server'] == 'gunicorn':
+            return ['gunicorn', 'myproject.asgi:application', '-k', 'uvicorn.workers.UvicornWorker',
+                    '-w', str(options['workers']), '-b', address]
+        return [sys.executable, 'manage.py', 'runserver', address, '--noreload']
+
+    def wait_for_server(self, port, server):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Server exited during startup; see the server log (--keep).')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                conn.request('GET', '/login/')
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                time.sleep(0.5)
+        raise CommandError('Server did not start within 60 seconds.')
+
+    def prepare(self, session_count):
+        """Migrates and seeds the scratch database; prints session cookies as JSON."""
+        from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+        from importlib import import_module
+
+        from myapp.models import Fund, Transaction, Treasurer
+
+        call_command('migrate', verbosity=0)
+        admin = Treasurer.objects.create_superuser(
+            username='rush-admin', email='rush-admin@example.com', password=None, is_approved=True,
+        )
+        funds = []
+        for name, fund_type, percentage in SEED_FUNDS:
+            fund = Fund.objects.create(name=name, fund_type=fund_type, default_percentage=percentage,
+                                       current_balance=SEED_BALANCE, created_by=admin)
+            Transaction.objects.create(fund=fund, transaction_type='OFFERING', amount=SEED_BALANCE,
+                                       description='Opening balance', created_by=admin)
+            funds.append(fund.pk)
+
+        engine = import_module(settings.SESSION_ENGINE)
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        cookies = []
+        for i in range(session_count):
+            treasurer = Treasurer.objects.create_user(
+                username=f'rush-{i}', email=f'rush-{i}@example.com', password=None, is_approved=True,
+            )
+            session = engine.SessionStore()
+            session[SESSION_KEY] = str(treasurer.pk)
+            session[BACKEND_SESSION_KEY] = backend
+            session[HASH_SESSION_KEY] = treasurer.get_session_auth_hash()
+            session.save()
+            cookies.append({settings.SESSION_COOKIE_NAME: session.session_key,
+                            settings.CSRF_COOKIE_NAME: CSRF_TOKEN})
+
+        self.stdout.write(json.dumps({'funds': funds, 'cookies': cookies}))
+
+    def verify(self):
+        """Compares every fund balance with what its transactions and splits add up to."""
+        from myapp import balances, reports
+        from myapp.models import Transaction
+
+        totals = reports.grouped_totals(
+            'year',
+            reports.local_midnight(date(2000, 1, 1)),
+            reports.local_midnight(date.today() + timedelta(days=1)),
+        )
+        expected = {}
+        for funds in totals.values():
+            for fund_id, (income, expense) in funds.items():
+                expected[fund_id] = expected.get(fund_id, Decimal('0.00')) + income - expense
+
+        mismatches = {
+            str(fund_id): {'balance': str(balance), 'ledger': str(expected.get(fund_id, 0))}
+            for fund_id, balance in balances.current(cached=False).items()
+            if balance != expected.get(fund_id, Decimal('0.00'))
+        }
+        self.stdout.write(json.dumps({
+            'transactions': Transaction.objects.count(),
+            'mismatches': mismatches,
+        }))
+
+    # --- LOAD ---
+
+    def rush(self, options, seeded):
+        sessions = [
+            Session(options['port'], cookies, seeded['funds'], options['mix'], options['seed'] + i)
+            for i, cookies in enumerate(seeded['cookies'])
+        ]
+        start = threading.Barrier(len(sessions) + 1)
+        deadline = []
+
+        def worker(session):
+            start.wait()
+            while time.monotonic() < deadline[0]:
+                session.run_once()
+
+        threads = [threading.Thread(target=worker, args=(session,), daemon=True) for session in sessions]
+        for thread in threads:
+            thread.start()
+
+        self.stdout.write(f"Rushing with {len(sessions)} sessions for {options['duration']:.0f}s ...")
+        began = time.monotonic()
+        deadline.append(began + options['duration'])
+        start.wait()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - began, sessions
+
+    # --- REPORT ---
+
+    def report(self, options, elapsed, sessions, verified, locked_in_log):
+        results = [result for session in sessions for result in session.results]
+        writes = [r for r in results if r[0] != 'read']
+        ok_writes = sum(1 for r in writes if r[2] == 'ok')
+        lock_errors = sum(1 for r in results if r[2] == 'error' and 'locked' in r[3])
+        errors = [r for r in results if r[2] == 'error']
+
+        self.stdout.write('')
+        self.stdout.write(f"Server: {options['server']}  sessions: {len(sessions)}  elapsed: {elapsed:.1f}s")
+        self.stdout.write(f"Requests: {len(results)}  ({len(results) / elapsed:.1f} req/s)")
+        self.stdout.write(f"Committed writes: {ok_writes}  ({ok_writes / elapsed:.1f} writes/s)")
+        self.stdout.write('')
+        self.stdout.write(f"{'operation':<10}{'count':>7}{'ok':>7}{'rej':>6}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for op in OPERATIONS + ('all',):
+            rows = results if op == 'all' else [r for r in results if r[0] == op]
+            if not rows:
+                continue
+            latencies = sorted(r[1] * 1000 for r in rows)
+            self.stdout.write(
+                f"{op:<10}{len(rows):>7}"
+                f"{sum(1 for r in rows if r[2] == 'ok'):>7}"
+                f"{sum(1 for r in rows if r[2] == 'rejected'):>6}"
+                f"{sum(1 for r in rows if r[2] == 'error'):>6}"
+                f"{percentile(latencies, 50):>9.1f}{percentile(latencies, 95):>9.1f}{percentile(latencies, 99):>9.1f}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write(f"Lock-timeout errors: {lock_errors} reported to clients, "
+                          f"{locked_in_log} 'database is locked' lines in the server log")
+        for op, _, _, detail in errors[:5]:
+            self.stdout.write(f"  {op}: {detail[:160]}")
+
+        seeded_transactions = len(SEED_FUNDS)
+        self.stdout.write(f"Transactions in database: {verified['transactions']} "
+                          f"(expected {seeded_transactions + ok_writes} from committed writes)")
+        if verified['mismatches']:
+            self.stdout.write(self.style.ERROR(f"Balance consistency: FAILED {verified['mismatches']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Balance consistency: OK (every fund matches its ledger)'))
@@ -0,0 +1,24 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from myapp.routers import REPLICA_ALIAS, replica_configured
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the stand-in replica (DB_REPLICA_PATH)'
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('No replica database configured; set DB_REPLICA_PATH.')
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        replica = connections[REPLICA_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite databases; real replicas use streaming replication.')
+
+        primary.ensure_connection()
+        # Online backup API: consistent snapshot without locking out writers for long
+        with sqlite3.connect(str(replica.settings_dict['NAME'])) as target:
+            primary.connection.backup(target)
+        connections.close_all()
+        self.stdout.write(f"Replica {replica.settings_dict['NAME']} refreshed from the primary.")
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:07
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_split_summary(apps, schema_editor):
+    Transaction = apps.get_model('myapp', 'Transaction')
+    batch = []
+
+    transactions = Transaction.objects.select_related('fund').prefetch_related('splits__fund')
+    for trans in transactions.iterator(chunk_size=500):
+        splits = list(trans.splits.all())
+        if splits:
+            trans.split_summary = [
+                {
+                    'fund': split.fund_id,
+                    'name': split.fund.name,
+                    'amount': str(split.amount_allocated),
+                    'percentage': str(
+                        (split.amount_allocated / trans.amount * 100).quantize(Decimal('0.01'))
+                        if trans.amount else Decimal('0.00')
+                    ),
+                }
+                for split in splits
+            ]
+            trans.split_count = len(splits)
+            trans.fund_label = f"Split to {len(splits)} funds"
+        elif trans.fund_id:
+            trans.fund_label = trans.fund.name
+        else:
+            continue
+
+        batch.append(trans)
+        if len(batch) >= 500:
+            Transaction.objects.bulk_update(batch, ['split_count', 'split_summary', 'fund_label'])
+            batch = []
+
+    if batch:
+        Transaction.objects.bulk_update(batch, ['split_count', 'split_summary', 'fund_label'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_treasurer_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fund_label',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='split_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='split_summary',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill_split_summary, migrations.RunPython.noop),
+    ]
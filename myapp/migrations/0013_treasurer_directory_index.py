@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_auditentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='treasurer',
+            index=models.Index(fields=['is_approved', 'is_active', 'username'], name='treasurer_directory'),
+        ),
+    ]
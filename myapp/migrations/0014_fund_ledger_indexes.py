@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_treasurer_directory_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['fund', '-id'], name='transaction_fund_ledger'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionsplit',
+            index=models.Index(fields=['fund', '-parent_transaction', '-id'], name='split_fund_ledger'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_fund_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundBalanceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('delta', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fund', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_shards', to='myapp.fund')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='fundbalanceshard',
+            constraint=models.UniqueConstraint(fields=('fund', 'shard'), name='unique_fund_balance_shard'),
+        ),
+    ]
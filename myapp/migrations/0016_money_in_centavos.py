@@ -0,0 +1,55 @@
+from django.db import migrations, models
+import myapp.money
+
+
+def to_centavos(model, table, name, old_field, new_field):
+    """
+    Operations that turn the DecimalField `name` into a MoneyField without
+    losing a centavo: the values are copied into a new integer column as
+    ROUND(value * 100), then the new column replaces the old one.
+
+    The old field is given a default first so the migration can be reversed
+    on a table that has rows.
+    """
+    cents = f'{name}_cents'
+    return [
+        migrations.AlterField(model_name=model, name=name, field=old_field),
+        migrations.AddField(model_name=model, name=cents, field=models.BigIntegerField(default=0)),
+        migrations.RunSQL(
+            f'UPDATE {table} SET {cents} = CAST(ROUND({name} * 100) AS BIGINT)',
+            f'UPDATE {table} SET {name} = {cents} / 100.0',
+        ),
+        migrations.RemoveField(model_name=model, name=name),
+        migrations.RenameField(model_name=model, old_name=cents, new_name=name),
+        migrations.AlterField(model_name=model, name=name, field=new_field),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0015_fund_balance_shard'),
+    ]
+
+    operations = [
+        *to_centavos(
+            'fund', 'myapp_fund', 'current_balance',
+            models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            myapp.money.MoneyField(default=0),
+        ),
+        *to_centavos(
+            'transaction', 'myapp_transaction', 'amount',
+            models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            myapp.money.MoneyField(),
+        ),
+        *to_centavos(
+            'transactionsplit', 'myapp_transactionsplit', 'amount_allocated',
+            models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            myapp.money.MoneyField(),
+        ),
+        *to_centavos(
+            'fundbalanceshard', 'myapp_fundbalanceshard', 'delta',
+            models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            myapp.money.MoneyField(default=0),
+        ),
+    ]
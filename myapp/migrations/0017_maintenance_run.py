@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_money_in_centavos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(default='default', max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('actions', models.JSONField(blank=True, default=list)),
+                ('file_bytes', models.BigIntegerField(default=0)),
+                ('wal_bytes', models.BigIntegerField(default=0)),
+                ('page_size', models.PositiveIntegerField(default=0)),
+                ('page_count', models.BigIntegerField(default=0)),
+                ('free_pages', models.BigIntegerField(default=0)),
+                ('sizes', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['alias', '-created_at'], name='maintenance_run_history')],
+            },
+        ),
+    ]
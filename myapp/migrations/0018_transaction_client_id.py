@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0017_maintenance_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='client_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('created_by', 'client_id'), name='transaction_client_id_unique'),
+        ),
+    ]
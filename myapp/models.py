@@ -1,5 +1,11 @@
+from decimal import Decimal
+
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+from .money import MoneyField
 
 class Treasurer(AbstractUser):
     first_name = models.CharField(max_length=30, blank=True, null=True)
@@ -39,6 +45,12 @@ class Treasurer(AbstractUser):
         related_query_name='treasurer'
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Treasurer directory: status filter, then keyset order on username
+            models.Index(fields=['is_approved', 'is_active', 'username'], name='treasurer_directory'),
+        ]
+
     def get_full_name(self):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
@@ -50,7 +62,7 @@ class Treasurer(AbstractUser):
 class Fund(models.Model):
     name = models.CharField(max_length=100)
     fund_type = models.CharField(max_length=50, unique=True)
-    current_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    current_balance = MoneyField(default=0)
     description = models.TextField(blank=True)
     created_by = models.ForeignKey('Treasurer', on_delete=models.CASCADE) 
     date_created = models.DateTimeField(auto_now_add=True)
@@ -78,13 +90,58 @@ class Transaction(models.Model):
         blank=True
     )
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MoneyField()
     description = models.TextField()
     created_by = models.ForeignKey(Treasurer, on_delete=models.CASCADE)
     transaction_date = models.DateTimeField(auto_now_add=True)
+
+    # Denormalized at write time so list pages render without joining splits:
+    # split_summary is [{"fund": id, "name": ..., "amount": "0.00", "percentage": "0.00"}, ...]
+    split_count = models.PositiveSmallIntegerField(default=0)
+    split_summary = models.JSONField(default=list, blank=True)
+    fund_label = models.CharField(max_length=150, blank=True, default='')
+    # Id the offline entry queue gave the entry (myapp.batch); a resent entry is a duplicate
+    client_id = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Fund ledger (myapp.ledger): a fund's direct transactions, newest first
+            models.Index(fields=['fund', '-id'], name='transaction_fund_ledger'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['created_by', 'client_id'], name='transaction_client_id_unique'),
+        ]
     
     def __str__(self):
         return f"{self.transaction_type} - ₱{self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self.fund_label and not self.split_count and self.fund_id:
+            self.fund_label = self.fund.name
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def split_fields(allocations, total_amount):
+        """
+        Denormalized split fields for a parent transaction of `total_amount`.
+
+        `allocations` is [(fund, amount), ...] where fund has .id and .name.
+        Pass the result to Transaction.objects.create(**...).
+        """
+        summary = []
+        for fund, amount in allocations:
+            percentage = (amount / total_amount * 100) if total_amount else Decimal('0')
+            summary.append({
+                'fund': fund.id,
+                'name': fund.name,
+                'amount': str(amount.quantize(Decimal('0.01'))),
+                'percentage': str(percentage.quantize(Decimal('0.01'))),
+            })
+        return {
+            'split_count': len(summary),
+            'split_summary': summary,
+            'fund_label': f"Split to {len(summary)} funds",
+        }
     
 class TransactionSplit(models.Model):
     """
@@ -105,10 +162,101 @@ class TransactionSplit(models.Model):
     )
     
     # The amount that went into this specific fund
-    amount_allocated = models.DecimalField(
-        max_digits=10, 
-        decimal_places=2
-    )
+    amount_allocated = MoneyField()
     
+    class Meta:
+        indexes = [
+            # Fund ledger (myapp.ledger): a fund's allocations, newest parent first
+            models.Index(fields=['fund', '-parent_transaction', '-id'], name='split_fund_ledger'),
+        ]
+
+    def __str__(self):
+        return f"{self.fund.name}: ₱{self.amount_allocated}"
+
+class FundBalanceShard(models.Model):
+    """
+    Balance change not yet folded into Fund.current_balance. Only used when
+    FUND_BALANCE_SHARDS > 1 (see myapp.balances); compact_balances zeroes
+    the shards again.
+    """
+    fund = models.ForeignKey('Fund', on_delete=models.CASCADE, related_name='balance_shards')
+    shard = models.PositiveSmallIntegerField()
+    delta = MoneyField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fund', 'shard'], name='unique_fund_balance_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.fund_id}#{self.shard}: ₱{self.delta}"
+
+class AuditEntry(models.Model):
+    """
+    Append-only record of a state-changing action. Written in batches by
+    myapp.audit; existing entries are never updated or deleted by the app.
+    """
+    actor = models.ForeignKey(
+        Treasurer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='audit_entries'
+    )
+    # Kept so the trail still reads correctly after the account is removed
+    actor_username = models.CharField(max_length=150, blank=True, default='')
+    action = models.CharField(max_length=50)
+    object_type = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=64, blank=True, default='')
+    before = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    after = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['object_type', 'object_id', '-created_at'], name='audit_object_history'),
+            models.Index(fields=['actor', '-created_at'], name='audit_actor_history'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_username or 'system'} {self.action} {self.object_type}#{self.object_id}"
+
+class MaintenanceRun(models.Model):
+    """
+    One dbmaintain round: what it did and the database's size figures
+    afterwards. The health page reads its trends from these (myapp.maintenance).
+    """
+    alias = models.CharField(max_length=50, default='default')
+    created_at = models.DateTimeField(default=timezone.now)
+    duration_ms = models.PositiveIntegerField(default=0)
+    actions = models.JSONField(default=list, blank=True)
+    file_bytes = models.BigIntegerField(default=0)
+    wal_bytes = models.BigIntegerField(default=0)
+    page_size = models.PositiveIntegerField(default=0)
+    page_count = models.BigIntegerField(default=0)
+    free_pages = models.BigIntegerField(default=0)
+    # {name: {"type": "table" | "index", "table": ..., "bytes": n, "unused": n, "rows": n | null}}
+    sizes = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['alias', '-created_at'], name='maintenance_run_history'),
+        ]
+
+    def __str__(self):
+        return f"{self.alias} {self.created_at:%Y-%m-%d %H:%M}: {', '.join(self.actions) or 'no changes'}"
+
+class ThrottleBucket(models.Model):
+    """
+    Token bucket in front of login/register (myapp.throttle). Rows are changed
+    with a single conditional UPDATE, so every worker sees the same count.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    # time.time() of the last change; tokens refill from here
+    updated = models.FloatField(db_index=True)
+
     def __str__(self):
-        return f"{self.fund.name}: ₱{self.amount_allocated}"
\ No newline at end of file
+        return f"{self.key}: {self.tokens:.2f}"
@@ -0,0 +1,93 @@
+"""
+Money stored as integer centavos.
+
+Amounts and balances live in MoneyField columns: BIGINT centavos, so the
+database adds them with native integer arithmetic, and Python code that
+totals or allocates amounts does so on ints (see reports, registry.allocate).
+Python only sees Money at the edges (model attributes, forms, templates,
+JSON), a Decimal subclass with exactly two places, so existing code that
+formats or compares amounts keeps working.
+
+Decimals never reach the database: MoneyField converts on the way in, and
+F() updates add cents (`F('amount') + to_cents(delta)`).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+
+CENTS = Decimal('0.01')
+
+
+def to_cents(value):
+    """Integer centavos of a peso amount (Decimal, str, int or float), rounded half-up."""
+    if type(value) is Money:
+        # Always exactly two places, so no rounding needed
+        return int(value.scaleb(2))
+    if isinstance(value, float):
+        value = repr(value)
+    return int(Decimal(value).quantize(CENTS, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+class Money(Decimal):
+    """A peso amount with exactly two decimal places."""
+    __slots__ = ()
+
+    def __new__(cls, value='0'):
+        if isinstance(value, float):
+            value = repr(value)
+        return super().__new__(cls, Decimal(value).quantize(CENTS, rounding=ROUND_HALF_UP))
+
+    @classmethod
+    def from_cents(cls, cents):
+        # '1001e-2' parses straight to Decimal('10.01'); cheaper than building and rescaling
+        return Decimal.__new__(cls, f"{int(cents)}e-2")
+
+    @property
+    def cents(self):
+        return int(self.scaleb(2))
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+
+def sum_cents(expression, **extra):
+    """Sum() of a MoneyField left as raw integer centavos, for totals added up in Python."""
+    return models.Sum(expression, output_field=models.BigIntegerField(), **extra)
+
+
+class MoneyField(models.BigIntegerField):
+    """Stores a peso amount as integer centavos and reads it back as Money."""
+    description = 'Amount (stored in centavos)'
+
+    def from_db_value(self, value, expression, connection):
+        # Also converts Sum() and other aggregates whose output is a MoneyField
+        return None if value is None else Money.from_cents(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        try:
+            return Money(value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'], code='invalid', params={'value': value},
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        try:
+            return to_cents(value)
+        except (InvalidOperation, TypeError, ValueError) as e:
+            raise e.__class__(f"Field '{self.name}' expected an amount but got {value!r}.") from e
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField,
+            'max_digits': 15,
+            'decimal_places': 2,
+            **kwargs,
+        })
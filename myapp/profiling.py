@@ -0,0 +1,221 @@
+"""
+On-demand request profiling for superusers.
+
+Add `?_profile=1` (cProfile) or `?_profile=sample` (a stack sampler) to a URL,
+or send an `X-Profile` header with the same values, while logged in as a
+superuser. That request alone is profiled: Python time per function,
+tracemalloc's top allocation sites, and the number and time of SQL queries.
+The result goes into a bounded in-memory ring of this worker process and is
+listed at /super-admin/profiles/. The response carries its id in
+X-Profile-Id.
+
+Requests without the flag only pay for a substring check on the query
+string and a header lookup. With PROFILER_ENABLED off the middleware
+removes itself at startup.
+
+Only one request per process is profiled at a time; tracemalloc is
+process-wide, so allocations made by other threads meanwhile are included.
+Streaming responses are profiled up to the point the response is returned.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+HEADER = 'X-Profile'
+MODES = {'1': 'cprofile', 'cprofile': 'cprofile', 'sample': 'sample'}
+
+_ring = deque(maxlen=settings.PROFILER_RING_SIZE)
+_ring_lock = threading.Lock()
+_busy = threading.Lock()
+
+
+def recent_profiles():
+    """Newest first."""
+    with _ring_lock:
+        return list(reversed(_ring))
+
+
+def get_profile(profile_id):
+    with _ring_lock:
+        return next((entry for entry in _ring if entry['id'] == profile_id), None)
+
+
+def requested_mode(request):
+    """'cprofile', 'sample' or None, without parsing the query string unless the flag is in it."""
+    value = request.headers.get(HEADER)
+    if value is None and settings.PROFILER_QUERY_PARAM in request.META.get('QUERY_STRING', ''):
+        value = request.GET.get(settings.PROFILER_QUERY_PARAM)
+    return MODES.get((value or '').lower())
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's Python stack every `interval` seconds."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiler-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.done = threading.Event()
+        self.samples = 0
+        self.own = Counter()
+        self.total = Counter()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_frame_key(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = _frame_key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    self.total[key] += 1
+                frame = frame.f_back
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+    def report(self, limit):
+        lines = [
+            f"{self.samples} samples every {self.interval * 1000:g} ms",
+            '',
+            f"{'total':>7} {'own':>7}  function",
+        ]
+        for key, total in self.total.most_common(limit):
+            lines.append(f"{total / max(self.samples, 1):>7.1%} {self.own[key] / max(self.samples, 1):>7.1%}  {key}")
+        return '\n'.join(lines)
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+class QueryCounter:
+    """execute_wrapper that counts and times SQL queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _allocations(before, after, limit):
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    return [
+        {
+            'where': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_kb': stat.size_diff / 1024,
+            'count': stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def profile_request(get_response, request, mode):
+    """Runs the rest of the stack under the profiler; returns (response, ring entry)."""
+    limit = settings.PROFILER_TOP_N
+    queries = QueryCounter()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    if mode == 'sample':
+        profiler = Sampler(threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL)
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = get_response(request)
+    finally:
+        duration = time.perf_counter() - started
+        if mode == 'sample':
+            profiler.stop()
+        else:
+            profiler.disable()
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+
+    if mode == 'sample':
+        report = profiler.report(limit)
+    else:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        report = output.getvalue()
+
+    entry = {
+        'id': uuid.uuid4().hex[:12],
+        'started': timezone.now(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': request.user.username,
+        'mode': mode,
+        'status': response.status_code,
+        'duration_ms': duration * 1000,
+        'queries': queries.count,
+        'query_ms': queries.seconds * 1000,
+        'peak_kb': peak / 1024,
+        'report': report,
+        'allocations': _allocations(before, after, limit),
+    }
+    with _ring_lock:
+        _ring.append(entry)
+    return response, entry
+
+
+class ProfilerMiddleware:
+    """Profiles the requests a superuser flags with ?_profile= or X-Profile (see module docstring)."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not request.user.is_superuser:
+            return self.get_response(request)
+
+        if not _busy.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile-Id'] = 'busy'
+            return response
+        try:
+            response, entry = profile_request(self.get_response, request, mode)
+        finally:
+            _busy.release()
+        response['X-Profile-Id'] = entry['id']
+        return response
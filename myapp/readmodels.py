@@ -0,0 +1,145 @@
+"""
+Compact read models for list pages and exports.
+
+List pages only show a handful of columns, so instead of hydrating full
+Transaction / Treasurer instances (every user column, full TextField
+descriptions) they read `values()` projections into `__slots__` rows.
+
+Descriptions are loaded as a short SQL-side preview. The full text is only
+fetched if a template or export actually reads `row.description`, and then
+for every truncated row of the same page in one query.
+"""
+from django.db.models.functions import Length, Substr
+
+PREVIEW_CHARS = 80
+
+TRANSACTION_FIELDS = (
+    'id', 'transaction_type', 'amount', 'transaction_date', 'fund_id', 'fund_label',
+    'split_count', 'split_summary', 'created_by_id',
+    'created_by__username', 'created_by__first_name', 'created_by__last_name',
+)
+
+TREASURER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'church_branch',
+    'is_active', 'is_approved', 'date_created',
+)
+
+
+def _full_name(first_name, last_name, username):
+    # Same as Treasurer.get_full_name()
+    if first_name and last_name:
+        return f"{first_name} {last_name}"
+    return username
+
+
+class TextLoader:
+    """Fetches the full descriptions of a page's truncated rows in one query."""
+    __slots__ = ('model', 'rows', 'loaded')
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = []
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        pending = {row.id: row for row in self.rows if row._description is None}
+        if pending:
+            texts = self.model.objects.filter(pk__in=pending).values_list('id', 'description')
+            for pk, text in texts:
+                pending[pk]._description = text
+
+
+class TransactionRow:
+    __slots__ = (
+        'id', 'transaction_type', 'amount', 'transaction_date', 'fund_id', 'fund_label',
+        'split_count', 'split_summary', 'created_by_id', 'recorder_name',
+        'description_preview', '_description', '_loader',
+    )
+
+    def __init__(self, values, loader=None):
+        self.id = values['id']
+        self.transaction_type = values['transaction_type']
+        self.amount = values['amount']
+        self.transaction_date = values['transaction_date']
+        self.fund_id = values['fund_id']
+        self.fund_label = values['fund_label']
+        self.split_count = values['split_count']
+        self.split_summary = values['split_summary']
+        self.created_by_id = values['created_by_id']
+        self.recorder_name = _full_name(
+            values['created_by__first_name'], values['created_by__last_name'], values['created_by__username'],
+        )
+
+        if 'description' in values:
+            self._description = self.description_preview = values['description']
+        else:
+            self.description_preview = values['description_preview']
+            # Short descriptions are already complete; long ones load on demand
+            complete = values['description_length'] <= PREVIEW_CHARS
+            self._description = self.description_preview if complete else None
+        self._loader = loader
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def description(self):
+        if self._description is None and self._loader is not None and not self._loader.loaded:
+            self._loader.load()
+        return self._description if self._description is not None else self.description_preview
+
+    def get_transaction_type_display(self):
+        return self.transaction_type.title()
+
+
+class TreasurerRow:
+    __slots__ = TREASURER_FIELDS
+
+    def __init__(self, values):
+        for field in TREASURER_FIELDS:
+            setattr(self, field, values[field])
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_full_name(self):
+        return _full_name(self.first_name, self.last_name, self.username)
+
+
+def transaction_values(queryset, full_text=False):
+    """The projection behind TransactionRow; slice or paginate it before calling transaction_rows()."""
+    if full_text:
+        return queryset.values(*TRANSACTION_FIELDS, 'description')
+    return queryset.annotate(
+        description_preview=Substr('description', 1, PREVIEW_CHARS),
+        description_length=Length('description'),
+    ).values(*TRANSACTION_FIELDS, 'description_preview', 'description_length')
+
+
+def transaction_rows(values):
+    """Rows for one page of transaction_values(); they share a single description loader."""
+    from .models import Transaction
+
+    loader = TextLoader(Transaction)
+    loader.rows = [TransactionRow(v, loader) for v in values]
+    return loader.rows
+
+
+def transaction_page(queryset, paginator_class, per_page, number):
+    """Paginator page whose object_list holds TransactionRows."""
+    page = paginator_class(transaction_values(queryset), per_page).get_page(number)
+    page.object_list = transaction_rows(page.object_list)
+    return page
+
+
+def iter_transaction_rows(queryset, chunk_size=2000):
+    """Streams rows with their full description, for exports."""
+    for values in transaction_values(queryset, full_text=True).iterator(chunk_size=chunk_size):
+        yield TransactionRow(values)
+
+
+def treasurer_rows(queryset):
+    return [TreasurerRow(values) for values in queryset.values(*TREASURER_FIELDS)]
@@ -0,0 +1,110 @@
+"""
+Per-worker registry of fund metadata and the compiled quick-split plan.
+
+Fund names, types and default percentages change rarely (create_fund,
+save_default_split) but are read on every offering. Each worker keeps an
+immutable snapshot and compares it against a version stamp in the shared
+cache; a committed metadata change bumps the stamp and every worker reloads
+on its next lookup. Balances are not part of the snapshot.
+"""
+import threading
+import uuid
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Fund
+from .money import Money, to_cents
+
+GENERAL_FUND_NAME = 'General Fund'
+VERSION_KEY = 'funds:registry:version'
+
+
+class FundInfo(namedtuple('FundInfo', ['id', 'name', 'fund_type', 'default_percentage'])):
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class FundRegistry:
+    def __init__(self, funds, version):
+        self.version = version
+        self.funds = {fund.id: fund for fund in funds}
+        self.by_name = sorted(funds, key=lambda fund: fund.name)
+        self.general_fund = next((fund for fund in funds if fund.name == GENERAL_FUND_NAME), None)
+
+        # Quick split plan: (fund_id, share in hundredths of a percent) for
+        # every non-general fund with a percentage, in id order; the general
+        # fund takes the remainder
+        self.split_plan = [
+            (fund.id, int(fund.default_percentage * 100))
+            for fund in funds
+            if fund.default_percentage > 0 and fund is not self.general_fund
+        ]
+
+    def get(self, fund_id):
+        return self.funds.get(int(fund_id))
+
+    def allocate(self, total_amount):
+        """
+        Splits `total_amount` by the default percentages.
+
+        Each split fund gets its share rounded half-up to centavos; the General
+        Fund receives whatever remains, which covers both its own percentage
+        and any rounding difference. When the shares add up to 100%, rounding
+        up can overshoot the total by a centavo or so; that is taken back from
+        the last funds of the plan. Returns [(fund_id, amount), ...].
+        """
+        # Worked out in integer centavos; (x + 5000) // 10000 rounds x / 10000 half-up
+        total = to_cents(total_amount)
+        allocations = []
+        allocated = 0
+        for fund_id, share in self.split_plan:
+            cents = (total * share + 5000) // 10000
+            if cents > 0:
+                allocations.append((fund_id, cents))
+                allocated += cents
+
+        if total > allocated:
+            allocations.append((self.general_fund.id, total - allocated))
+        excess = allocated - total
+        while excess > 0:
+            fund_id, cents = allocations.pop()
+            if cents > excess:
+                allocations.append((fund_id, cents - excess))
+            excess -= min(cents, excess)
+        return [(fund_id, Money.from_cents(cents)) for fund_id, cents in allocations]
+
+
+_lock = threading.Lock()
+_registry = None
+
+
+def get_registry():
+    """Returns the current snapshot, reloading it if another worker bumped the version."""
+    global _registry
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+
+    registry = _registry
+    if registry is None or registry.version != version:
+        with _lock:
+            # Read the version before the rows so a concurrent bump is never lost.
+            # Always from the primary: a lagging replica would pin stale metadata
+            # to the new version.
+            funds = [
+                FundInfo(*row)
+                for row in Fund.objects.using(DEFAULT_DB_ALIAS).order_by('id').values_list('id', 'name', 'fund_type', 'default_percentage')
+            ]
+            registry = _registry = FundRegistry(funds, version)
+    return registry
+
+
+def invalidate():
+    """Bumps the shared version once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
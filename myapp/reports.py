@@ -0,0 +1,183 @@
+"""
+Income / expense / net figures per fund per period.
+
+Direct transactions and TransactionSplit allocations are grouped in a single
+`UNION ALL` of two `GROUP BY` queries, truncated to the period in local time.
+Closed periods never change unless an old transaction is deleted, so they are
+cached per period and only the open (or evicted) periods hit the database.
+"""
+from datetime import datetime, time
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+from django.db.models import DateField, Q
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .models import Fund, Transaction, TransactionSplit
+from .money import Money, sum_cents
+
+PERIODS = {
+    'week': (TruncWeek, relativedelta(weeks=1)),
+    'month': (TruncMonth, relativedelta(months=1)),
+    'quarter': (TruncQuarter, relativedelta(months=3)),
+    'year': (TruncYear, relativedelta(years=1)),
+}
+
+ZERO = Decimal('0.00')
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def period_start(period, moment):
+    """First day (local time) of the period containing `moment` (a date or aware datetime)."""
+    if isinstance(moment, datetime):
+        moment = timezone.localtime(moment).date()
+    if period == 'week':
+        return moment - relativedelta(days=moment.weekday())
+    if period == 'month':
+        return moment.replace(day=1)
+    if period == 'quarter':
+        return moment.replace(month=(moment.month - 1) // 3 * 3 + 1, day=1)
+    return moment.replace(month=1, day=1)
+
+
+def local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_starts(period, start, end):
+    """Start dates of every period overlapping [start, end)."""
+    step = PERIODS[period][1]
+    current = period_start(period, start)
+    starts = []
+    while current < end:
+        starts.append(current)
+        current += step
+    return starts
+
+
+def _cache_key(period, start):
+    return f"report:{period}:{start.isoformat()}"
+
+
+def invalidate_periods(moment):
+    """Drops the cached figures of every period containing `moment`."""
+    cache.delete_many([_cache_key(period, period_start(period, moment)) for period in PERIODS])
+
+
+def grouped_totals(period, start, end):
+    """
+    One query: income/expense per (period, fund) for transactions in [start, end).
+
+    Split parents are represented by their TransactionSplit rows; everything
+    else by the transaction itself (fund None for orphaned rows).
+    """
+    trunc = PERIODS[period][0]
+    offering = Q(transaction_type='OFFERING')
+    withdrawal = Q(transaction_type='WITHDRAWAL')
+
+    direct = Transaction.objects.filter(
+        transaction_date__gte=start,
+        transaction_date__lt=end,
+        splits__isnull=True,
+    ).annotate(
+        period=trunc('transaction_date', output_field=DateField()),
+    ).values('period', 'fund').annotate(
+        income=sum_cents('amount', filter=offering),
+        expense=sum_cents('amount', filter=withdrawal),
+    ).order_by()
+
+    allocated = TransactionSplit.objects.filter(
+        parent_transaction__transaction_date__gte=start,
+        parent_transaction__transaction_date__lt=end,
+    ).annotate(
+        period=trunc('parent_transaction__transaction_date', output_field=DateField()),
+    ).values('period', 'fund').annotate(
+        income=sum_cents('amount_allocated', filter=Q(parent_transaction__transaction_type='OFFERING')),
+        expense=sum_cents('amount_allocated', filter=Q(parent_transaction__transaction_type='WITHDRAWAL')),
+    ).order_by()
+
+    # Added up as integer centavos; Money only in the result
+    totals = {}
+    for row in direct.union(allocated, all=True):
+        funds = totals.setdefault(row['period'], {})
+        income, expense = funds.get(row['fund'], (0, 0))
+        funds[row['fund']] = (income + int(row['income'] or 0), expense + int(row['expense'] or 0))
+    return {
+        period: {
+            fund_id: (Money.from_cents(income), Money.from_cents(expense))
+            for fund_id, (income, expense) in funds.items()
+        }
+        for period, funds in totals.items()
+    }
+
+
+def period_totals(period, start, end):
+    """
+    {period_start: {fund_id: (income, expense)}} for every period overlapping [start, end).
+
+    Closed periods are read from / written to the cache; a single query covers
+    the remaining ones.
+    """
+    step = PERIODS[period][1]
+    today = timezone.localdate()
+    starts = period_starts(period, start, end)
+    closed = [s for s in starts if s + step <= today]
+
+    cached = cache.get_many([_cache_key(period, s) for s in closed])
+    totals = {s: cached[_cache_key(period, s)] for s in closed if _cache_key(period, s) in cached}
+
+    missing = [s for s in starts if s not in totals]
+    if missing:
+        fresh = grouped_totals(period, local_midnight(missing[0]), local_midnight(missing[-1] + step))
+        for s in missing:
+            totals[s] = fresh.get(s, {})
+        cache.set_many(
+            {_cache_key(period, s): totals[s] for s in missing if s in closed},
+            CACHE_TIMEOUT,
+        )
+    return totals
+
+
+def build_report(period, start, end):
+    """Report rows for the template and CSV export, oldest period first."""
+    step = PERIODS[period][1]
+    totals = period_totals(period, start, end)
+    fund_names = dict(Fund.objects.values_list('id', 'name'))
+
+    rows = []
+    for start_day in sorted(totals):
+        funds = []
+        for fund_id, (income, expense) in totals[start_day].items():
+            funds.append({
+                'fund_id': fund_id,
+                'name': fund_names.get(fund_id, 'Unassigned'),
+                'income': income,
+                'expense': expense,
+                'net': income - expense,
+            })
+        funds.sort(key=lambda f: f['name'])
+        income = sum((f['income'] for f in funds), ZERO)
+        expense = sum((f['expense'] for f in funds), ZERO)
+        rows.append({
+            'start': start_day,
+            'end': start_day + step - relativedelta(days=1),
+            'funds': funds,
+            'income': income,
+            'expense': expense,
+            'net': income - expense,
+        })
+    return rows
+
+
+def net_growth(start, end):
+    """Net income (Income - Expense) across ALL funds for transactions in [start, end)."""
+    totals = Transaction.objects.filter(
+        transaction_date__gte=start,
+        transaction_date__lt=end,
+    ).aggregate(
+        income=sum_cents('amount', filter=Q(transaction_type='OFFERING')),
+        expense=sum_cents('amount', filter=Q(transaction_type='WITHDRAWAL')),
+    )
+    return Money.from_cents(int(totals['income'] or 0) - int(totals['expense'] or 0))
@@ -0,0 +1,155 @@
+"""
+Read-replica routing.
+
+Writes always go to `default`. Reads go to the `replica` alias only inside
+views marked with `use_replica`, and only when:
+
+  * the request is a GET/HEAD,
+  * the client has not written recently (PrimaryPinMiddleware sets a short
+    lived cookie after every unsafe request, so the redirect that follows an
+    offering reads its own write), and
+  * the replica is reachable and not lagging more than REPLICA_MAX_LAG seconds.
+
+Without a `replica` entry in DATABASES every read stays on `default`.
+"""
+import contextvars
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max, Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_read_alias = contextvars.ContextVar('read_alias', default=DEFAULT_DB_ALIAS)
+
+
+def replica_configured():
+    # Under test the replica is a mirror of the primary's test database; reads
+    # stay on `default`'s connection so they see the test's own transaction
+    return (
+        REPLICA_ALIAS in settings.DATABASES
+        and connections[REPLICA_ALIAS].settings_dict['NAME'] != connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    )
+
+
+# --- REPLICATION LAG GUARD ---
+
+_lag_lock = threading.Lock()
+_lag_checked_at = 0.0
+_replica_healthy = False
+
+
+def replica_lag():
+    """
+    Seconds the replica is behind the primary (None if it can't be reached).
+
+    PostgreSQL replicas report their replay position directly. Elsewhere (the
+    SQLite stand-in) the replica is behind since the oldest primary
+    transaction newer than anything it holds; measuring from the newest one
+    instead would call a replica hours behind current right after each write.
+    """
+    from .models import Transaction
+
+    try:
+        replica = connections[REPLICA_ALIAS]
+        if replica.vendor == 'postgresql':
+            with replica.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )
+                return float(cursor.fetchone()[0])
+
+        replicated = Transaction.objects.using(REPLICA_ALIAS).aggregate(latest=Max('transaction_date'))['latest']
+        missing = Transaction.objects.using(DEFAULT_DB_ALIAS)
+        if replicated is not None:
+            missing = missing.filter(transaction_date__gt=replicated)
+        oldest_missing = missing.aggregate(oldest=Min('transaction_date'))['oldest']
+    except DatabaseError:
+        logger.warning("Read replica unavailable", exc_info=True)
+        return None
+
+    if oldest_missing is None:
+        return 0.0
+    return max(0.0, (timezone.now() - oldest_missing).total_seconds())
+
+
+def replica_is_healthy():
+    """Lag check, re-run at most every REPLICA_LAG_CHECK_INTERVAL seconds per worker."""
+    global _lag_checked_at, _replica_healthy
+    now = time.monotonic()
+    if now - _lag_checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_healthy
+
+    with _lag_lock:
+        if now - _lag_checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag = replica_lag()
+            _replica_healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG
+            if not _replica_healthy:
+                logger.warning("Read replica lagging (%s s); reading from primary", lag)
+            _lag_checked_at = now
+    return _replica_healthy
+
+
+# --- ROUTING ---
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+def use_replica(view_func):
+    """Marks a read-only view (or the GET side of one) as safe to serve from the replica."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+            or not replica_configured()
+            or not replica_is_healthy()
+        ):
+            return view_func(request, *args, **kwargs)
+
+        token = _read_alias.set(REPLICA_ALIAS)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class PrimaryPinMiddleware:
+    """Pins a client to the primary for REPLICA_PIN_SECONDS after any write request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
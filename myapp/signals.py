@@ -0,0 +1,72 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import audit, balances, events, registry, timeseries
+from .backends import invalidate_cached_user
+from .models import Fund, Transaction, Treasurer
+from .reports import invalidate_periods
+
+
+# --- TREASURER CACHE INVALIDATION ---
+# Approvals, disable/enable and profile saves all go through Treasurer.save(),
+# so dropping the cached copy here keeps CachedModelBackend consistent.
+
+@receiver(post_save, sender=Treasurer)
+@receiver(post_delete, sender=Treasurer)
+def drop_cached_treasurer(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+# --- REPORT CACHE INVALIDATION ---
+# Closed report periods are cached; deleting an old transaction changes them.
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def drop_cached_report_periods(sender, instance, **kwargs):
+    if instance.transaction_date:
+        invalidate_periods(instance.transaction_date)
+
+
+# --- CHART SERIES INVALIDATION ---
+# Any committed change to a transaction or fund starts a new series version.
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Fund)
+@receiver(post_delete, sender=Fund)
+def bump_chart_series(sender, instance, **kwargs):
+    timeseries.invalidate()
+
+
+# --- FUND REGISTRY INVALIDATION ---
+# Balance-only saves don't touch the metadata the registry holds.
+
+@receiver(post_save, sender=Fund)
+@receiver(post_delete, sender=Fund)
+def bump_fund_registry(sender, instance, update_fields=None, **kwargs):
+    balances.invalidate()
+    if update_fields is not None and set(update_fields) <= {'current_balance'}:
+        return
+    registry.invalidate()
+
+
+# --- LIVE DASHBOARD EVENTS ---
+# Pushed to connected dashboards once the write commits.
+
+@receiver(post_save, sender=Transaction)
+def announce_transaction(sender, instance, created, **kwargs):
+    if created:
+        events.transaction_committed(instance)
+
+
+@receiver(post_delete, sender=Transaction)
+def announce_deleted_transaction(sender, instance, **kwargs):
+    events.transaction_committed(instance, deleted=True)
+
+
+# --- AUDIT BUFFER ---
+# Entries collected during a request are written after the response is sent.
+
+request_started.connect(audit.request_started, dispatch_uid='audit_request_started')
+request_finished.connect(audit.request_finished, dispatch_uid='audit_request_finished')
@@ -0,0 +1,262 @@
+"""
+Year-end giving statements.
+
+One document per partition: a fund, a church branch or a treasurer. The
+generate_statements command fans the partitions out over a
+ProcessPoolExecutor; each worker streams its ledger rows with chunked
+iterators and writes the HTML a few hundred rows at a time, hashing it as it
+goes. A statement whose hash matches the previous run's manifest is left
+untouched, so unchanged statements cost one read of their rows and no write
+(and, for PDF output, no PDF rendering).
+"""
+import hashlib
+import heapq
+import importlib.util
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+from . import balances
+from .models import Fund, Transaction, TransactionSplit, Treasurer
+from .money import Money, sum_cents, to_cents
+from .reports import local_midnight
+
+PARTITIONS = ('fund', 'branch', 'treasurer')
+FORMATS = ('html', 'pdf')
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+MANIFEST = 'manifest.json'
+NO_BRANCH = 'No Branch'
+
+ROW_FIELDS = ('id', 'date', 'type', 'amount', 'description', 'recorded_by', 'fund_label', 'allocations')
+
+
+def pdf_available():
+    """PDF output needs WeasyPrint, which is not a hard dependency."""
+    return importlib.util.find_spec('weasyprint') is not None
+
+
+def year_bounds(year):
+    return local_midnight(date(year, 1, 1)), local_midnight(date(year + 1, 1, 1))
+
+
+def partitions(by):
+    """[(key, title)] of every statement to produce, in a stable order."""
+    if by == 'fund':
+        return list(Fund.objects.order_by('name', 'id').values_list('id', 'name'))
+    if by == 'treasurer':
+        return list(Treasurer.objects.order_by('username').values_list('id', 'username'))
+    branches = Treasurer.objects.values_list('church_branch', flat=True).distinct().order_by('church_branch')
+    return sorted({(branch or '', branch or NO_BRANCH) for branch in branches}, key=lambda p: p[1])
+
+
+def document_name(by, key, title, year, fmt='html'):
+    """'2025/fund/3-building-fund.html'"""
+    stem = slugify(title) or 'statement'
+    if by != 'branch':
+        stem = f"{key}-{stem}"
+    return os.path.join(str(year), by, f"{stem}.{fmt}")
+
+
+def _fund_rows(fund_id, start, end, chunk_size):
+    """Direct transactions and split allocations of one fund, merged in date order."""
+    direct = Transaction.objects.filter(
+        fund_id=fund_id, splits__isnull=True,
+        transaction_date__gte=start, transaction_date__lt=end,
+    ).order_by('transaction_date', 'id').values_list(
+        'id', 'transaction_date', 'transaction_type', 'amount', 'description',
+        'created_by__username', 'fund_label',
+    )
+    # A split row carries its own allocated amount instead of the parent's total
+    allocated = TransactionSplit.objects.filter(
+        fund_id=fund_id,
+        parent_transaction__transaction_date__gte=start,
+        parent_transaction__transaction_date__lt=end,
+    ).order_by('parent_transaction__transaction_date', 'parent_transaction_id').values_list(
+        'parent_transaction_id', 'parent_transaction__transaction_date', 'parent_transaction__transaction_type',
+        'amount_allocated', 'parent_transaction__description', 'parent_transaction__created_by__username',
+        'parent_transaction__fund_label',
+    )
+
+    rows = heapq.merge(
+        direct.iterator(chunk_size=chunk_size),
+        allocated.iterator(chunk_size=chunk_size),
+        key=lambda row: (row[1], row[0]),
+    )
+    for row in rows:
+        yield dict(zip(ROW_FIELDS, (*row, [])))
+
+
+def _recorded_rows(condition, start, end, chunk_size):
+    """Transactions recorded by a branch or treasurer; split details come from split_summary."""
+    queryset = Transaction.objects.filter(
+        condition, transaction_date__gte=start, transaction_date__lt=end,
+    ).order_by('transaction_date', 'id').values_list(
+        'id', 'transaction_date', 'transaction_type', 'amount', 'description',
+        'created_by__username', 'fund_label', 'split_summary',
+    )
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield dict(zip(ROW_FIELDS, row))
+
+
+def ledger_rows(by, key, start, end, chunk_size=CHUNK_SIZE):
+    if by == 'fund':
+        return _fund_rows(key, start, end, chunk_size)
+    if by == 'treasurer':
+        return _recorded_rows(Q(created_by_id=key), start, end, chunk_size)
+    if key:
+        return _recorded_rows(Q(created_by__church_branch=key), start, end, chunk_size)
+    return _recorded_rows(
+        Q(created_by__church_branch__isnull=True) | Q(created_by__church_branch=''), start, end, chunk_size,
+    )
+
+
+def _net(queryset, amount, prefix=''):
+    totals = queryset.aggregate(
+        income=sum_cents(amount, filter=Q(**{f'{prefix}transaction_type': 'OFFERING'})),
+        expense=sum_cents(amount, filter=Q(**{f'{prefix}transaction_type': 'WITHDRAWAL'})),
+    )
+    return Money.from_cents(int(totals['income'] or 0) - int(totals['expense'] or 0))
+
+
+def opening_balance(fund_id, start):
+    """The fund's balance at `start`: today's balance less everything recorded since."""
+    since = _net(
+        Transaction.objects.filter(fund_id=fund_id, splits__isnull=True, transaction_date__gte=start),
+        'amount',
+    ) + _net(
+        TransactionSplit.objects.filter(fund_id=fund_id, parent_transaction__transaction_date__gte=start),
+        'amount_allocated', 'parent_transaction__',
+    )
+    balance = balances.get(fund_id, cached=False)
+    return balance - since
+
+
+def _write_pdf(html_path, pdf_path):
+    from weasyprint import HTML
+    HTML(filename=html_path).write_pdf(pdf_path)
+
+
+def render_statement(job):
+    """
+    Worker entry point: renders one statement and returns its result dict.
+
+    `job` holds by, key, title, year, output_dir, fmt, previous (manifest hash) and force.
+    """
+    started = time.perf_counter()
+    by, key, title, year = job['by'], job['key'], job['title'], job['year']
+    start, end = year_bounds(year)
+    name = document_name(by, key, title, year)
+    path = os.path.join(job['output_dir'], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # No generation timestamp in the document, so an unchanged ledger hashes the same
+    balance = opening_balance(key, start) if by == 'fund' else None
+    context = {'by': by, 'title': title, 'year': year, 'opening_balance': balance}
+
+    # Totals and the running balance are kept in integer centavos
+    balance = to_cents(balance) if balance is not None else None
+    digest = hashlib.sha256()
+    totals = {'OFFERING': 0, 'WITHDRAWAL': 0}
+    count = 0
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as output:
+            def write(text):
+                nonlocal size
+                data = text.encode('utf-8')
+                digest.update(data)
+                size += len(data)
+                output.write(text)
+
+            write(render_to_string('statements/header.html', context))
+            chunk = []
+            for row in ledger_rows(by, key, start, end):
+                cents = row['amount'].cents
+                totals[row['type']] = totals.get(row['type'], 0) + cents
+                if balance is not None:
+                    balance += cents if row['type'] == 'OFFERING' else -cents
+                    row['balance'] = Money.from_cents(balance)
+                chunk.append(row)
+                count += 1
+                if len(chunk) >= ROWS_PER_WRITE:
+                    write(render_to_string('statements/rows.html', {'rows': chunk, 'by': by}))
+                    chunk = []
+            if chunk:
+                write(render_to_string('statements/rows.html', {'rows': chunk, 'by': by}))
+            write(render_to_string('statements/footer.html', {
+                **context,
+                'count': count,
+                'offerings': Money.from_cents(totals['OFFERING']),
+                'withdrawals': Money.from_cents(totals['WITHDRAWAL']),
+                'net': Money.from_cents(totals['OFFERING'] - totals['WITHDRAWAL']),
+                'closing_balance': Money.from_cents(balance) if balance is not None else None,
+            }))
+
+        content_hash = digest.hexdigest()
+        outputs = [path]
+        if job['fmt'] == 'pdf':
+            outputs.append(os.path.splitext(path)[0] + '.pdf')
+
+        unchanged = (
+            not job['force']
+            and content_hash == job['previous']
+            and all(os.path.exists(output) for output in outputs)
+        )
+        if unchanged:
+            os.remove(temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+            if job['fmt'] == 'pdf':
+                _write_pdf(path, outputs[1])
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        'name': name,
+        'status': 'unchanged' if unchanged else 'written',
+        'hash': content_hash,
+        'rows': count,
+        'bytes': size,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST), encoding='utf-8') as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def jobs(by, year, output_dir, fmt='html', force=False):
+    """One job per partition, each carrying the hash its document had last time."""
+    manifest = load_manifest(output_dir)
+    return [
+        {
+            'by': by, 'key': key, 'title': title, 'year': year,
+            'output_dir': output_dir, 'fmt': fmt, 'force': force,
+            'previous': manifest.get(document_name(by, key, title, year)),
+        }
+        for key, title in partitions(by)
+    ]
@@ -0,0 +1,100 @@
+import io
+import os
+from fnmatch import fnmatch
+
+from django.conf import settings
+from PIL import Image
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - minification is skipped without it
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - minification is skipped without it
+    rjsmin = None
+
+
+def webp_variant_name(name, width):
+    """'img/poster.jpg', 480 -> 'img/poster-480w.webp'"""
+    base, _ = os.path.splitext(name)
+    return f"{base}-{width}w.webp"
+
+
+def minify(name, content):
+    """Minifies CSS/JS source text, returning it unchanged if no minifier is installed."""
+    if name.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin(content)
+    if name.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(content)
+    return content
+
+
+class PipelineStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Static build stage that runs inside `collectstatic`.
+
+    Before the usual WhiteNoise processing it:
+      1. minifies the app's CSS/JS (STATIC_MINIFY_PATTERNS),
+      2. writes the concatenated bundles listed in STATIC_BUNDLES,
+      3. renders the WebP widths listed in STATIC_RESPONSIVE_IMAGES.
+
+    The generated files are then content-hashed and pre-compressed (gzip, plus
+    brotli when the Brotli package is installed) like every other file, so
+    WhiteNoise serves them with far-future immutable cache headers.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.minify_files(paths)
+            self.build_bundles(paths)
+            self.build_webp_variants(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def _read(self, paths, name):
+        storage, path = paths[name]
+        with storage.open(path) as source:
+            return source.read()
+
+    def _write(self, paths, name, data):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as target:
+            target.write(data)
+        # Point the manifest stage at the generated copy, not the source file
+        paths[name] = (self, name)
+
+    def minify_files(self, paths):
+        patterns = getattr(settings, 'STATIC_MINIFY_PATTERNS', [])
+        for name in list(paths):
+            if not any(fnmatch(name, pattern) for pattern in patterns):
+                continue
+            source = self._read(paths, name).decode('utf-8')
+            self._write(paths, name, minify(name, source).encode('utf-8'))
+
+    def build_bundles(self, paths):
+        for bundle_name, members in getattr(settings, 'STATIC_BUNDLES', {}).items():
+            # Members are already minified at this point
+            parts = [self._read(paths, member).decode('utf-8') for member in members]
+            separator = '\n' if bundle_name.endswith('.css') else ';\n'
+            self._write(paths, bundle_name, separator.join(parts).encode('utf-8'))
+
+    def build_webp_variants(self, paths):
+        for name, widths in getattr(settings, 'STATIC_RESPONSIVE_IMAGES', {}).items():
+            if name not in paths:
+                continue
+            with Image.open(io.BytesIO(self._read(paths, name))) as image:
+                image.load()
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+                for width in widths:
+                    # Never upscale; widths larger than the source are skipped
+                    if width > image.width:
+                        continue
+                    height = round(image.height * width / image.width)
+                    variant = image.resize((width, height), Image.LANCZOS)
+                    output = io.BytesIO()
+                    variant.save(output, 'WEBP', quality=80, method=6)
+                    self._write(paths, webp_variant_name(name, width), output.getvalue())
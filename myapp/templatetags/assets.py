@@ -0,0 +1,93 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from myapp.staticfiles import PipelineStaticFilesStorage, webp_variant_name
+from myapp.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+def _pipeline_enabled():
+    return isinstance(staticfiles_storage, PipelineStaticFilesStorage)
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    Includes a CSS/JS bundle from STATIC_BUNDLES.
+
+    After `collectstatic` this is a single hashed file; in development (no build
+    stage) each member file is linked separately.
+    """
+    members = [name] if _pipeline_enabled() else settings.STATIC_BUNDLES[name]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(m),) for m in members))
+    return format_html_join('\n', '<script src="{}"></script>', ((static(m),) for m in members))
+
+
+@register.simple_tag
+def responsive_image(name, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """Renders an <img>, wrapped in a <picture> with WebP srcset when variants were built."""
+    img = format_html('<img src="{}" alt="{}" class="{}" loading="{}">', static(name), alt, css_class, loading)
+    if not _pipeline_enabled():
+        return img
+
+    widths = settings.STATIC_RESPONSIVE_IMAGES.get(name, [])
+    variants = [webp_variant_name(name, w) for w in widths]
+    srcset = ', '.join(
+        f"{static(variant)} {width}w"
+        for variant, width in zip(variants, widths)
+        if variant in staticfiles_storage.hashed_files
+    )
+    if not srcset:
+        return img
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+        srcset, sizes, img,
+    )
+
+
+def _retina_size(size):
+    """Smallest configured size with at least twice the pixels of `size`, if any."""
+    sizes = settings.PROFILE_THUMBNAIL_SIZES
+    larger = [name for name, px in sizes.items() if px >= 2 * sizes[size]]
+    return min(larger, key=sizes.get) if larger else None
+
+
+@register.simple_tag
+def avatar(treasurer, size='md', alt='', css_class=''):
+    """
+    Renders a treasurer's profile picture at one of PROFILE_THUMBNAIL_SIZES.
+
+    Uses the WebP/JPEG thumbnails once they exist, the original upload while
+    they are still being generated, and the default image otherwise.
+    """
+    pixels = settings.PROFILE_THUMBNAIL_SIZES[size]
+    if not treasurer.profile_picture:
+        return responsive_image('img/profile.png', alt=alt, css_class=css_class, sizes=f"{pixels}px")
+
+    name = treasurer.profile_picture.name
+    jpg = thumbnail_url(name, size, 'jpg')
+    if jpg is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" width="{}" height="{}">',
+            treasurer.profile_picture.url, alt, css_class, pixels, pixels,
+        )
+
+    retina = _retina_size(size)
+    sources = []
+    for ext in ('webp', 'jpg'):
+        srcset = thumbnail_url(name, size, ext)
+        retina_url = thumbnail_url(name, retina, ext) if retina else None
+        if retina_url:
+            srcset = f"{srcset} 1x, {retina_url} 2x"
+        sources.append((f"image/{'jpeg' if ext == 'jpg' else ext}", srcset))
+
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" width="{}" height="{}"></picture>',
+        format_html_join('', '<source type="{}" srcset="{}">', sources),
+        jpg, alt, css_class, pixels, pixels,
+    )
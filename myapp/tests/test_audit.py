@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from myapp import audit
+from myapp.models import AuditEntry, Fund, Transaction, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class AuditBufferTests(TestCase):
+    def setUp(self):
+        self.user = Treasurer.objects.create_user(username='auditor', password='pw', email='auditor@example.invalid')
+        self.addCleanup(audit._local.__dict__.clear)
+
+    def test_entries_are_written_when_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            audit.record(self.user, 'fund.update', 'fund', 7, before={'name': 'Old'}, after={'name': 'New'})
+            self.assertFalse(AuditEntry.objects.exists())
+
+        entry = AuditEntry.objects.get()
+        self.assertEqual((entry.actor, entry.actor_username), (self.user, 'auditor'))
+        self.assertEqual((entry.action, entry.object_type, entry.object_id), ('fund.update', 'fund', '7'))
+        self.assertEqual((entry.before, entry.after), ({'name': 'Old'}, {'name': 'New'}))
+
+    def test_rolled_back_writes_leave_no_entry(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    audit.record(self.user, 'fund.delete', 'fund', 7)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(AuditEntry.objects.exists())
+
+    def test_entries_of_a_request_are_written_in_one_insert_after_it(self):
+        audit.request_started()
+        with self.captureOnCommitCallbacks(execute=True):
+            for pk in range(1, 4):
+                audit.record(self.user, 'transaction.delete', 'transaction', pk)
+        self.assertFalse(AuditEntry.objects.exists())
+
+        with self.assertNumQueries(1):
+            audit.request_finished()
+        self.assertEqual(sorted(AuditEntry.objects.values_list('object_id', flat=True)), ['1', '2', '3'])
+
+    @override_settings(AUDIT_BUFFER_SIZE=2)
+    def test_a_full_buffer_is_flushed_during_the_request(self):
+        audit.request_started()
+        with self.captureOnCommitCallbacks(execute=True):
+            for pk in range(1, 4):
+                audit.record(self.user, 'transaction.delete', 'transaction', pk)
+        self.assertEqual(AuditEntry.objects.count(), 2)
+        audit.request_finished()
+        self.assertEqual(AuditEntry.objects.count(), 3)
+
+    def test_anonymous_actor_is_recorded_as_system(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            audit.record(None, 'backup.restore', 'database')
+        self.assertEqual(str(AuditEntry.objects.get()), 'system backup.restore database#')
+
+    def test_deleting_a_transaction_through_the_view_is_audited(self):
+        fund = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+        deleted = Transaction.objects.create(
+            fund=fund, transaction_type='OFFERING', amount=Money('12.50'), description='Sunday', created_by=self.user,
+        )
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/transactions/delete/{deleted.pk}/')
+        audit.flush()
+
+        entry = AuditEntry.objects.get(action='transaction.delete')
+        self.assertEqual((entry.actor, entry.object_id), (self.user, str(deleted.pk)))
+        self.assertEqual(entry.before['amount'], '12.50')
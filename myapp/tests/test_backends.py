@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from myapp import routers
+from myapp.backends import CachedModelBackend, user_cache_key
+from myapp.models import Treasurer
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(
+            username='cached', password='pw-123456', email='cached@example.invalid', is_approved=True,
+        )
+        self.backend = CachedModelBackend()
+
+    def test_logged_in_requests_reuse_the_cached_treasurer(self):
+        self.client.force_login(self.user)
+        self.client.get('/funds/quick-split/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/funds/quick-split/').status_code, 405)
+
+    def test_saving_a_treasurer_drops_the_cached_copy(self):
+        self.client.force_login(self.user)
+        self.client.get('/funds/quick-split/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get('/funds/quick-split/')
+        # Treated as logged out, so sent to the login page
+        self.assertEqual(response.status_code, 302)
+
+    def test_cache_is_filled_from_the_primary(self):
+        # Inside a use_replica view the router sends reads to the replica (not
+        # configured here, so reading through the router would fail)
+        token = routers._read_alias.set(routers.REPLICA_ALIAS)
+        try:
+            user = self.backend.get_user(self.user.pk)
+        finally:
+            routers._read_alias.reset(token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(cache.get(user_cache_key(self.user.pk)).pk, self.user.pk)
+
+    def test_inactive_treasurers_are_not_cached(self):
+        Treasurer.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertIsNone(self.backend.get_user(0))
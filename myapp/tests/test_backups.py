@@ -0,0 +1,69 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+from myapp import backups
+from myapp.models import Fund, Treasurer
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class BackupRoundTripTests(TransactionTestCase):
+    """Backups copy the live connection, which TestCase would hold in an open transaction."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.user = Treasurer.objects.create_user(username='backup', password='pw', email='backup@example.invalid')
+        Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+
+    def backup(self, keep=0):
+        return backups.backup(connection, self.directory, keep, pages=1, sleep=0)
+
+    def test_backup_verify_restore_round_trip(self):
+        meta = self.backup()
+        self.assertEqual(backups.verify(meta['path'])['sha256'], meta['sha256'])
+
+        Fund.objects.all().delete()
+        Fund.objects.create(name='Created After', fund_type='later', created_by=self.user)
+        cache.set('fund_balances', {'stale': True})
+
+        backups.restore(connection, meta['path'])
+        self.assertEqual(list(Fund.objects.values_list('name', flat=True)), [GENERAL_FUND_NAME])
+        self.assertIsNone(cache.get('fund_balances'))
+
+    def test_modified_or_unverifiable_archives_are_refused(self):
+        meta = self.backup()
+        with open(meta['path'], 'r+b') as archive:
+            archive.seek(-1, os.SEEK_END)
+            last = archive.read(1)
+            archive.seek(-1, os.SEEK_END)
+            archive.write(bytes([last[0] ^ 0xFF]))
+        with self.assertRaisesMessage(backups.BackupError, 'Checksum mismatch'):
+            backups.restore(connection, meta['path'])
+        self.assertTrue(Fund.objects.exists())
+
+        os.remove(backups.sidecar(meta['path']))
+        with self.assertRaisesMessage(backups.BackupError, 'Missing or unreadable checksum file'):
+            backups.verify(meta['path'])
+
+    def test_only_the_newest_archives_are_kept(self):
+        paths = [self.backup(keep=2)['path'] for _ in range(3)]
+        self.assertEqual(backups.archives(self.directory, connection.alias), paths[1:])
+        self.assertFalse(os.path.exists(backups.sidecar(paths[0])))
+
+    def test_restore_command_saves_the_current_database_first(self):
+        call_command('backup', output=self.directory, keep=0, pages=-1, sleep=0, stdout=io.StringIO())
+        Fund.objects.create(name='Created After', fund_type='later', created_by=self.user)
+
+        call_command('restore', output=self.directory, interactive=False, stdout=io.StringIO())
+        self.assertEqual(Fund.objects.count(), 1)
+        self.assertEqual(len(backups.archives(self.directory, connection.alias)), 2)
+
+        with self.assertRaisesMessage(CommandError, 'does not exist'):
+            call_command('restore', os.path.join(self.directory, 'missing.sqlite3.gz'), interactive=False)
@@ -0,0 +1,92 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase
+
+from myapp import batch
+from myapp.models import Fund, Transaction, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class BatchEntriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(username='batch', password='pw', email='batch@example.invalid')
+        self.general = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+        self.client.force_login(self.user)
+
+    def post(self, *entries):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/funds/batch/', json.dumps({'entries': list(entries)}),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def offering(self, client_id, amount='10.00', **extra):
+        return {'client_id': client_id, 'kind': 'specific', 'allocations': {str(self.general.pk): amount}, **extra}
+
+    def withdrawal(self, client_id, amount):
+        return {'client_id': client_id, 'kind': 'withdrawal', 'fund': self.general.pk, 'amount': amount,
+                'description': 'Supplies'}
+
+    def balance(self):
+        self.general.refresh_from_db()
+        return self.general.current_balance
+
+    def test_resent_entries_are_reported_as_duplicates(self):
+        first = self.post(self.offering('a'), self.offering('b', '2.50'))
+        self.assertEqual([r['status'] for r in first['results']], ['ok', 'ok'])
+        self.assertEqual(first['balances'][str(self.general.pk)], '12.50')
+
+        again = self.post(self.offering('a'), self.offering('b', '2.50'))
+        self.assertEqual([r['status'] for r in again['results']], ['duplicate', 'duplicate'])
+        self.assertEqual([r['transaction_id'] for r in again['results']],
+                         [r['transaction_id'] for r in first['results']])
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(self.balance(), Money('12.50'))
+
+    def test_an_entry_sent_twice_in_one_batch_is_applied_once(self):
+        results = self.post(self.offering('a'), self.offering('a'))['results']
+        self.assertEqual([r['status'] for r in results], ['ok', 'duplicate'])
+        self.assertEqual(results[0]['transaction_id'], results[1]['transaction_id'])
+        self.assertEqual(self.balance(), Money('10.00'))
+
+    def test_client_ids_are_per_treasurer(self):
+        other = Treasurer.objects.create_user(username='other', password='pw', email='other@example.invalid')
+        Transaction.objects.create(fund=self.general, transaction_type='OFFERING', amount=Money('1.00'),
+                                   description='other', created_by=other, client_id='a')
+        self.assertEqual(self.post(self.offering('a'))['results'][0]['status'], 'ok')
+
+    def test_entries_queued_by_another_treasurer_are_rejected(self):
+        results = self.post(self.offering('a', user=self.user.pk + 1), self.offering('b', user=self.user.pk))['results']
+        self.assertEqual([(r['status'], r['message']) for r in results],
+                         [('error', 'Queued by another treasurer.'), ('ok', '')])
+
+    def test_withdrawals_see_earlier_entries_of_the_batch(self):
+        results = self.post(self.withdrawal('w1', '5.00'), self.offering('a'),
+                            self.withdrawal('w2', '5.00'), self.withdrawal('w3', '5.01'))['results']
+        self.assertEqual([r['status'] for r in results], ['error', 'ok', 'ok', 'error'])
+        self.assertEqual(results[3]['message'], 'Insufficient funds for withdrawal.')
+        self.assertEqual(self.balance(), Money('5.00'))
+
+    def test_a_concurrent_insert_of_the_same_entry_is_reported_as_duplicate(self):
+        apply_once = batch._apply_entries
+        calls = []
+
+        def racing(user, entries):
+            if not calls:
+                # Another request stored the entry between our check and our INSERT
+                calls.append(Transaction.objects.create(
+                    fund=self.general, transaction_type='OFFERING', amount=Money('10.00'), description='race',
+                    created_by=user, client_id='a',
+                ))
+                raise IntegrityError('UNIQUE constraint failed')
+            return apply_once(user, entries)
+
+        with mock.patch.object(batch, '_apply_entries', racing):
+            results = self.post(self.offering('a'))['results']
+        self.assertEqual((results[0]['status'], results[0]['transaction_id']), ('duplicate', calls[0].pk))
+        self.assertEqual(Transaction.objects.count(), 1)
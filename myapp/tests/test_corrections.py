@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from myapp import balances, corrections
+from myapp.models import AuditEntry, Fund, Transaction, TransactionSplit, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class ReverseTransactionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_superuser('admin', 'admin@example.invalid', 'pw')
+        self.general = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+        self.building = Fund.objects.create(name='Building Fund', fund_type='building', created_by=self.user)
+
+        self.offering = self.record(self.general, 'OFFERING', '100.00')
+        self.withdrawal = self.record(self.general, 'WITHDRAWAL', '30.00')
+        self.split = self.record(None, 'OFFERING', '50.00')
+        TransactionSplit.objects.create(parent_transaction=self.split, fund=self.general, amount_allocated=Money('40.00'))
+        TransactionSplit.objects.create(parent_transaction=self.split, fund=self.building, amount_allocated=Money('10.00'))
+        balances.add(self.general.pk, Money('110.00'))
+        balances.add(self.building.pk, Money('10.00'))
+
+    def record(self, fund, kind, amount):
+        return Transaction.objects.create(
+            fund=fund, transaction_type=kind, amount=Money(amount), description=kind, created_by=self.user,
+        )
+
+    def balance(self, fund):
+        return balances.get(fund.pk, cached=False)
+
+    def test_deltas_are_summed_per_fund(self):
+        ids = [self.offering.pk, self.withdrawal.pk, self.split.pk]
+        self.assertEqual(corrections.reversal_deltas(ids), {
+            self.general.pk: Money('-110.00'),
+            self.building.pk: Money('-10.00'),
+        })
+
+    def test_reversal_restores_balances_and_removes_the_rows(self):
+        ids = [self.withdrawal.pk, self.split.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            removed = corrections.reverse_transactions(self.user, Transaction.objects.filter(pk__in=ids))
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(list(Transaction.objects.values_list('pk', flat=True)), [self.offering.pk])
+        self.assertFalse(TransactionSplit.objects.exists())
+        self.assertEqual((self.balance(self.general), self.balance(self.building)), (Money('100.00'), Money('0.00')))
+        self.assertEqual(sorted(AuditEntry.objects.filter(action='transaction.delete').values_list('object_id', flat=True)),
+                         sorted(str(pk) for pk in ids))
+
+    def test_reversal_that_would_overdraw_a_fund_changes_nothing(self):
+        # 30.00 of the 140.00 offered to the General Fund was withdrawn again
+        offerings = Transaction.objects.filter(transaction_type='OFFERING')
+        with self.assertRaisesMessage(corrections.CorrectionError, GENERAL_FUND_NAME):
+            corrections.reverse_transactions(self.user, offerings)
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(self.balance(self.general), Money('110.00'))
+
+    def test_admin_actions(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/admin/myapp/transactionsplit/', {
+            'action': 'reverse_parents',
+            '_selected_action': list(TransactionSplit.objects.filter(fund=self.building).values_list('pk', flat=True)),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Transaction.objects.filter(pk=self.split.pk).exists())
+        self.assertEqual(self.balance(self.general), Money('70.00'))
+
+        Fund.objects.filter(pk=self.general.pk).update(name='Church General Fund')
+        self.client.post('/admin/myapp/transaction/', {
+            'action': 'refresh_labels',
+            '_selected_action': list(Transaction.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(set(Transaction.objects.values_list('fund_label', flat=True)), {'Church General Fund'})
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from myapp import ledger
+from myapp.models import Fund, Transaction, TransactionSplit, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class LedgerCursorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(username='ledger', password='pw', email='ledger@example.invalid')
+        self.fund = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+        self.other = Fund.objects.create(name='Building Fund', fund_type='building', created_by=self.user)
+
+        balance = 0
+        amounts = ['0.29', '19.99', '99999999.99', '0.01', '5.05']
+        for i in range(53):
+            amount = Money(amounts[i % len(amounts)])
+            if i % 4 == 0:
+                parent = Transaction.objects.create(
+                    transaction_type='OFFERING', amount=amount + Money('1.11'), description=f'split {i}',
+                    created_by=self.user,
+                )
+                TransactionSplit.objects.create(parent_transaction=parent, fund=self.fund, amount_allocated=amount)
+                TransactionSplit.objects.create(
+                    parent_transaction=parent, fund=self.other, amount_allocated=Money('1.11'),
+                )
+                balance += amount.cents
+            else:
+                kind = 'WITHDRAWAL' if i % 7 == 0 and balance >= amount.cents else 'OFFERING'
+                Transaction.objects.create(
+                    fund=self.fund, transaction_type=kind, amount=amount, description=f'direct {i}',
+                    created_by=self.user,
+                )
+                balance += amount.cents if kind == 'OFFERING' else -amount.cents
+        Fund.objects.filter(pk=self.fund.pk).update(current_balance=Money.from_cents(balance))
+        self.balance = balance
+
+    def test_amounts_are_stored_as_integer_centavos(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT amount FROM myapp_transaction UNION ALL SELECT amount_allocated FROM myapp_transactionsplit'
+            )
+            self.assertTrue(all(type(value) is int for value, in cursor.fetchall()))
+            cursor.execute('SELECT current_balance FROM myapp_fund WHERE id = %s', [self.fund.pk])
+            self.assertEqual(cursor.fetchone()[0], self.balance)
+
+    def test_running_balance_continues_across_pages(self):
+        entries, cursor, pages = [], None, 0
+        while True:
+            page = ledger.ledger_page(self.fund.pk, cursor, limit=7)
+            entries += page['entries']
+            pages += 1
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertGreater(pages, 1)
+        self.assertEqual(len(entries), 53)
+        keys = [(entry['transaction_id'], entry['split_id'] or 0) for entry in entries]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+        def signed(entry):
+            return entry['amount'].cents if entry['type'] == 'OFFERING' else -entry['amount'].cents
+
+        # Anchored on the fund balance, each older entry is the newer one less
+        # its amount, on and across page boundaries, down to an empty fund
+        self.assertEqual(entries[0]['balance'].cents, self.balance)
+        for newer, older in zip(entries, entries[1:]):
+            self.assertEqual(older['balance'].cents, newer['balance'].cents - signed(newer))
+        self.assertEqual(entries[-1]['balance'].cents - signed(entries[-1]), 0)
+
+    def test_cursor_is_bound_to_its_fund(self):
+        cursor = ledger.ledger_page(self.fund.pk, limit=5)['next_cursor']
+        with self.assertRaises(ledger.InvalidCursor):
+            ledger.ledger_page(self.other.pk, cursor)
+        with self.assertRaises(ledger.InvalidCursor):
+            ledger.ledger_page(self.fund.pk, cursor[:-2] + 'xx')
+
+    def test_json_view_pages_and_rejects_foreign_cursors(self):
+        self.client.force_login(self.user)
+        first = self.client.get(f'/funds/{self.fund.pk}/ledger.json?limit=3').json()
+        self.assertEqual(len(first['entries']), 3)
+        second = self.client.get(f"/funds/{self.fund.pk}/ledger.json?limit=3&cursor={first['next_cursor']}").json()
+        def key(entry):
+            return entry['transaction_id'], entry['split_id'] or 0
+        # The second page starts right after the first one ends
+        self.assertLess(key(second['entries'][0]), key(first['entries'][-1]))
+
+        response = self.client.get(f"/funds/{self.other.pk}/ledger.json?cursor={first['next_cursor']}")
+        self.assertEqual(response.status_code, 400)
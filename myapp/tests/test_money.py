@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class CentavosMigrationTests(TransactionTestCase):
+    before = [('myapp', '0015_fund_balance_shard')]
+    after = [('myapp', '0016_money_in_centavos')]
+    amounts = [Decimal('0.29'), Decimal('19.99'), Decimal('99999999.99')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def column(self, table, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {name} FROM {table} ORDER BY id')
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_round_trip_keeps_every_centavo(self):
+        apps = self.migrate(self.before)
+        OldTreasurer = apps.get_model('myapp', 'Treasurer')
+        OldFund = apps.get_model('myapp', 'Fund')
+        OldTransaction = apps.get_model('myapp', 'Transaction')
+        OldSplit = apps.get_model('myapp', 'TransactionSplit')
+        OldShard = apps.get_model('myapp', 'FundBalanceShard')
+
+        user = OldTreasurer.objects.create(username='migrate', password='!')
+        for i, amount in enumerate(self.amounts):
+            fund = OldFund.objects.create(
+                name=f'Fund {i}', fund_type=f'fund-{i}', created_by=user, current_balance=amount,
+            )
+            parent = OldTransaction.objects.create(
+                transaction_type='OFFERING', amount=amount, description='offering', created_by=user,
+            )
+            OldSplit.objects.create(parent_transaction=parent, fund=fund, amount_allocated=amount)
+            OldShard.objects.create(fund=fund, shard=0, delta=-amount)
+
+        self.migrate(self.after)
+        cents = [29, 1999, 9999999999]
+        self.assertEqual(self.column('myapp_fund', 'current_balance'), cents)
+        self.assertEqual(self.column('myapp_transaction', 'amount'), cents)
+        self.assertEqual(self.column('myapp_transactionsplit', 'amount_allocated'), cents)
+        self.assertEqual(self.column('myapp_fundbalanceshard', 'delta'), [-value for value in cents])
+
+        apps = self.migrate(self.before)
+        OldFund = apps.get_model('myapp', 'Fund')
+        self.assertEqual(list(OldFund.objects.order_by('id').values_list('current_balance', flat=True)), self.amounts)
+        self.assertEqual(
+            list(apps.get_model('myapp', 'Transaction').objects.order_by('id').values_list('amount', flat=True)),
+            self.amounts,
+        )
+        self.assertEqual(
+            list(apps.get_model('myapp', 'TransactionSplit').objects.order_by('id')
+                 .values_list('amount_allocated', flat=True)),
+            self.amounts,
+        )
+        self.assertEqual(
+            list(apps.get_model('myapp', 'FundBalanceShard').objects.order_by('id').values_list('delta', flat=True)),
+            [-amount for amount in self.amounts],
+        )
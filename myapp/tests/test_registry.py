@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from myapp.models import Fund, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME, FundInfo, FundRegistry, get_registry
+
+
+class AllocateTests(SimpleTestCase):
+    def registry(self, *percentages):
+        funds = [FundInfo(1, GENERAL_FUND_NAME, 'general', Decimal('0'))]
+        funds += [
+            FundInfo(i + 2, f'Fund {i}', f'fund-{i}', Decimal(percentage))
+            for i, percentage in enumerate(percentages)
+        ]
+        return FundRegistry(funds, 'test')
+
+    def test_allocations_add_up_to_the_total(self):
+        registry = self.registry('33.33', '33.33', '12.5', '0.01')
+        for total in ['0.01', '0.29', '1.00', '19.99', '333.33', '99999999.99']:
+            with self.subTest(total=total):
+                allocations = registry.allocate(Money(total))
+                self.assertEqual(sum(amount for _, amount in allocations), Decimal(total))
+                self.assertTrue(all(type(amount) is Money for _, amount in allocations))
+
+    def test_shares_round_half_up_and_the_general_fund_takes_the_rest(self):
+        registry = self.registry('12.5', '30')
+        # 12.5% of 0.10 is 0.0125 -> 0.01; 30% is 0.03; the General Fund gets 0.06
+        self.assertEqual(
+            registry.allocate(Money('0.10')),
+            [(2, Money('0.01')), (3, Money('0.03')), (1, Money('0.06'))],
+        )
+        # 12.5% of 0.20 is exactly 0.025 -> 0.03 (half-up)
+        self.assertEqual(registry.allocate(Money('0.20'))[0], (2, Money('0.03')))
+
+    def test_general_fund_gets_nothing_when_shares_cover_the_total(self):
+        registry = self.registry('50', '50')
+        self.assertEqual(registry.allocate(Money('19.99')), [(2, Money('10.00')), (3, Money('9.99'))])
+
+    def test_general_fund_takes_everything_without_shares(self):
+        self.assertEqual(self.registry().allocate(Money('19.99')), [(1, Money('19.99'))])
+
+
+class RegistryReloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(username='registry', password='pw', email='registry@example.invalid')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fund = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+
+    def test_snapshot_is_reused_until_fund_metadata_changes(self):
+        registry = get_registry()
+        with self.assertNumQueries(0):
+            self.assertIs(get_registry(), registry)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Fund.objects.create(name='Mission Fund', fund_type='mission', created_by=self.user,
+                                default_percentage=Decimal('10'))
+        reloaded = get_registry()
+        self.assertIsNot(reloaded, registry)
+        self.assertEqual(reloaded.get(self.fund.pk).name, GENERAL_FUND_NAME)
+        self.assertEqual(len(reloaded.split_plan), 1)
+
+    def test_balance_updates_keep_the_snapshot(self):
+        registry = get_registry()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fund.current_balance = Money('5.00')
+            self.fund.save(update_fields=['current_balance'])
+        self.assertIs(get_registry(), registry)
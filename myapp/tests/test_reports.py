@@ -0,0 +1,72 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from myapp import reports
+from myapp.models import Fund, Transaction, TransactionSplit, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class ReportTotalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(username='reports', password='pw', email='reports@example.invalid')
+        self.general = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+        self.building = Fund.objects.create(name='Building Fund', fund_type='building', created_by=self.user)
+
+        self.direct('OFFERING', self.general, '100.10', datetime(2024, 1, 10, 2, 0))
+        self.direct('WITHDRAWAL', self.general, '30.05', datetime(2024, 1, 20, 2, 0))
+        # 20:00 UTC on Jan 31 is already Feb 1 in Manila
+        self.direct('OFFERING', self.building, '7.00', datetime(2024, 1, 31, 20, 0))
+        parent = self.direct('OFFERING', None, '50.00', datetime(2024, 2, 5, 2, 0))
+        TransactionSplit.objects.create(parent_transaction=parent, fund=self.general, amount_allocated=Money('40.01'))
+        TransactionSplit.objects.create(parent_transaction=parent, fund=self.building, amount_allocated=Money('9.99'))
+
+    def direct(self, kind, fund, amount, moment):
+        transaction = Transaction.objects.create(
+            fund=fund, transaction_type=kind, amount=Money(amount), description=kind, created_by=self.user,
+        )
+        Transaction.objects.filter(pk=transaction.pk).update(transaction_date=moment.replace(tzinfo=dt_timezone.utc))
+        return transaction
+
+    def test_monthly_totals_per_fund_in_local_time(self):
+        totals = reports.period_totals('month', date(2024, 1, 1), date(2024, 3, 1))
+        self.assertEqual(totals, {
+            date(2024, 1, 1): {self.general.pk: (Money('100.10'), Money('30.05'))},
+            date(2024, 2, 1): {
+                # The split parent counts only through its allocations
+                self.general.pk: (Money('40.01'), Money('0.00')),
+                self.building.pk: (Money('16.99'), Money('0.00')),
+            },
+        })
+
+    def test_report_rows_add_up_per_period(self):
+        rows = reports.build_report('quarter', date(2024, 1, 1), date(2024, 4, 1))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['start'], rows[0]['end']), (date(2024, 1, 1), date(2024, 3, 31)))
+        self.assertEqual([f['name'] for f in rows[0]['funds']], ['Building Fund', GENERAL_FUND_NAME])
+        self.assertEqual((rows[0]['income'], rows[0]['expense'], rows[0]['net']),
+                         (Money('157.10'), Money('30.05'), Money('127.05')))
+
+    def test_closed_periods_are_cached_until_invalidated(self):
+        before = reports.period_totals('month', date(2024, 1, 1), date(2024, 3, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(reports.period_totals('month', date(2024, 1, 1), date(2024, 3, 1)), before)
+
+        moment = datetime(2024, 1, 15, 2, 0, tzinfo=dt_timezone.utc)
+        self.direct('OFFERING', self.general, '1.00', moment)
+        reports.invalidate_periods(moment)
+        with self.assertNumQueries(1):
+            totals = reports.period_totals('month', date(2024, 1, 1), date(2024, 3, 1))
+        self.assertEqual(totals[date(2024, 1, 1)][self.general.pk], (Money('101.10'), Money('30.05')))
+        self.assertEqual(totals[date(2024, 2, 1)], before[date(2024, 2, 1)])
+
+    def test_csv_export_has_a_total_row_per_period(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/export.csv', {'period': 'month', 'start': '2024-01-01', 'end': '2024-02-29'})
+        lines = response.content.decode().splitlines()
+        self.assertEqual(lines[0], 'Period Start,Period End,Fund,Income,Expense,Net')
+        self.assertIn('2024-01-01,2024-01-31,All Funds,100.10,30.05,70.05', lines)
+        self.assertIn('2024-02-01,2024-02-29,All Funds,57.00,0.00,57.00', lines)
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from myapp import routers
+from myapp.models import Transaction
+
+
+def read_alias_view(request):
+    return HttpResponse(routers.ReplicaRouter().db_for_read(Transaction))
+
+
+class UseReplicaTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        for name, value in [('replica_configured', True), ('replica_is_healthy', True)]:
+            patcher = mock.patch.object(routers, name, return_value=value)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.view = routers.use_replica(read_alias_view)
+
+    def alias(self, request):
+        return self.view(request).content.decode()
+
+    def test_get_reads_from_the_replica_and_resets_afterwards(self):
+        self.assertEqual(self.alias(self.factory.get('/')), routers.REPLICA_ALIAS)
+        self.assertEqual(routers._read_alias.get(), DEFAULT_DB_ALIAS)
+        self.assertEqual(routers.ReplicaRouter().db_for_write(Transaction), DEFAULT_DB_ALIAS)
+
+    def test_primary_for_unsafe_methods_and_pinned_clients(self):
+        self.assertEqual(self.alias(self.factory.post('/')), DEFAULT_DB_ALIAS)
+        pinned = self.factory.get('/')
+        pinned.COOKIES[routers.PIN_COOKIE] = '1'
+        self.assertEqual(self.alias(pinned), DEFAULT_DB_ALIAS)
+
+    def test_primary_when_the_replica_is_missing_or_lagging(self):
+        self.replica_is_healthy.return_value = False
+        self.assertEqual(self.alias(self.factory.get('/')), DEFAULT_DB_ALIAS)
+        self.replica_is_healthy.return_value = True
+        self.replica_configured.return_value = False
+        self.assertEqual(self.alias(self.factory.get('/')), DEFAULT_DB_ALIAS)
+
+
+@override_settings(REPLICA_PIN_SECONDS=5)
+class PrimaryPinMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = routers.PrimaryPinMiddleware(lambda request: HttpResponse())
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        with mock.patch.object(routers, 'replica_configured', return_value=True):
+            cookie = self.middleware(self.factory.post('/')).cookies[routers.PIN_COOKIE]
+            self.assertEqual(cookie['max-age'], 5)
+            self.assertTrue(cookie['httponly'])
+            self.assertNotIn(routers.PIN_COOKIE, self.middleware(self.factory.get('/')).cookies)
+
+    def test_no_cookie_without_a_replica(self):
+        with mock.patch.object(routers, 'replica_configured', return_value=False):
+            self.assertNotIn(routers.PIN_COOKIE, self.middleware(self.factory.post('/')).cookies)
+
+
+@override_settings(REPLICA_MAX_LAG=10, REPLICA_LAG_CHECK_INTERVAL=5)
+class ReplicaHealthTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(routers, _lag_checked_at=0.0, _replica_healthy=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        clock = mock.patch.object(routers.time, 'monotonic', return_value=1000.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_lag_is_checked_once_per_interval(self):
+        with mock.patch.object(routers, 'replica_lag', return_value=2.0) as lag:
+            self.assertTrue(routers.replica_is_healthy())
+            lag.return_value = 60.0
+            self.clock.return_value = 1004.0
+            self.assertTrue(routers.replica_is_healthy())
+            self.clock.return_value = 1005.0
+            self.assertFalse(routers.replica_is_healthy())
+            self.assertEqual(lag.call_count, 2)
+
+    def test_unreachable_replica_is_unhealthy(self):
+        with mock.patch.object(routers, 'replica_lag', return_value=None):
+            self.assertFalse(routers.replica_is_healthy())
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from myapp import throttle
+from myapp.models import ThrottleBucket, Treasurer
+
+
+@override_settings(AUTH_THROTTLE_IP_RATE=(3, 6), AUTH_THROTTLE_USERNAME_RATE=(2, 6), AUTH_THROTTLE_PRUNE_PROBABILITY=0)
+class TakeTokensTests(TestCase):
+    def setUp(self):
+        clock = mock.patch('myapp.throttle.time.time', return_value=1000.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_capacity_is_spent_then_refilled_at_the_rate(self):
+        buckets = {'k': (2, 6)}
+        self.assertEqual([throttle.take_tokens(buckets) for _ in range(3)], [True, True, False])
+        # 6 per minute is one token every 10 seconds
+        self.clock.return_value = 1009.0
+        self.assertFalse(throttle.take_tokens(buckets))
+        self.clock.return_value = 1010.0
+        self.assertTrue(throttle.take_tokens(buckets))
+        self.assertFalse(throttle.take_tokens(buckets))
+
+    def test_refill_stops_at_capacity(self):
+        buckets = {'k': (2, 6)}
+        throttle.take_tokens(buckets)
+        self.clock.return_value = 5000.0
+        self.assertEqual([throttle.take_tokens(buckets) for _ in range(3)], [True, True, False])
+
+    def test_a_rejection_takes_no_token_from_the_other_buckets(self):
+        throttle.take_tokens({'user': (1, 6)})
+        self.assertFalse(throttle.take_tokens({'ip': (3, 6), 'user': (1, 6)}))
+        self.assertFalse(ThrottleBucket.objects.filter(key='ip', tokens__lt=3).exists())
+        self.assertEqual([throttle.take_tokens({'ip': (3, 6)}) for _ in range(4)], [True, True, True, False])
+
+    def test_prune_drops_only_refilled_buckets(self):
+        throttle.take_tokens({'old': (3, 6)})
+        self.clock.return_value = 1025.0
+        throttle.take_tokens({'new': (3, 6)})
+        # The longest refill in the settings above is 3 tokens at 6 per minute: 30 seconds
+        throttle._prune(1031.0)
+        self.assertEqual(list(ThrottleBucket.objects.values_list('key', flat=True)), ['new'])
+
+
+@override_settings(AUTH_THROTTLE_IP_RATE=(20, 10), AUTH_THROTTLE_USERNAME_RATE=(2, 2))
+class LoginThrottleTests(TestCase):
+    def login(self, password='wrong'):
+        return self.client.post('/login/', {'username': 'alice', 'password': password})
+
+    def test_repeated_failures_get_429_until_the_bucket_refills(self):
+        self.assertEqual([self.login().status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(throttle.rejection_counts()['login'], 1)
+
+    def test_successful_login_refills_the_username_bucket(self):
+        Treasurer.objects.create_user('alice', 'alice@example.com', 'pw-123456', is_approved=True)
+        self.login()
+        self.assertEqual(self.login('pw-123456').status_code, 302)
+        self.client.logout()
+        self.assertEqual([self.login().status_code for _ in range(2)], [200, 200])
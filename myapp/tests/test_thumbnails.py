@@ -0,0 +1,68 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from myapp.models import Treasurer
+from myapp.thumbnails import (
+    delete_picture, generate_thumbnails, legacy_thumbnail_names, thumbnail_name, thumbnail_names,
+)
+
+
+def image(pil_format, color):
+    output = io.BytesIO()
+    Image.new('RGB', (400, 300), color).save(output, pil_format)
+    return output.getvalue()
+
+
+class ThumbnailNameTests(TestCase):
+    def test_name_keeps_the_original_extension(self):
+        self.assertEqual(
+            thumbnail_name('profile_pics/me.png', 'md', 'webp'),
+            'profile_pics/thumbs/me.png-md.webp',
+        )
+
+    def test_pictures_differing_only_by_extension_get_distinct_thumbnails(self):
+        for first, second in [('profile_pics/me.png', 'profile_pics/me.jpg'),
+                              ('profile_pics/IMG.JPG', 'profile_pics/IMG.jpg')]:
+            with self.subTest(first=first, second=second):
+                self.assertFalse(set(thumbnail_names(first)) & set(thumbnail_names(second)))
+
+
+class ThumbnailStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def store(self, name, data):
+        return default_storage.save(name, ContentFile(data))
+
+    def test_deleting_one_picture_keeps_the_other_pictures_thumbnails(self):
+        png = self.store('profile_pics/me.png', image('PNG', 'red'))
+        jpg = self.store('profile_pics/me.jpg', image('JPEG', 'blue'))
+        generate_thumbnails(png)
+        generate_thumbnails(jpg)
+
+        delete_picture(png)
+
+        self.assertFalse(any(default_storage.exists(path) for path in [png] + thumbnail_names(png)))
+        self.assertTrue(all(default_storage.exists(path) for path in [jpg] + thumbnail_names(jpg)))
+
+    def test_rebuild_thumbnails_replaces_legacy_names(self):
+        name = self.store('profile_pics/me.png', image('PNG', 'red'))
+        Treasurer.objects.create_user('t1', 't1@example.com', 'pw-123456', profile_picture=name)
+        for path in legacy_thumbnail_names(name):
+            self.store(path, b'old')
+
+        call_command('rebuild_thumbnails', stdout=io.StringIO())
+
+        self.assertTrue(all(default_storage.exists(path) for path in thumbnail_names(name)))
+        self.assertFalse(any(default_storage.exists(path) for path in legacy_thumbnail_names(name)))
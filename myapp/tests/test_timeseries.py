@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from myapp import balances, timeseries
+from myapp.models import Fund, Transaction, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class LttbTests(SimpleTestCase):
+    def test_short_series_are_returned_whole(self):
+        self.assertEqual(list(timeseries.lttb([0, 1, 2], [5, 6, 7], 3)), [0, 1, 2])
+        self.assertEqual(list(timeseries.lttb([0, 1, 2, 3], [5, 6, 7, 8], 2)), [0, 1, 2, 3])
+
+    def test_keeps_the_ends_and_returns_increasing_indices(self):
+        rng = np.random.default_rng(3)
+        x = np.arange(1000)
+        y = rng.normal(size=1000).cumsum()
+        keep = timeseries.lttb(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+    def test_spikes_survive_downsampling(self):
+        y = [0.0] * 500
+        y[137], y[402] = 100.0, -80.0
+        keep = timeseries.lttb(list(range(500)), y, 10)
+        self.assertIn(137, keep)
+        self.assertIn(402, keep)
+
+
+class PickUnitTests(SimpleTestCase):
+    def test_finest_unit_that_fits(self):
+        cases = [
+            (local(2024, 3, 1), local(2024, 3, 2), 120, 'hour', 24),
+            (local(2024, 3, 1), local(2024, 3, 8), 120, 'day', 7),
+            (local(2024, 1, 1), local(2025, 1, 1), 120, 'week', 53),
+            (local(2015, 1, 1), local(2025, 1, 1), 120, 'month', 120),
+            (local(2015, 1, 1), local(2025, 1, 2), 120, 'quarter', 41),
+        ]
+        for start, end, points, unit, buckets in cases:
+            with self.subTest(start=start, end=end):
+                picked, starts = timeseries.pick_unit(start, end, points)
+                self.assertEqual((picked, len(starts)), (unit, buckets))
+
+    def test_buckets_start_on_local_boundaries(self):
+        _, starts = timeseries.pick_unit(local(2024, 1, 3, 15, 30), local(2024, 5, 1), 20)
+        # Weeks start on Monday at local midnight
+        self.assertEqual(starts[0], local(2024, 1, 1))
+        self.assertTrue(all(moment.weekday() == 0 for moment in map(timezone.localtime, starts)))
+
+    def test_too_long_a_range_is_refused(self):
+        with self.assertRaises(ValueError):
+            timeseries.pick_unit(local(2000, 1, 1), local(2025, 1, 1), 3)
+
+
+class SeriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(username='series', password='pw', email='series@example.invalid')
+        self.fund = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user)
+        for day in range(10):
+            kind = 'WITHDRAWAL' if day % 3 == 2 else 'OFFERING'
+            self.record(kind, '10.00', local(2024, 3, 1 + day, 9))
+
+    def record(self, kind, amount, moment):
+        created = Transaction.objects.create(
+            fund=self.fund, transaction_type=kind, amount=Money(amount), description=kind, created_by=self.user,
+        )
+        Transaction.objects.filter(pk=created.pk).update(transaction_date=moment)
+        balances.add(self.fund.pk, Money(amount) if kind == 'OFFERING' else -Money(amount))
+
+    def test_raw_balance_and_daily_flows(self):
+        data = timeseries.series('fund', self.fund.pk, local(2024, 3, 1), local(2024, 3, 11), points=20)
+        self.assertEqual((data['mode'], data['unit'], data['transactions']), ('raw', 'day', 10))
+        self.assertEqual(data['balance']['value'], [0, 10, 20, 10, 20, 30, 20, 30, 40, 30, 40])
+        self.assertEqual(data['flows']['expense'], [0, 0, 10, 0, 0, 10, 0, 0, 10, 0])
+        self.assertEqual((data['opening'], data['closing']), (0, 40))
+
+    def test_long_series_are_downsampled(self):
+        data = timeseries.series('fund', self.fund.pk, local(2024, 3, 1), local(2024, 3, 11), points=5)
+        self.assertEqual((data['mode'], len(data['balance']['value'])), ('lttb', 5))
+        self.assertEqual(data['balance']['value'][-1], 40)
+
+    def test_cached_until_a_transaction_commits(self):
+        start, end = local(2024, 3, 1), local(2024, 3, 11)
+        timeseries.series('fund', self.fund.pk, start, end)
+        with self.assertNumQueries(0):
+            timeseries.series('fund', self.fund.pk, start, end)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record('OFFERING', '5.00', local(2024, 3, 10, 12))
+        self.assertEqual(timeseries.series('fund', self.fund.pk, start, end)['closing'], 45)
+
+    def test_opening_balance_counts_earlier_transactions(self):
+        # Mar 1-4: +10 +10 -10 +10; Mar 5-6: +10 -10; the rest is after the range
+        data = timeseries.series('fund', self.fund.pk, local(2024, 3, 5), local(2024, 3, 5) + timedelta(days=2))
+        self.assertEqual((data['opening'], data['closing']), (20, 20))
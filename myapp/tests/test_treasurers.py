@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from myapp import treasurers
+from myapp.backends import user_cache_key
+from myapp.models import AuditEntry, Treasurer
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = Treasurer.objects.create_superuser('admin', 'admin@example.invalid', 'pw')
+        self.pending = [
+            Treasurer.objects.create_user(f'pending{i}', f'pending{i}@example.invalid', 'pw') for i in range(3)
+        ]
+        self.approved = Treasurer.objects.create_user('approved', 'approved@example.invalid', 'pw', is_approved=True)
+
+    def test_only_rows_that_change_are_updated_and_audited(self):
+        everyone = Treasurer.objects.filter(pk__in=[t.pk for t in self.pending] + [self.approved.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(4):
+                # SAVEPOINT, SELECT the rows that differ, one UPDATE, RELEASE
+                changed = treasurers.apply_action(self.admin, everyone, 'approve')
+        self.assertEqual(changed, 3)
+        self.assertFalse(Treasurer.objects.filter(is_approved=False, is_superuser=False).exists())
+
+        entries = AuditEntry.objects.filter(action='treasurer.approve')
+        self.assertEqual(sorted(entries.values_list('object_id', flat=True)),
+                         sorted(str(t.pk) for t in self.pending))
+        self.assertEqual((entries[0].before, entries[0].after), ({'is_approved': False}, {'is_approved': True}))
+
+    def test_cached_treasurers_are_dropped(self):
+        for treasurer in self.pending:
+            cache.set(user_cache_key(treasurer.pk), treasurer)
+        cache.set(user_cache_key(self.approved.pk), self.approved)
+
+        treasurers.apply_action(self.admin, Treasurer.objects.filter(pk__in=[self.pending[0].pk, self.approved.pk]),
+                                'approve')
+        self.assertIsNone(cache.get(user_cache_key(self.pending[0].pk)))
+        # Unchanged rows keep their cache entry
+        self.assertIsNotNone(cache.get(user_cache_key(self.approved.pk)))
+        self.assertIsNotNone(cache.get(user_cache_key(self.pending[1].pk)))
+
+    def test_nobody_can_disable_their_own_account(self):
+        changed = treasurers.apply_action(self.admin, Treasurer.objects.filter(pk__in=[self.admin.pk, self.approved.pk]),
+                                          'disable')
+        self.assertEqual(changed, 1)
+        self.assertTrue(Treasurer.objects.get(pk=self.admin.pk).is_active)
+        self.assertFalse(Treasurer.objects.get(pk=self.approved.pk).is_active)
+
+    def test_disabled_treasurer_is_logged_out_on_the_next_request(self):
+        self.client.force_login(self.approved)
+        self.assertEqual(self.client.get('/profile/').status_code, 200)
+
+        treasurers.apply_action(self.admin, Treasurer.objects.filter(pk=self.approved.pk), 'disable')
+        self.assertEqual(self.client.get('/profile/').status_code, 302)
+
+    def test_bulk_view_applies_the_action_to_the_ticked_ids(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/super-admin/treasurers/bulk/', {
+            'action': 'approve', 'ids': [str(self.pending[0].pk), str(self.pending[1].pk), 'x'],
+        })
+        self.assertRedirects(response, '/super-admin/treasurers/', fetch_redirect_response=False)
+        self.assertEqual(treasurers.status_counts(), {'pending': 1, 'approved': 3, 'disabled': 0})
+
+
+class DirectoryPageTests(TestCase):
+    def setUp(self):
+        for i in range(7):
+            Treasurer.objects.create_user(f'user{i}', f'user{i}@example.invalid', 'pw', is_approved=True,
+                                          church_branch='North' if i % 2 else 'South')
+
+    def test_keyset_pages_cover_every_row_once_in_both_directions(self):
+        first, previous_cursor, next_cursor = treasurers.directory_page('approved', per_page=3)
+        self.assertEqual(([t.username for t in first], previous_cursor, next_cursor),
+                         (['user0', 'user1', 'user2'], None, 'user2'))
+        second, previous_cursor, next_cursor = treasurers.directory_page('approved', after=next_cursor, per_page=3)
+        self.assertEqual([t.username for t in second], ['user3', 'user4', 'user5'])
+        last, _, end = treasurers.directory_page('approved', after=next_cursor, per_page=3)
+        self.assertEqual(([t.username for t in last], end), (['user6'], None))
+
+        back, previous_cursor, _ = treasurers.directory_page('approved', before='user3', per_page=3)
+        self.assertEqual(([t.username for t in back], previous_cursor), (['user0', 'user1', 'user2'], None))
+
+    def test_prefix_search(self):
+        rows, _, _ = treasurers.directory_page('approved', term='nor')
+        self.assertEqual([t.username for t in rows], ['user1', 'user3', 'user5'])
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from myapp import balances
+from myapp.models import Fund, Transaction, Treasurer
+from myapp.money import Money
+from myapp.registry import GENERAL_FUND_NAME
+
+
+class WithdrawalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Treasurer.objects.create_user(username='withdraw', password='pw', email='withdraw@example.invalid')
+        self.fund = Fund.objects.create(name=GENERAL_FUND_NAME, fund_type='general', created_by=self.user,
+                                        current_balance=Money('100.00'))
+        self.client.force_login(self.user)
+
+    def withdraw(self, amount):
+        return self.client.post('/funds/transaction/', {
+            'transaction_type': 'Expense', 'fund': self.fund.pk, 'amount': amount, 'description': 'Supplies',
+        })
+
+    def balance(self):
+        return balances.get(self.fund.pk, cached=False)
+
+    def test_withdrawal_is_recorded(self):
+        response = self.withdraw('99.99')
+        self.assertEqual(response.json()['new_balance'], 0.01)
+        self.assertEqual(self.balance(), Money('0.01'))
+        self.assertEqual(Transaction.objects.get().amount, Money('99.99'))
+
+    def test_withdrawal_over_the_balance_changes_nothing(self):
+        response = self.withdraw('100.01')
+        self.assertEqual((response.status_code, response.json()['message']), (400, 'Insufficient funds for withdrawal.'))
+        self.assertEqual(self.balance(), Money('100.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+    @override_settings(FUND_BALANCE_SHARDS=4)
+    def test_sharded_deltas_count_towards_the_balance(self):
+        balances.add(self.fund.pk, Money('5.00'))
+        self.assertEqual(self.withdraw('105.00').status_code, 200)
+        self.assertEqual(self.withdraw('0.01').status_code, 400)
+        self.assertEqual(self.balance(), Money('0.00'))
+
+    def test_the_balance_is_written_before_it_is_read(self):
+        # SQLite can't upgrade a transaction that has read to a writer while
+        # another writer holds the lock, so nothing is read inside it first
+        with CaptureQueriesContext(connection) as queries:
+            self.withdraw('1.00')
+        statements = [query['sql'] for query in queries.captured_queries]
+        begin = next(i for i, sql in enumerate(statements) if sql.startswith('SAVEPOINT'))
+        write = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE "myapp_fund"'))
+        self.assertTrue(all(sql.startswith('SAVEPOINT') for sql in statements[begin:write]))
+
+    def test_server_errors_roll_back_and_hide_the_details(self):
+        with mock.patch.object(Transaction, 'save', side_effect=DatabaseError('disk I/O error')), \
+                self.assertLogs('myapp.views', 'ERROR') as logs:
+            response = self.withdraw('10.00')
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('disk', response.json()['message'])
+        self.assertIn('disk I/O error', logs.output[0])
+        self.assertEqual(self.balance(), Money('100.00'))
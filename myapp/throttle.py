@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from django.db.models.lookups import GreaterThanOrEqual
+from django.shortcuts import render
+
+from .models import ThrottleBucket
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ('login', 'register')
+
+
+def client_ip(request):
+    """
+    The client address as seen by the first trusted proxy.
+
+    Each proxy appends the address it received the request from, so only the
+    last AUTH_THROTTLE_PROXY_HOPS entries of X-Forwarded-For are trustworthy;
+    anything to their left was sent by the client and can be made up.
+    """
+    if settings.AUTH_THROTTLE_TRUST_FORWARDED_FOR:
+        forwarded = [
+            entry.strip() for entry in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if entry.strip()
+        ]
+        hops = settings.AUTH_THROTTLE_PROXY_HOPS
+        if hops > 0 and len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _bucket_key(scope, kind, value):
+    digest = hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+    return f"throttle:{scope}:{kind}:{digest}"
+
+
+class _Empty(Exception):
+    pass
+
+
+def _refill(capacity, per_minute, now):
+    """Tokens a bucket holds at `now`: what was left plus the refill since, up to capacity."""
+    return Least(Value(float(capacity)), F('tokens') + (now - F('updated')) * (per_minute / 60.0))
+
+
+def _take(key, capacity, per_minute, now):
+    # The check and the decrement are one statement, so two workers cannot
+    # both spend the last token
+    refill = _refill(capacity, per_minute, now)
+    spendable = ThrottleBucket.objects.filter(GreaterThanOrEqual(refill, 1.0), key=key)
+    if spendable.update(tokens=refill - 1, updated=now):
+        return True
+    # A missing bucket is a full one. If it exists (or another worker creates
+    # it first) the insert is skipped and the retry sees the real count.
+    ThrottleBucket.objects.bulk_create(
+        [ThrottleBucket(key=key, tokens=capacity, updated=now)], ignore_conflicts=True,
+    )
+    return bool(spendable.update(tokens=refill - 1, updated=now))
+
+
+def _prune(now):
+    """Drops buckets that have refilled completely; a missing bucket counts as full."""
+    longest = max(
+        capacity * 60.0 / per_minute
+        for capacity, per_minute in (settings.AUTH_THROTTLE_IP_RATE, settings.AUTH_THROTTLE_USERNAME_RATE)
+    )
+    ThrottleBucket.objects.filter(updated__lt=now - longest).delete()
+
+
+def take_tokens(buckets):
+    """
+    Takes one token from every bucket, or from none of them.
+
+    `buckets` maps keys to (capacity, tokens refilled per minute). The buckets
+    are ThrottleBucket rows in the database, so the limit holds across
+    workers whatever cache backend is configured.
+    """
+    now = time.time()
+    try:
+        with transaction.atomic():
+            for key, (capacity, per_minute) in buckets.items():
+                if not _take(key, capacity, per_minute, now):
+                    # Rolls back the tokens already taken: rejected attempts do not count
+                    raise _Empty
+    except _Empty:
+        return False
+    if random.random() < settings.AUTH_THROTTLE_PRUNE_PROBABILITY:
+        _prune(now)
+    return True
+
+
+def reset_username(scope, username):
+    """Refills a username's bucket, e.g. after that user logs in successfully."""
+    ThrottleBucket.objects.filter(key=_bucket_key(scope, 'username', username)).delete()
+
+
+def record_rejection(scope):
+    key = f"throttle:rejected:{scope}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def rejection_counts():
+    """Number of throttled requests per scope since the cache was last cleared."""
+    counts = cache.get_many([f"throttle:rejected:{scope}" for scope in SCOPES])
+    return {scope: counts.get(f"throttle:rejected:{scope}", 0) for scope in SCOPES}
+
+
+def throttle_auth(scope, template_name):
+    """
+    Rate-limit front gate for credential views.
+
+    POSTs are limited per client IP and per submitted username before the
+    view runs, so rejected attempts never touch the database or the password
+    hasher. Over-limit requests get a 429 with the view's own template.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method == 'POST':
+                buckets = {
+                    _bucket_key(scope, 'ip', client_ip(request)): settings.AUTH_THROTTLE_IP_RATE,
+                }
+                username = request.POST.get('username')
+                if username:
+                    buckets[_bucket_key(scope, 'username', username)] = settings.AUTH_THROTTLE_USERNAME_RATE
+
+                if not take_tokens(buckets):
+                    record_rejection(scope)
+                    logger.warning("Throttled %s attempt from %s", scope, client_ip(request))
+                    messages.error(request, 'Too many attempts. Please wait a minute and try again.')
+                    return render(request, template_name, status=429)
+
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Output formats for every size: WebP for modern browsers, JPEG as fallback
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Original formats that are re-encoded to strip their metadata
+STRIPPED_FORMATS = {
+    'JPEG': ('JPEG', {'quality': 90, 'optimize': True}),
+    'PNG': ('PNG', {'optimize': True}),
+    'WEBP': ('WEBP', {'quality': 90}),
+}
+
+# Thumbnail work runs here so uploads don't wait on Pillow
+_executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+
+
+def thumbnail_name(name, size, ext):
+    """'profile_pics/me.png', 'md', 'webp' -> 'profile_pics/thumbs/me.png-md.webp'"""
+    # The original's extension stays in the name: me.png and me.jpg are
+    # different uploads, and must not share (or delete) each other's thumbnails
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, 'thumbs', f"{filename}-{size}.{ext}")
+
+
+def legacy_thumbnail_names(name):
+    """Names used before the extension was kept ('me-md.webp'); rebuild_thumbnails removes them."""
+    directory, filename = os.path.split(name)
+    stem, _ = os.path.splitext(filename)
+    return [
+        os.path.join(directory, 'thumbs', f"{stem}-{size}.{ext}")
+        for size in settings.PROFILE_THUMBNAIL_SIZES
+        for ext in FORMATS
+    ]
+
+
+def thumbnail_names(name):
+    return [
+        thumbnail_name(name, size, ext)
+        for size in settings.PROFILE_THUMBNAIL_SIZES
+        for ext in FORMATS
+    ]
+
+
+def _save(name, data):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(data))
+
+
+def generate_thumbnails(name):
+    """
+    Rewrites the uploaded original without EXIF/metadata and renders every
+    PROFILE_THUMBNAIL_SIZES square crop in each of FORMATS.
+    """
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    original_format = image.format or 'JPEG'
+
+    # Apply the camera orientation before the EXIF block is dropped
+    image = ImageOps.exif_transpose(image)
+    image.info.clear()
+    rgb = image.convert('RGB')
+
+    # Re-encode the original in its own format; saving without exif/pnginfo
+    # drops GPS, camera and text metadata
+    if original_format in STRIPPED_FORMATS:
+        output = io.BytesIO()
+        pil_format, options = STRIPPED_FORMATS[original_format]
+        (rgb if pil_format == 'JPEG' else image).save(output, pil_format, **options)
+        _save(name, output.getvalue())
+
+    for size, pixels in settings.PROFILE_THUMBNAIL_SIZES.items():
+        thumb = ImageOps.fit(rgb, (pixels, pixels), Image.LANCZOS)
+        for ext, (pil_format, options) in FORMATS.items():
+            output = io.BytesIO()
+            thumb.save(output, pil_format, **options)
+            _save(thumbnail_name(name, size, ext), output.getvalue())
+
+
+def delete_picture(name):
+    """Removes a replaced profile picture together with all of its thumbnails."""
+    for path in [name] + thumbnail_names(name):
+        if default_storage.exists(path):
+            default_storage.delete(path)
+
+
+def _run(func, name):
+    try:
+        func(name)
+    except Exception:
+        logger.exception("Profile picture processing failed for %s", name)
+
+
+def schedule_thumbnails(name):
+    """Queues thumbnail generation once the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run, generate_thumbnails, name))
+
+
+def schedule_delete(name):
+    transaction.on_commit(lambda: _executor.submit(_run, delete_picture, name))
+
+
+def thumbnail_url(name, size, ext):
+    """URL of a generated thumbnail, or None while it is still being built."""
+    path = thumbnail_name(name, size, ext)
+    if default_storage.exists(path):
+        return default_storage.url(path)
+    return None
@@ -0,0 +1,318 @@
+"""
+Downsampled balance and flow series for charts.
+
+series() answers with at most `points` values per series, however long the
+history behind the range is:
+
+- Flows (income and expense) are summed per calendar bucket in the
+  database. The bucket is the smallest of hour / day / week / month /
+  quarter / year that gives no more than `points` buckets over the range.
+- The balance line has one point per transaction while the range holds
+  fewer than `points` of them. Up to LTTB_MAX_ROWS it is downsampled with
+  LTTB (Largest-Triangle-Three-Buckets), which keeps the peaks and dips a
+  plain average would flatten. Beyond that it falls back to the balance at
+  the end of each flow bucket, so nothing but the bucket totals is read.
+
+Scopes: 'fund' counts direct transactions plus split allocations, like the
+ledger; 'all' is the combined balance of every fund; 'treasurer' is
+everything the treasurer recorded, and its "balance" is their running net
+over the range.
+
+Results are cached per scope, range and point count under a version stamp
+that every committed transaction or fund change bumps (see signals).
+"""
+import heapq
+import uuid
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BigIntegerField, ExpressionWrapper, F, Q
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import balances
+from .models import Transaction, TransactionSplit
+from .money import sum_cents, to_cents
+from .reports import local_midnight, period_start
+
+SCOPES = ('fund', 'treasurer', 'all')
+VERSION_KEY = 'timeseries:version'
+CACHE_TIMEOUT = 60 * 60
+DEFAULT_POINTS = 120
+MIN_POINTS = 3
+MAX_POINTS = 1000
+DEFAULT_SPAN = relativedelta(years=1)
+# Above this many transactions in the range, the balance line comes from bucket totals
+LTTB_MAX_ROWS = 50000
+CHUNK_SIZE = 2000
+
+# unit: (Trunc, step, approximate length in seconds for sizing)
+UNITS = {
+    'hour': (TruncHour, relativedelta(hours=1), 3600),
+    'day': (TruncDay, relativedelta(days=1), 86400),
+    'week': (TruncWeek, relativedelta(weeks=1), 7 * 86400),
+    'month': (TruncMonth, relativedelta(months=1), 31 * 86400),
+    'quarter': (TruncQuarter, relativedelta(months=3), 92 * 86400),
+    'year': (TruncYear, relativedelta(years=1), 366 * 86400),
+}
+
+Source = namedtuple('Source', ['queryset', 'prefix', 'amount'])
+
+
+# --- VERSION ---
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Bumps the shared version once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+# --- REQUEST PARAMETERS ---
+
+def _moment(value, end=False):
+    """A local date (whole day; `end` dates are inclusive) or an ISO datetime."""
+    day = parse_date(value)
+    if day is not None:
+        return local_midnight(day + timedelta(days=1) if end else day)
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"Invalid date: {value!r}.")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parse_range(params):
+    """(start, end, points) from start / end / points query parameters; raises ValueError."""
+    # Default to whole days so repeated requests share a cache entry
+    if params.get('end'):
+        end = _moment(params['end'], end=True)
+    else:
+        end = local_midnight(timezone.localdate() + timedelta(days=1))
+    if params.get('start'):
+        start = _moment(params['start'])
+    else:
+        start = local_midnight(timezone.localtime(end).date() - DEFAULT_SPAN)
+    if start >= end:
+        raise ValueError('start must be before end.')
+    try:
+        points = int(params.get('points', DEFAULT_POINTS))
+    except ValueError:
+        raise ValueError('points must be a whole number.')
+    return start, end, min(max(points, MIN_POINTS), MAX_POINTS)
+
+
+# --- BUCKETS ---
+
+def _floor(unit, moment):
+    """Naive local start of the bucket containing `moment`."""
+    local = timezone.make_naive(moment)
+    if unit == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.date() if unit == 'day' else period_start(unit, local.date())
+    return datetime.combine(day, time.min)
+
+
+def bucket_starts(unit, start, end):
+    """Aware starts of every `unit` bucket overlapping [start, end)."""
+    step = UNITS[unit][1]
+    current = _floor(unit, start)
+    starts = []
+    while timezone.make_aware(current) < end:
+        starts.append(timezone.make_aware(current))
+        current += step
+    return starts
+
+
+def pick_unit(start, end, points):
+    """(unit, bucket starts) of the finest unit giving at most `points` buckets."""
+    span = (end - start).total_seconds()
+    for unit, (_, _, length) in UNITS.items():
+        # Skip units that obviously give too many buckets without listing them
+        if span / length > points:
+            continue
+        starts = bucket_starts(unit, start, end)
+        if len(starts) <= points:
+            return unit, starts
+    raise ValueError(f"The range is too long to chart in {points} points.")
+
+
+# --- QUERIES ---
+
+def _sources(scope, key):
+    if scope == 'fund':
+        return [
+            Source(Transaction.objects.filter(fund_id=key, splits__isnull=True), '', 'amount'),
+            Source(TransactionSplit.objects.filter(fund_id=key), 'parent_transaction__', 'amount_allocated'),
+        ]
+    if scope == 'treasurer':
+        return [Source(Transaction.objects.filter(created_by_id=key), '', 'amount')]
+    return [Source(Transaction.objects.all(), '', 'amount')]
+
+
+def _between(source, start, end=None):
+    lookups = {f'{source.prefix}transaction_date__gte': start}
+    if end is not None:
+        lookups[f'{source.prefix}transaction_date__lt'] = end
+    return source.queryset.filter(**lookups)
+
+
+def _totals(source):
+    type_field = f'{source.prefix}transaction_type'
+    return {
+        'income': sum_cents(source.amount, filter=Q(**{type_field: 'OFFERING'})),
+        'expense': sum_cents(source.amount, filter=Q(**{type_field: 'WITHDRAWAL'})),
+    }
+
+
+def bucket_flows(sources, unit, start, end):
+    """{bucket start: (income, expense)} in centavos; one query for all sources."""
+    trunc = UNITS[unit][0]
+    grouped = [
+        _between(source, start, end).annotate(
+            bucket=trunc(f'{source.prefix}transaction_date'),
+        ).values('bucket').annotate(**_totals(source)).order_by()
+        for source in sources
+    ]
+    rows = grouped[0].union(*grouped[1:], all=True) if len(grouped) > 1 else grouped[0]
+    flows = {}
+    for row in rows:
+        income, expense = flows.get(row['bucket'], (0, 0))
+        flows[row['bucket']] = (income + int(row['income'] or 0), expense + int(row['expense'] or 0))
+    return flows
+
+
+def opening_cents(scope, key, sources, start):
+    """Balance at `start` in centavos: today's balance less everything since. Zero for a treasurer."""
+    if scope == 'treasurer':
+        return 0
+    since = 0
+    for source in sources:
+        totals = _between(source, start).aggregate(**_totals(source))
+        since += int(totals['income'] or 0) - int(totals['expense'] or 0)
+    balance = balances.get(key, cached=False) if scope == 'fund' else balances.total(cached=False)
+    return to_cents(balance) - since
+
+
+def _movements(sources, start, end):
+    """(timestamp, signed centavos) of every transaction in [start, end), oldest first."""
+    streams = []
+    for source in sources:
+        date_field = f'{source.prefix}transaction_date'
+        rows = _between(source, start, end).annotate(
+            cents=ExpressionWrapper(F(source.amount), output_field=BigIntegerField()),
+        ).order_by(date_field).values_list(date_field, f'{source.prefix}transaction_type', 'cents')
+        streams.append(rows.iterator(chunk_size=CHUNK_SIZE))
+    for moment, kind, cents in heapq.merge(*streams, key=lambda row: row[0]):
+        yield moment, cents if kind == 'OFFERING' else -cents
+
+
+# --- DOWNSAMPLING ---
+
+def lttb(x, y, threshold):
+    """
+    Indices of the `threshold` points of (x, y) picked by Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; the rest are split into threshold - 2
+    buckets, and each bucket keeps the point forming the largest triangle with
+    the previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        low, high = edges[i], edges[i + 1]
+        # The last bucket's "next bucket" is the final point
+        next_high = edges[i + 2] if i + 3 < threshold else n
+        avg_x, avg_y = x[high:next_high].mean(), y[high:next_high].mean()
+        area = np.abs((x[a] - avg_x) * (y[low:high] - y[a]) - (x[a] - x[low:high]) * (avg_y - y[a]))
+        a = low + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+# --- SERIES ---
+
+def _iso(moment):
+    return timezone.localtime(moment).isoformat(timespec='seconds')
+
+
+def _pesos(cents):
+    # Plain numbers for the charts
+    return cents / 100
+
+
+def build_series(scope, key, start, end, points):
+    sources = _sources(scope, key)
+    unit, starts = pick_unit(start, end, points)
+    flows = bucket_flows(sources, unit, start, end)
+    income = [flows.get(bucket, (0, 0))[0] for bucket in starts]
+    expense = [flows.get(bucket, (0, 0))[1] for bucket in starts]
+    opening = opening_cents(scope, key, sources, start)
+    count = sum(_between(source, start, end).count() for source in sources)
+
+    if count <= LTTB_MAX_ROWS:
+        # The opening balance, then the balance after each transaction
+        times, values = [start], [opening]
+        for moment, cents in _movements(sources, start, end):
+            times.append(moment)
+            values.append(values[-1] + cents)
+        mode = 'raw'
+        if len(times) > points:
+            keep = lttb([moment.timestamp() for moment in times], values, points)
+            times, values = [times[i] for i in keep], [values[i] for i in keep]
+            mode = 'lttb'
+    else:
+        # The balance at the end of each bucket, from the totals already read
+        times, values, balance = [], [], opening
+        for i, bucket in enumerate(starts):
+            balance += income[i] - expense[i]
+            times.append(min(starts[i + 1], end) if i + 1 < len(starts) else end)
+            values.append(balance)
+        mode = 'bucket'
+
+    return {
+        'scope': scope,
+        'start': _iso(start),
+        'end': _iso(end),
+        'points': points,
+        'unit': unit,
+        'mode': mode,
+        'transactions': count,
+        'opening': _pesos(opening),
+        'closing': _pesos(opening + sum(income) - sum(expense)),
+        'balance': {'t': [_iso(moment) for moment in times], 'value': [_pesos(cents) for cents in values]},
+        'flows': {
+            't': [_iso(bucket) for bucket in starts],
+            'income': [_pesos(cents) for cents in income],
+            'expense': [_pesos(cents) for cents in expense],
+        },
+    }
+
+
+def series(scope, key, start, end, points=DEFAULT_POINTS):
+    """The chart payload for `scope` ('fund' / 'treasurer' id, or 'all' with key None) over [start, end)."""
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown scope: {scope!r}.")
+    cache_key = f"timeseries:{_version()}:{scope}:{key}:{start.isoformat()}:{end.isoformat()}:{points}"
+    data = cache.get(cache_key)
+    if data is None:
+        data = build_series(scope, key, start, end, points)
+        cache.set(cache_key, data, CACHE_TIMEOUT)
+    return data
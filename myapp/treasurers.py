@@ -0,0 +1,111 @@
+"""
+Treasurer directory queries and set-based status changes.
+
+The directory pages through one status at a time with a keyset on username
+(`WHERE username > last_seen ORDER BY username LIMIT n`, served by the
+treasurer_directory index), so the cost of a page does not grow with the
+number of registrations the way OFFSET does.
+
+The dashboard views approve / disable / enable one treasurer at a time
+through save(update_fields=...). Bulk changes (directory and admin actions)
+go through bulk_set_status() instead: one UPDATE for every treasurer that
+actually changes. UPDATE sends no post_save, so the cached copies used by
+CachedModelBackend are dropped and the audit entries written here.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import audit
+from .backends import invalidate_cached_users
+from .models import Treasurer
+from .readmodels import treasurer_rows
+
+STATUSES = {
+    'pending': Q(is_approved=False, is_superuser=False),
+    'approved': Q(is_approved=True, is_active=True),
+    'disabled': Q(is_approved=True, is_active=False),
+}
+
+# action name -> (audit action, changed fields)
+ACTIONS = {
+    'approve': ('treasurer.approve', {'is_approved': True}),
+    'disable': ('treasurer.disable', {'is_active': False}),
+    'enable': ('treasurer.enable', {'is_active': True}),
+}
+
+PAGE_SIZE = 25
+DASHBOARD_PREVIEW = 10
+MAX_BULK_IDS = 500
+
+
+def status_counts():
+    """{status: number of treasurers} in one query."""
+    return Treasurer.objects.aggregate(**{
+        status: Count('pk', filter=condition) for status, condition in STATUSES.items()
+    })
+
+
+def search(queryset, term):
+    """Prefix match on username, first/last name and branch."""
+    term = (term or '').strip()
+    if not term:
+        return queryset
+    return queryset.filter(
+        Q(username__istartswith=term) |
+        Q(first_name__istartswith=term) |
+        Q(last_name__istartswith=term) |
+        Q(church_branch__istartswith=term)
+    )
+
+
+def directory_page(status, term='', after=None, before=None, per_page=PAGE_SIZE):
+    """
+    One page of the directory as (rows, previous cursor, next cursor).
+
+    `after` / `before` are the last / first username of the neighbouring page;
+    a cursor is None when there is nothing further in that direction.
+    """
+    queryset = search(Treasurer.objects.filter(STATUSES[status]), term)
+
+    if before:
+        rows = treasurer_rows(queryset.filter(username__lt=before).order_by('-username')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        previous_cursor = rows[0].username if has_more else None
+        next_cursor = rows[-1].username if rows else None
+        return rows, previous_cursor, next_cursor
+
+    if after:
+        queryset = queryset.filter(username__gt=after)
+    rows = treasurer_rows(queryset.order_by('username')[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    previous_cursor = rows[0].username if after and rows else None
+    next_cursor = rows[-1].username if has_more else None
+    return rows, previous_cursor, next_cursor
+
+
+def bulk_set_status(actor, queryset, action, **changes):
+    """Applies `changes` (e.g. is_active=False) to `queryset`; returns the number changed."""
+    differs = Q()
+    for field, value in changes.items():
+        differs |= ~Q(**{field: value})
+
+    with transaction.atomic():
+        before = list(queryset.filter(differs).values('pk', *changes))
+        changed = [row.pop('pk') for row in before]
+        if changed:
+            Treasurer.objects.filter(pk__in=changed).update(**changes)
+        for pk, values in zip(changed, before):
+            audit.record(actor, action, 'treasurer', pk, before=values, after=changes)
+
+    invalidate_cached_users(changed)
+    return len(changed)
+
+
+def apply_action(actor, queryset, name):
+    """Runs one of ACTIONS over `queryset`; nobody can disable their own account."""
+    action, changes = ACTIONS[name]
+    if name == 'disable':
+        queryset = queryset.exclude(pk=actor.pk)
+    return bulk_set_status(actor, queryset, action, **changes)
@@ -3,12 +3,16 @@ from django.contrib.auth import login, authenticate, logout, get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.http import require_POST 
 from django.contrib import messages
-from django.http import JsonResponse 
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.db.models import Sum, F, Q
-from django.db import transaction 
+from django.db import router, transaction 
 from .forms import TreasurerRegistrationForm, TreasurerLoginForm, TreasurerProfileForm, TransactionForm, FundCreationForm 
 from .models import Fund, Transaction, TransactionSplit, Treasurer
 from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 from decimal import Decimal, InvalidOperation 
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
@@ -17,6 +21,17 @@ from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from decimal import Decimal, ROUND_HALF_UP
 from django.contrib.auth.hashers import make_password
+import asyncio
+import csv
+import json
+import logging
+from . import audit, balances, batch, events, forecasting, ledger, maintenance, profiling, readmodels, reports, timeseries, treasurers
+from .money import Money, to_cents
+from .registry import get_registry
+from .routers import use_replica
+from .throttle import rejection_counts, reset_username, throttle_auth
+
+logger = logging.getLogger(__name__)
 
 # --- CORE VIEWS ---
 
@@ -35,10 +50,10 @@ def disable_treasurer_view(request, pk):
 
         # 2. Disable the user account (standard way to prevent login)
         treasurer.is_active = False
-        treasurer.save()
+        treasurer.save(update_fields=['is_active'])
         
-        # Optional: Log the action for auditing
-        # logger.info(f"Admin {request.user.username} disabled treasurer {treasurer.username}")
+        audit.record(request.user, 'treasurer.disable', 'treasurer', treasurer.pk,
+                     before={'is_active': True}, after={'is_active': False})
 
         messages.success(request, f"Successfully disabled the account for {treasurer.username}.")
         return redirect('admin_transactions_dashboard') # Redirect back to the dashboard
@@ -54,96 +69,54 @@ def enable_treasurer(request, pk):
     if request.method == 'POST':
         # Use get_object_or_404 for robust error handling
         treasurer = get_object_or_404(Treasurer, pk=pk)
+        was_active = treasurer.is_active
         treasurer.is_active = True
-        treasurer.save()
+        treasurer.save(update_fields=['is_active'])
+        audit.record(request.user, 'treasurer.enable', 'treasurer', treasurer.pk,
+                     before={'is_active': was_active}, after={'is_active': True})
         # Optionally add a success message here
 
     # Redirect back to the admin dashboard
     return redirect('admin_transactions_dashboard')
 
-def calculate_monthly_net_growth(month_start, month_end):
-    """Calculates net income (Income - Expense) for a specific month range."""
-    
-    monthly_transactions = Transaction.objects.filter(
-        transaction_date__gte=month_start,
-        transaction_date__lt=month_end 
-    )
-    
-    monthly_income = monthly_transactions.filter(
-        transaction_type__in=['OFFERING']
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
-    
-    monthly_expense = monthly_transactions.filter(
-        transaction_type__in=['WITHDRAWAL']
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
-    
-    return monthly_income - monthly_expense
-
-
-def calculate_net_growth(start_date, end_date):
-    """Calculates net income (Income - Expense) for a specific date range across ALL funds."""
-    
-    # Calculate total income (OFFERINGs) within the date range
-    income_data = Transaction.objects.filter(
-        transaction_date__range=(start_date, end_date),
-        transaction_type='OFFERING'
-    ).aggregate(total_income=Sum('amount'))
-    total_income = income_data['total_income'] or Decimal('0.00')
-
-    # Calculate total expense (WITHDRAWALs) within the date range
-    expense_data = Transaction.objects.filter(
-        transaction_date__range=(start_date, end_date),
-        transaction_type='WITHDRAWAL'
-    ).aggregate(total_expense=Sum('amount'))
-    total_expense = expense_data['total_expense'] or Decimal('0.00')
-
-    # Net growth = Income - Expense
-    net_growth = total_income - total_expense
-    
-    return net_growth
-
 def is_superuser(user):
     return user.is_authenticated and user.is_superuser
 
 @user_passes_test(is_superuser)
+@use_replica
 def admin_transactions_view(request):
     current_admin = request.user
 
-    all_transactions = Transaction.objects.all().select_related('fund', 'created_by').prefetch_related('splits').order_by('-transaction_date')
-
-    # Add fund display logic for each transaction
-    for transaction in all_transactions:
-        if transaction.splits.exists():
-            # This is a split transaction
-            split_count = transaction.splits.count()
-            transaction.fund_display = f"Split to {split_count} funds"
-        elif transaction.fund:
-            # This is a single fund transaction
-            transaction.fund_display = transaction.fund.name
-        else:
-            # Fallback for any edge cases
-            transaction.fund_display = "Unknown"
+    # Only the five most recent transactions are shown; read them as compact rows
+    recent_transactions = readmodels.transaction_rows(
+        readmodels.transaction_values(Transaction.objects.order_by('-transaction_date', '-id'))[:5]
+    )
 
-    pending_treasurers = Treasurer.objects.filter(is_approved=False, is_superuser=False).order_by('date_created')
+    # Only a preview of each status; the full lists live in the treasurer directory
+    preview = treasurers.DASHBOARD_PREVIEW
 
-    approved_treasurers = User.objects.filter(
-        is_approved=True, 
-        is_active=True
+    pending_treasurers = readmodels.treasurer_rows(
+        Treasurer.objects.filter(treasurers.STATUSES['pending']).order_by('date_created')[:preview]
+    )
+
+    approved_treasurers = readmodels.treasurer_rows(User.objects.filter(
+        treasurers.STATUSES['approved']
     ).exclude(
         pk=current_admin.pk  
-    ).order_by('username')
+    ).order_by('username')[:preview])
 
-    disabled_treasurers = User.objects.filter(
-        is_approved=True, 
-        is_active=False 
-    ).order_by('username')
+    disabled_treasurers = readmodels.treasurer_rows(User.objects.filter(
+        treasurers.STATUSES['disabled']
+    ).order_by('username')[:preview])
     
     context = {
-        'transactions': all_transactions,
-        'total_transactions': all_transactions.count(),
+        'transactions': recent_transactions,
+        'total_transactions': Transaction.objects.count(),
         'pending_treasurers': pending_treasurers,
         'approved_treasurers': approved_treasurers,
-        'disabled_treasurers': disabled_treasurers
+        'disabled_treasurers': disabled_treasurers,
+        'treasurer_counts': treasurers.status_counts(),
+        'throttle_rejections': rejection_counts(),
     }
     
     return render(request, 'admin_transactions_dashboard.html', context)
@@ -156,7 +129,9 @@ def approve_treasurer(request, pk):
     
     if not treasurer.is_approved:
         treasurer.is_approved = True
-        treasurer.save()
+        treasurer.save(update_fields=['is_approved'])
+        audit.record(request.user, 'treasurer.approve', 'treasurer', treasurer.pk,
+                     before={'is_approved': False}, after={'is_approved': True})
         messages.success(request, f"Treasurer {treasurer.username} has been approved and can now log in.")
     else:
         messages.warning(request, f"Treasurer {treasurer.username} was already approved.")
@@ -165,36 +140,123 @@ def approve_treasurer(request, pk):
     return redirect('admin_transactions_dashboard')
 
 
+@user_passes_test(is_superuser)
+@use_replica
+def treasurer_directory_view(request):
+    """All treasurers of one status, with prefix search and keyset pagination."""
+    status = request.GET.get('status')
+    if status not in treasurers.STATUSES:
+        status = 'pending'
+    q = request.GET.get('q', '').strip()
+
+    rows, previous_cursor, next_cursor = treasurers.directory_page(
+        status, q, after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+
+    context = {
+        'treasurers': rows,
+        'status': status,
+        'current_q': q,
+        'counts': treasurers.status_counts(),
+        'previous_cursor': previous_cursor,
+        'next_cursor': next_cursor,
+        'actions': treasurers.ACTIONS,
+    }
+    return render(request, 'treasurer_directory.html', context)
+
+
+@user_passes_test(is_superuser)
+@require_POST
+def treasurer_bulk_action_view(request):
+    """Approve / disable / enable the treasurers ticked in the directory with one UPDATE."""
+    action = request.POST.get('action')
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()][:treasurers.MAX_BULK_IDS]
+
+    if action not in treasurers.ACTIONS:
+        messages.error(request, "Choose an action to apply.")
+    elif not ids:
+        messages.error(request, "Select at least one treasurer.")
+    else:
+        changed = treasurers.apply_action(request.user, Treasurer.objects.filter(pk__in=ids), action)
+        messages.success(request, f"{action.title()}d {changed} of {len(ids)} selected treasurer(s).")
+
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('treasurer_directory')
+    return redirect(next_url)
+
+
+@user_passes_test(is_superuser)
+def profiles_view(request):
+    """Request profiles captured by this worker (see myapp.profiling)."""
+    context = {
+        'profiles': profiling.recent_profiles(),
+        'ring_size': settings.PROFILER_RING_SIZE,
+        'enabled': settings.PROFILER_ENABLED,
+        'query_param': settings.PROFILER_QUERY_PARAM,
+    }
+    return render(request, 'profiles.html', context)
+
+
+@user_passes_test(is_superuser)
+def profile_detail_view(request, profile_id):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise Http404("Profile not found; it may have been evicted or captured by another worker.")
+    return render(request, 'profile_detail.html', {'profile': profile})
+
+
+@user_passes_test(is_superuser)
+def database_health_view(request):
+    """File, table and index sizes and their trends (see myapp.maintenance)."""
+    try:
+        context = maintenance.health()
+    except maintenance.MaintenanceError as e:
+        context = {'error': str(e)}
+    return render(request, 'database_health.html', context)
+
+
+def _hot_page_engine():
+    """Template engine for the pages with Jinja2 ports (JINJA2_TEMPLATES); None is the Django engine."""
+    return 'jinja2' if settings.JINJA2_TEMPLATES else None
+
+
+@use_replica
 def index(request):
-    funds = Fund.objects.all().order_by('id') 
-    total_data = funds.aggregate(total_balance=Sum('current_balance'))
-    total_balance = total_data.get('total_balance') or Decimal('0.00')
+    # Balances include any sharded deltas not yet compacted (see myapp.balances)
+    funds = balances.apply(list(Fund.objects.all().order_by('id')))
+    total_balance = sum((fund.current_balance for fund in funds), Decimal('0.00'))
+
+    # Trend + seasonality projections for every fund (cached per month/week)
+    forecast = forecasting.get_forecast()
+    forecast_by_fund = {entry['fund_id']: entry for entry in forecast['funds']}
+    for fund in funds:
+        fund.forecast = forecast_by_fund.get(fund.id)
     
     now = timezone.now()
     
-    # 1. Calculate This Month's Net Growth
-    start_of_current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # 1. Calculate This Month's Net Growth (local calendar month)
+    start_of_current_month = reports.period_start('month', now)
     
-    this_month_growth = calculate_monthly_net_growth(start_of_current_month, now)
+    this_month_growth = reports.net_growth(reports.local_midnight(start_of_current_month), now)
     
     # 2. Calculate Average Monthly Growth
-    all_growth_values = []
-    
+    # The 12 full historical months come from one grouped query (or the
+    # report cache, since those months are closed)
     start_date = start_of_current_month - relativedelta(months=12)
+    monthly_totals = reports.period_totals('month', start_date, start_of_current_month)
     
-    # Loop through the 12 full historical months
-    for i in range(12):
-        month_start = start_date + relativedelta(months=i)
-        month_end = start_date + relativedelta(months=i + 1)
-        
-        net_growth = calculate_monthly_net_growth(month_start, month_end)
-        all_growth_values.append(net_growth)
+    # Added up in integer centavos (see myapp.money)
+    all_growth_values = [
+        sum(to_cents(income) - to_cents(expense) for income, expense in fund_totals.values())
+        for fund_totals in monthly_totals.values()
+    ]
 
     # Calculate the average
     if all_growth_values:
         total_growth_sum = sum(all_growth_values)
         num_months = len(all_growth_values)
-        avg_monthly_growth = total_growth_sum / num_months
+        avg_monthly_growth = Money.from_cents(round(total_growth_sum / num_months))
     else:
         avg_monthly_growth = Decimal('0.00')
         
@@ -206,30 +268,133 @@ def index(request):
         'this_month_growth': this_month_growth, 
         'avg_monthly_growth': avg_monthly_growth,
         'recent_transactions': recent_transactions,
+        'forecast': forecast,
+    }
+    return render(request, 'index.html', context, using=_hot_page_engine())
+
+
+@use_replica
+def fund_forecast_view(request):
+    """Per-fund trend, seasonality and 3/6/12-month projections as JSON."""
+    return JsonResponse(forecasting.get_forecast())
+
+
+def _ledger_page(request, pk):
+    """(fund, page) for the ledger views; raises Http404 / ledger.InvalidCursor."""
+    fund = get_registry().get(pk)
+    if fund is None:
+        raise Http404('No such fund.')
+    try:
+        limit = int(request.GET.get('limit', ledger.PAGE_SIZE))
+    except ValueError:
+        limit = ledger.PAGE_SIZE
+    return fund, ledger.ledger_page(fund.id, request.GET.get('cursor'), limit)
+
+
+@login_required
+@use_replica
+def fund_ledger_view(request, pk):
+    """A fund's direct transactions and split allocations with running balances."""
+    try:
+        fund, page = _ledger_page(request, pk)
+    except ledger.InvalidCursor:
+        return redirect('fund_ledger', pk=pk)
+    context = {
+        'fund': fund,
+        'balance': balances.get(fund.id),
+        'entries': page['entries'],
+        'next_cursor': page['next_cursor'],
+        'is_first_page': not request.GET.get('cursor'),
     }
-    return render(request, 'index.html', context)
+    return render(request, 'fund_ledger.html', context)
 
+
+@login_required
+@use_replica
+def fund_ledger_json_view(request, pk):
+    """JSON version of the fund ledger; follow next_cursor for older entries."""
+    try:
+        fund, page = _ledger_page(request, pk)
+    except ledger.InvalidCursor as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({
+        'fund': {'id': fund.id, 'name': fund.name},
+        'entries': [
+            {**entry, 'amount': str(entry['amount']), 'balance': str(entry['balance'])}
+            for entry in page['entries']
+        ],
+        'next_cursor': page['next_cursor'],
+    })
+
+def _timeseries_response(request, scope, key, label):
+    try:
+        start, end, points = timeseries.parse_range(request.GET)
+        data = timeseries.series(scope, key, start, end, points)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'label': label, **data})
+
+
+@login_required
+@use_replica
+def funds_timeseries_view(request):
+    """Combined balance and flows of every fund, downsampled for a chart (see myapp.timeseries)."""
+    return _timeseries_response(request, 'all', None, 'All funds')
+
+
+@login_required
+@use_replica
+def fund_timeseries_view(request, pk):
+    """One fund's balance and flows, downsampled for a chart."""
+    fund = get_registry().get(pk)
+    if fund is None:
+        raise Http404('No such fund.')
+    return _timeseries_response(request, 'fund', fund.id, fund.name)
+
+async def fund_events_view(request):
+    """
+    Server-sent stream of balance snapshots and transaction deltas.
+
+    Only served by the ASGI app; a WSGI worker answers 204 so EventSource
+    stops reconnecting instead of pinning a sync worker. Streams end after
+    LIVE_EVENTS_STREAM_SECONDS and the browser reconnects on its own.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    async def stream():
+        queue = events.hub.subscribe()
+        try:
+            yield b"retry: 5000\n\n"
+            yield events.encode('balances', await sync_to_async(events.balance_snapshot)())
+            deadline = asyncio.get_running_loop().time() + settings.LIVE_EVENTS_STREAM_SECONDS
+            while asyncio.get_running_loop().time() < deadline:
+                try:
+                    yield await asyncio.wait_for(queue.get(), settings.LIVE_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            events.hub.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@throttle_auth('login', 'login.html')
 def login_view(request):
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
         
-        # Debug: Check if user exists
-        try:
-            user_exists = Treasurer.objects.get(username=username)
-            print(f"DEBUG: User {username} exists. Active: {user_exists.is_active}, Approved: {user_exists.is_approved}, Superuser: {user_exists.is_superuser}")
-        except Treasurer.DoesNotExist:
-            print(f"DEBUG: User {username} does not exist")
-            messages.error(request, f'User {username} not found.')
-            return render(request, 'login.html')
-        
         user = authenticate(request, username=username, password=password)
         
         if user is not None:
-            print(f"DEBUG: Authentication successful for {username}")
             # 1. Check for Approval
             if user.is_approved:
                 login(request, user)
+                reset_username('login', username)
                 messages.success(request, f'Welcome back, {username}!')
                 
                 # 2. Check for Superuser Role and Redirect
@@ -243,7 +408,6 @@ def login_view(request):
                 
         else:
             # User is NOT authenticated (invalid credentials)
-            print(f"DEBUG: Authentication failed for {username}")
             messages.error(request, 'Invalid username or password.')
     
     return render(request, 'login.html')
@@ -254,11 +418,14 @@ def logout_view(request):
     messages.success(request, 'You have been logged out successfully.')
     return redirect('login')
 
+@throttle_auth('register', 'register.html')
 def register_view(request):
     if request.method == 'POST':
         form = TreasurerRegistrationForm(request.POST)
         if form.is_valid():
-            form.save()
+            new_treasurer = form.save()
+            audit.record(None, 'treasurer.register', 'treasurer', new_treasurer.pk,
+                         after=audit.snapshot(new_treasurer, ['username', 'email']))
             messages.success(request, 'Account created successfully! Please wait for admin approval.')
             return redirect('login')
         else:
@@ -271,14 +438,14 @@ def register_view(request):
     return render(request, 'register.html', {'form': form})
 
 @login_required
+@use_replica
 def profile_view(request):
     treasurer = request.user
     
     # --- STATISTICS CALCULATION ---
     now = timezone.now()
 
-    total_managed_data = Fund.objects.all().aggregate(total=Sum('current_balance'))
-    total_managed_funds = total_managed_data.get('total') or Decimal('0.00')
+    total_managed_funds = balances.total()
 
     start_of_current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
@@ -293,7 +460,7 @@ def profile_view(request):
 
     days_ago_30 = now - timedelta(days=30)
 
-    net_growth_30_days = calculate_net_growth(days_ago_30, now)
+    net_growth_30_days = reports.net_growth(days_ago_30, now)
 
     balance_30_days_ago = total_managed_funds - net_growth_30_days
     growth_percentage = Decimal('0.00')
@@ -303,9 +470,15 @@ def profile_view(request):
     # --- END STATISTICS CALCULATION ---
     
     if request.method == 'POST':
+        # Captured before binding: validation copies the submitted values onto the instance
+        before = audit.snapshot(treasurer, TreasurerProfileForm.Meta.fields)
         form = TreasurerProfileForm(request.POST, request.FILES, instance=treasurer)
         if form.is_valid():
             form.save()
+            if form.changed_data:
+                audit.record(request.user, 'treasurer.update_profile', 'treasurer', treasurer.pk,
+                             before={f: before[f] for f in form.changed_data},
+                             after=audit.snapshot(treasurer, form.changed_data))
             messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
     else:
@@ -320,7 +493,7 @@ def profile_view(request):
         'growth_percentage': growth_percentage, 
     }
     
-    return render(request, 'profile.html', context)
+    return render(request, 'profile.html', context, using=_hot_page_engine())
 
 def admin_view_treasurer_profile(request, pk):
     # 1. Fetch the Treasurer object or return a 404 error
@@ -346,14 +519,11 @@ def admin_view_treasurer_profile(request, pk):
     # Get ALL transactions, ordered descending
     all_transactions = Transaction.objects.filter(created_by=treasurer).order_by('-transaction_date')
     
-    # Set up Paginator: 5 items per page
-    paginator = Paginator(all_transactions, 5) 
-    
     # Get the requested page number from the URL (defaults to 1)
     page_number = request.GET.get('page')
     
-    # Get the Page object for the requested page number
-    recent_transactions_page = paginator.get_page(page_number)
+    # Page of compact rows, 5 items per page
+    recent_transactions_page = readmodels.transaction_page(all_transactions, Paginator, 5, page_number)
     
     # --- END PAGINATION LOGIC ---
 
@@ -366,33 +536,29 @@ def admin_view_treasurer_profile(request, pk):
         # CHANGED: Pass the Paginator Page object instead of the sliced queryset
         'recent_transactions_page': recent_transactions_page, 
         
-        # Placeholder data for the chart script
-        'chart_labels': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'],
-        'chart_data': [12000, 19000, 15000, 25000, 22000, 30000], 
+        # The chart loads its data from treasurer_timeseries
+        'chart_points': 24,
     }
     
     return render(request, 'admin_view_treasurer_profile.html', context)
 
-@login_required
-def transactions_list_view(request):
-    # Set the desired items per page
-    ITEMS_PER_PAGE = 10 
 
-    # 1. Base Query: Prefetch related data to prevent N+1 queries in the template
-    transactions_queryset = Transaction.objects.all() \
-        .order_by('-transaction_date', '-id') \
-        .select_related('fund', 'created_by') \
-        .prefetch_related('splits__fund') 
+@user_passes_test(is_superuser)
+@use_replica
+def treasurer_timeseries_view(request, pk):
+    """What a treasurer recorded over time, downsampled for a chart."""
+    treasurer = get_object_or_404(Treasurer, pk=pk)
+    return _timeseries_response(request, 'treasurer', treasurer.pk, treasurer.username)
 
-    all_funds = Fund.objects.all().order_by('name')
+def _filtered_transactions(request):
+    """The transaction list's type / fund / search filters, shared with the CSV export."""
+    transactions_queryset = Transaction.objects.order_by('-transaction_date', '-id')
 
     # Get current filter/search values for context and pagination links
     current_type = request.GET.get('type')
     current_fund = request.GET.get('fund')
     current_q = request.GET.get('q')
 
-    # --- 2. Filtering Logic ---
-    
     # Filter by Transaction Type (OFFERING or WITHDRAWAL)
     if current_type in ['OFFERING', 'WITHDRAWAL']:
         transactions_queryset = transactions_queryset.filter(transaction_type=current_type)
@@ -415,33 +581,33 @@ def transactions_list_view(request):
             Q(created_by__first_name__icontains=current_q) |
             Q(created_by__last_name__icontains=current_q)
         ).distinct()
+
+    return transactions_queryset, current_type, current_fund, current_q
+
+
+@login_required
+@use_replica
+def transactions_list_view(request):
+    # Set the desired items per page
+    ITEMS_PER_PAGE = 10 
+
+    # 1. Filtered query (split details are denormalized on Transaction)
+    transactions_queryset, current_type, current_fund, current_q = _filtered_transactions(request)
+
+    all_funds = get_registry().by_name
         
-    # --- 3. Total Balance Calculation (Organizational Balance) ---
+    # --- 2. Total Balance Calculation (Organizational Balance) ---
     
     # Sum the current balance of all funds (Correct way)
-    total_balance_agg = Fund.objects.aggregate(
-        total_current_balance=Sum('current_balance')
-    )['total_current_balance']
-
-    total_balance = total_balance_agg or Decimal('0.00')
+    total_balance = balances.total()
 
-    # --- 4. Pagination ---
-    paginator = Paginator(transactions_queryset, ITEMS_PER_PAGE)
+    # --- 3. Pagination ---
+    # Rows are compact read models: only the displayed columns plus a
+    # description preview; full descriptions load in one query when shown
     page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = readmodels.transaction_page(transactions_queryset, Paginator, ITEMS_PER_PAGE, page_number)
 
-    for transaction in page_obj.object_list:
-        if transaction.splits.exists():
-            for split in transaction.splits.all():
-                # Calculate the percentage
-                try:
-                    percentage = (split.amount_allocated / transaction.amount) * 100
-                    # Attach the new attribute to the split object
-                    split.percentage = round(percentage, 0)
-                except (ZeroDivisionError, TypeError):
-                    split.percentage = 0
-    
-    # --- 5. Prepare Context ---
+    # --- 4. Prepare Context ---
     context = {
         'page_obj': page_obj, # Contains the paginated transactions
         'transactions': page_obj.object_list, # The actual list of 10 transactions
@@ -454,7 +620,89 @@ def transactions_list_view(request):
         'current_q': current_q,
     }
     
-    return render(request, 'transaction.html', context)
+    return render(request, 'transaction.html', context, using=_hot_page_engine())
+
+
+class _Echo:
+    """File-like object whose write() hands the CSV line back to the streaming response."""
+    def write(self, value):
+        return value
+
+
+@login_required
+@use_replica
+def transactions_csv_view(request):
+    """Streams the filtered transaction list as CSV without building it in memory."""
+    # The rows are read after the view returns and use_replica has reset the
+    # routing, so bind the queryset to the database chosen for this request
+    transactions_queryset = _filtered_transactions(request)[0].using(router.db_for_read(Transaction))
+    writer = csv.writer(_Echo())
+
+    def rows():
+        yield writer.writerow(['ID', 'Date', 'Type', 'Amount', 'Fund', 'Recorded By', 'Description'])
+        for row in readmodels.iter_transaction_rows(transactions_queryset):
+            yield writer.writerow([
+                row.id,
+                timezone.localtime(row.transaction_date).strftime('%Y-%m-%d %H:%M'),
+                row.get_transaction_type_display(),
+                row.amount,
+                row.fund_label,
+                row.recorder_name,
+                row.description,
+            ])
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
+    return response
+
+def _report_params(request):
+    """Reads period/start/end from the query string, defaulting to the last 12 periods."""
+    period = request.GET.get('period')
+    if period not in reports.PERIODS:
+        period = 'month'
+    
+    today = timezone.localdate()
+    try:
+        end = date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        end = today
+    try:
+        start = date.fromisoformat(request.GET.get('start', ''))
+    except ValueError:
+        start = reports.period_start(period, today) - reports.PERIODS[period][1] * 11
+    
+    return period, start, end
+
+@login_required
+@use_replica
+def reports_view(request):
+    period, start, end = _report_params(request)
+    
+    context = {
+        'rows': reports.build_report(period, start, end + timedelta(days=1)),
+        'periods': list(reports.PERIODS),
+        'period': period,
+        'start': start,
+        'end': end,
+    }
+    return render(request, 'reports.html', context)
+
+@login_required
+@use_replica
+def reports_csv_view(request):
+    period, start, end = _report_params(request)
+    
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="fund-report-{period}-{start}-{end}.csv"'
+    
+    writer = csv.writer(response)
+    writer.writerow(['Period Start', 'Period End', 'Fund', 'Income', 'Expense', 'Net'])
+    for row in reports.build_report(period, start, end + timedelta(days=1)):
+        for fund in row['funds']:
+            writer.writerow([row['start'], row['end'], fund['name'], fund['income'], fund['expense'], fund['net']])
+        writer.writerow([row['start'], row['end'], 'All Funds', row['income'], row['expense'], row['net']])
+    
+    return response
 
 @require_http_methods(["POST", "DELETE"])
 def delete_transaction_view(request, pk):
@@ -465,7 +713,9 @@ def delete_transaction_view(request, pk):
     # Optional: Add permission checks here (e.g., if request.user is not admin)
     
     try:
+        before = audit.snapshot(transaction, audit.TRANSACTION_FIELDS)
         transaction.delete()
+        audit.record(request.user, 'transaction.delete', 'transaction', pk, before=before)
         messages.success(request, f"Transaction #{pk} successfully deleted.")
     except Exception as e:
         messages.error(request, f"Error deleting transaction: {e}")
@@ -490,6 +740,8 @@ def create_fund(request):
             return redirect('index') 
 
         fund.save()
+        audit.record(request.user, 'fund.create', 'fund', fund.pk,
+                     after=audit.snapshot(fund, ['name', 'fund_type', 'default_percentage']))
         messages.success(request, f'New Fund "{fund.name}" created successfully!')
         return redirect(reverse('index') + '#funds-page')
         
@@ -523,83 +775,79 @@ def quick_split_transaction(request):
             messages.error(request, "Total offering must be a positive amount.")
             return redirect(reverse('index') + '#funds-page')
 
+        # Fund metadata and the split plan come from the in-process registry
+        registry = get_registry()
+        general_fund = registry.general_fund
+        
         # Identify a designated fund for handling rounding differences (e.g., 'General Fund')
-        try:
-            # ASSUMPTION: Replace 'General Fund' with the actual name of your catch-all fund
-            general_fund = Fund.objects.get(name='General Fund') 
-        except Fund.DoesNotExist:
+        if general_fund is None:
             messages.error(request, "Setup error: 'General Fund' not found to handle allocation differences.")
             return redirect(reverse('index') + '#funds-page')
-            
-        # Get all funds *except* the general fund to calculate splits first
-        split_funds = Fund.objects.filter(default_percentage__gt=0).exclude(pk=general_fund.pk)
         
         # If no split funds exist, just allocate the full amount to the general fund
-        if not split_funds.exists() and general_fund.default_percentage == 0:
+        if not registry.split_plan and general_fund.default_percentage == 0:
             messages.warning(request, "Cannot perform quick split: Only the General Fund exists, but it has a 0% split. Please update percentages.")
             return redirect(reverse('index') + '#funds-page')
 
-        # --- 2. Create Single Parent Transaction ---
+        # --- 2. Allocate by Percentage; the General Fund takes the remainder ---
+        # (covers both its own percentage and any rounding difference)
+        allocations = registry.allocate(total_amount)
+
+        # --- 3. Create Single Parent Transaction (with its split summary) ---
         parent_transaction = Transaction.objects.create(
             transaction_type='OFFERING', 
             amount=total_amount,
             fund=None, 
             description=f"Quick Split Offering (Total: ₱{total_amount:,.2f})",
             created_by=request.user,
+            **Transaction.split_fields(
+                [(registry.get(fund_id), amount) for fund_id, amount in allocations], total_amount,
+            ),
         )
-
-        total_allocated = Decimal('0.00')
         
-        # --- 3. Process Splits for Non-General Funds ---
-        for fund in split_funds:
-            percentage = fund.default_percentage / Decimal('100.0')
-            
-            # CRITICAL: Round the allocated amount to ensure accuracy
-            allocated_amount = (total_amount * percentage).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
-            
-            if allocated_amount > Decimal('0.00'):
-                # Update Fund Balance
-                fund.current_balance = F('current_balance') + allocated_amount
-                fund.save(update_fields=['current_balance'])
-                
-                # Create the CHILD TransactionSplit Record
-                TransactionSplit.objects.create(
-                    parent_transaction=parent_transaction,
-                    fund=fund,
-                    amount_allocated=allocated_amount
-                )
-                total_allocated += allocated_amount
-
-        # --- 4. Allocate Remaining Amount to General Fund (The "Remainder") ---
-        # The remainder covers both the General Fund's intended percentage *and* any rounding difference
+        for fund_id, allocated_amount in allocations:
+            # Update Fund Balance (Atomically)
+            balances.add(fund_id, allocated_amount)
         
-        # Calculate the General Fund's intended percentage amount
-        general_fund_percentage = general_fund.default_percentage / Decimal('100.0')
-        general_fund_intended_amount = (total_amount * general_fund_percentage).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
-        
-        # Calculate the actual remainder: Total amount minus all amounts allocated so far
-        remainder_amount = total_amount - total_allocated
-        
-        if remainder_amount > Decimal('0.00'):
-            # Update General Fund Balance (Atomically)
-            general_fund.current_balance = F('current_balance') + remainder_amount
-            general_fund.save(update_fields=['current_balance'])
-            
-            # Create the CHILD TransactionSplit Record for the remainder
-            TransactionSplit.objects.create(
-                parent_transaction=parent_transaction,
-                fund=general_fund,
-                amount_allocated=remainder_amount
-            )
+        # --- 4. Create the CHILD TransactionSplit Records ---
+        TransactionSplit.objects.bulk_create([
+            TransactionSplit(parent_transaction=parent_transaction, fund_id=fund_id, amount_allocated=allocated_amount)
+            for fund_id, allocated_amount in allocations
+        ])
+        audit.record(request.user, 'transaction.create', 'transaction', parent_transaction.pk,
+                     after=audit.snapshot(parent_transaction, audit.TRANSACTION_FIELDS))
 
         # --- 5. Final Message and Redirect ---
-        messages.success(request, f"Quick Split successful. Total ₱{total_amount:,.2f} recorded and split across {split_funds.count() + 1} funds.")
+        messages.success(request, f"Quick Split successful. Total ₱{total_amount:,.2f} recorded and split across {len(registry.split_plan) + 1} funds.")
         return redirect(reverse('index') + '#funds-page')
 
     except Exception as e:
         messages.error(request, f'A critical error occurred during the split: {e}')
         return redirect(reverse('index') + '#funds-page')
 
+@login_required
+@require_POST
+def batch_entries_view(request):
+    """
+    Applies a batch of queued offline entries (quick splits, specific offerings,
+    withdrawals) in one atomic unit and returns a result per entry.
+    """
+    try:
+        entries = json.loads(request.body)['entries']
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Expected {"entries": [...]}.'}, status=400)
+
+    if len(entries) > batch.MAX_ENTRIES:
+        return JsonResponse({
+            'success': False,
+            'message': f'At most {batch.MAX_ENTRIES} entries per batch.',
+        }, status=400)
+
+    results, fund_balances = batch.apply_entries(request.user, entries)
+    return JsonResponse({'success': True, 'results': results, 'balances': fund_balances})
+
 @login_required
 @require_POST
 @transaction.atomic 
@@ -615,19 +863,22 @@ def deposit_to_funds(request):
                 if amount_to_add <= Decimal('0.00'):
                     continue
                     
-                fund_obj = Fund.objects.get(pk=fund_pk)
+                fund_obj = get_registry().get(fund_pk)
+                if fund_obj is None:
+                    raise Fund.DoesNotExist
                 
-                Transaction.objects.create(
-                    fund=fund_obj,
+                deposit = Transaction.objects.create(
+                    fund_id=fund_obj.id,
+                    fund_label=fund_obj.name,
                     transaction_type='OFFERING',
                     amount=amount_to_add,
                     description=f"Specific deposit to {fund_obj.name} fund via admin panel.",
                     created_by=request.user
                 )
                 
-                Fund.objects.filter(pk=fund_pk).update(
-                    current_balance=F('current_balance') + amount_to_add
-                )
+                balances.add(fund_pk, amount_to_add)
+                audit.record(request.user, 'transaction.create', 'transaction', deposit.pk,
+                             after=audit.snapshot(deposit, audit.TRANSACTION_FIELDS))
                 
                 successful_deposits += 1
 
@@ -648,7 +899,6 @@ def deposit_to_funds(request):
 
 @login_required
 @require_POST
-@transaction.atomic
 def handle_transaction(request):
     post_data = request.POST.copy()
     js_transaction_type = post_data.get('transaction_type')
@@ -669,19 +919,23 @@ def handle_transaction(request):
         amount = form.cleaned_data['amount']
         
         try:
-            # 2. Check for Insufficient funds
-            if fund.current_balance < amount:
-                return JsonResponse({'success': False, 'message': 'Insufficient funds for withdrawal.'}, status=400)
-            
-            # 3. Process Withdrawal
-            fund.current_balance -= amount
-            fund.save(update_fields=['current_balance'])
-            
-            transaction_record = form.save(commit=False)
-            transaction_record.created_by = request.user
-            transaction_record.transaction_type = 'WITHDRAWAL'
-            transaction_record.transaction_date = timezone.now()
-            transaction_record.save()
+            # The form's fund lookup runs outside the transaction, so its first
+            # statement is the balance UPDATE and it holds the write lock from then on
+            with transaction.atomic():
+                # 2. Take the amount out first, then check what is left
+                try:
+                    fund.current_balance = balances.withdraw(fund.pk, amount)
+                except balances.InsufficientFunds as e:
+                    return JsonResponse({'success': False, 'message': str(e)}, status=400)
+                
+                # 3. Record the Withdrawal
+                transaction_record = form.save(commit=False)
+                transaction_record.created_by = request.user
+                transaction_record.transaction_type = 'WITHDRAWAL'
+                transaction_record.transaction_date = timezone.now()
+                transaction_record.save()
+                audit.record(request.user, 'transaction.create', 'transaction', transaction_record.pk,
+                             after=audit.snapshot(transaction_record, audit.TRANSACTION_FIELDS))
             
             # 4. Success return
             return JsonResponse({
@@ -690,10 +944,10 @@ def handle_transaction(request):
                 'new_balance': float(fund.current_balance)
             })
 
-        except Exception as e:
-            # 5. Critical Error return (Server 500)
-            print(f"Transaction Error: {e}") 
-            return JsonResponse({'success': False, 'message': f'A critical server error occurred: {e}'}, status=500)
+        except Exception:
+            # 5. Critical Error return (Server 500); the balance change was rolled back
+            logger.exception("Withdrawal of %s from fund %s failed", amount, fund.pk)
+            return JsonResponse({'success': False, 'message': 'A server error occurred. The withdrawal was not recorded.'}, status=500)
 
     # 6. Form Validation Error return (Client 400)
     errors = dict(form.errors.items())
@@ -735,10 +989,14 @@ def save_default_split(request):
         }, status=400)
 
     try:
+        before, after = {}, {}
         for fund_id, percentage in updates.items():
             fund = get_object_or_404(Fund, pk=fund_id)
+            before[fund_id] = fund.default_percentage
             fund.default_percentage = percentage
             fund.save(update_fields=['default_percentage'])
+            after[fund_id] = fund.default_percentage
+        audit.record(request.user, 'fund.save_split', 'split_config', before=before, after=after)
 
         return JsonResponse({'success': True, 'message': 'Default offering split saved successfully.'})
 
@@ -778,10 +1036,10 @@ def fund_debug_view(request):
     else:
         message = None
     
-    funds = Fund.objects.all()
+    funds = balances.apply(list(Fund.objects.all()))
     context = {
         'funds': funds,
-        'total_funds': funds.count(),
+        'total_funds': len(funds),
         'message': message
     }
     return render(request, 'fund_debug.html', context)
@@ -802,6 +1060,8 @@ def simple_create_admin(request):
                 )
                 admin.set_password('admin123')
                 admin.save()
+                audit.record(None, 'treasurer.create_admin', 'treasurer', admin.pk,
+                             after=audit.snapshot(admin, ['username', 'email']))
                 return render(request, 'create_admin_simple.html', {'message': 'Admin created! Username: admin, Password: admin123'})
             else:
                 return render(request, 'create_admin_simple.html', {'message': 'Admin already exists!'})
@@ -845,6 +1105,8 @@ def create_admin_view(request):
             )
             admin.set_password(password)  # Use set_password for proper hashing
             admin.save()
+            audit.record(None, 'treasurer.create_admin', 'treasurer', admin.pk,
+                         after=audit.snapshot(admin, ['username', 'email']))
             
             # Create General Fund if it doesn't exist
             if not Fund.objects.filter(name='General Fund').exists():
@@ -881,21 +1143,21 @@ def undo_transaction(request, transaction_id):
         if trans.splits.exists():
             for split in trans.splits.all():
                 # Reverse the fund balance changes
-                split.fund.current_balance = F('current_balance') - split.amount_allocated
-                split.fund.save(update_fields=['current_balance'])
+                balances.add(split.fund_id, -split.amount_allocated)
         
         # Handle single fund transactions
         elif trans.fund:
             if trans.transaction_type == 'OFFERING':
                 # Reverse offering by subtracting amount
-                trans.fund.current_balance = F('current_balance') - trans.amount
+                balances.add(trans.fund_id, -trans.amount)
             else:  # WITHDRAWAL
                 # Reverse withdrawal by adding amount back
-                trans.fund.current_balance = F('current_balance') + trans.amount
-            trans.fund.save(update_fields=['current_balance'])
+                balances.add(trans.fund_id, trans.amount)
         
         # Delete the transaction
+        before = audit.snapshot(trans, audit.TRANSACTION_FIELDS)
         trans.delete()
+        audit.record(request.user, 'transaction.undo', 'transaction', transaction_id, before=before)
         
         messages.success(request, f"Transaction of ₱{trans.amount:,.2f} has been successfully undone.")
         
@@ -904,7 +1166,12 @@ def undo_transaction(request, transaction_id):
     
     return redirect(reverse('index') + '#funds-page')
 
+@login_required
+@require_POST
+@transaction.atomic
 def specific_multi_transaction(request):
+    registry = get_registry()
+    
     # This dictionary will store Fund ID -> Amount pairs
     fund_allocations = {}
     total_offering = Decimal('0.00')
@@ -913,11 +1180,13 @@ def specific_multi_transaction(request):
     for key, value in request.POST.items():
         if key.startswith('fund_') and key.endswith('_amount') and value:
             try:
-                fund_id = key.split('_')[1]
+                fund = registry.get(key.split('_')[1])
                 # Ensure the value is treated as a Decimal and strip commas/spaces
                 amount = Decimal(value.replace(',', '').strip()) 
+                if fund is None:
+                    raise ValueError(f"Unknown fund in {key}")
                 if amount > Decimal('0.00'):
-                    fund_allocations[fund_id] = amount
+                    fund_allocations[fund] = amount
                     total_offering += amount
             except Exception:
                 messages.error(request, "Invalid amount provided for one of the funds.")
@@ -931,36 +1200,31 @@ def specific_multi_transaction(request):
 
     # --- HANDLE SINGLE FUND CASE (num_funds == 1) ---
     if num_funds == 1:
-        # Get the single fund ID and amount
-        fund_id = list(fund_allocations.keys())[0]
-        amount = fund_allocations[fund_id]
-        
-        # Look up the fund object
-        fund_obj = Fund.objects.get(pk=fund_id)
+        # Get the single fund and amount
+        fund, amount = next(iter(fund_allocations.items()))
         
         # 1. Create a standard single transaction (no split necessary)
-        Transaction.objects.create(
+        single = Transaction.objects.create(
             transaction_type='OFFERING', 
-            fund=fund_obj,
+            fund_id=fund.id,
+            fund_label=fund.name,
             amount=amount,
-            description=f"Specific Offering to {fund_obj.name}",
+            description=f"Specific Offering to {fund.name}",
             created_by=request.user,
         )
         
         # 2. Update Fund Balance (Atomically)
-        fund_obj.current_balance = F('current_balance') + amount
-        fund_obj.save(update_fields=['current_balance'])
+        balances.add(fund.id, amount)
+        audit.record(request.user, 'transaction.create', 'transaction', single.pk,
+                     after=audit.snapshot(single, audit.TRANSACTION_FIELDS))
         
-        messages.success(request, f"Specific offering of ₱{total_offering:,.2f} recorded for {fund_obj.name}.")
+        messages.success(request, f"Specific offering of ₱{total_offering:,.2f} recorded for {fund.name}.")
         return redirect(reverse('index') + '#funds-page')
 
     # --- HANDLE MULTIPLE FUNDS CASE (num_funds >= 2) ---
     
-    # 1. Retrieve the names of the funds involved for a better description
-    fund_names = []
-    # Fetching names outside the loop to prepare the description
-    for fund_id in fund_allocations.keys():
-        fund_names.append(Fund.objects.get(pk=fund_id).name)
+    # 1. The names of the funds involved make a better description
+    fund_names = [fund.name for fund in fund_allocations]
     
     # Create a concise list string for the description
     if num_funds == 2:
@@ -974,28 +1238,21 @@ def specific_multi_transaction(request):
         transaction_type='OFFERING', 
         amount=total_offering,
         fund=None, # Assuming fund is nullable or set to a default fund object
-        # --- MODIFIED DESCRIPTION HERE ---
         description=f"Specific Multi-Fund Offering (Allocated to {fund_list_str}) (Total: ₱{total_offering:,.2f})",
-        # ---------------------------------
         created_by=request.user,
+        **Transaction.split_fields(fund_allocations.items(), total_offering),
     )
     
-    # The individual saving is more robust than bulk_update when using F expressions
+    # 3. Update Fund Balances (Atomically) and Create TransactionSplit records
+    for fund, amount_allocated in fund_allocations.items():
+        balances.add(fund.id, amount_allocated)
     
-    # 3. Process Splits, Update Fund Balances, and Create TransactionSplit records
-    for fund_id, amount_allocated in fund_allocations.items():
-        fund_obj = Fund.objects.get(pk=fund_id)
-        
-        # A. Update Fund Balance (Atomically)
-        fund_obj.current_balance = F('current_balance') + amount_allocated
-        fund_obj.save(update_fields=['current_balance'])
-        
-        # B. Create the CHILD TransactionSplit Record
-        TransactionSplit.objects.create(
-            parent_transaction=parent_transaction,
-            fund=fund_obj,
-            amount_allocated=amount_allocated
-        )
+    TransactionSplit.objects.bulk_create([
+        TransactionSplit(parent_transaction=parent_transaction, fund_id=fund.id, amount_allocated=amount_allocated)
+        for fund, amount_allocated in fund_allocations.items()
+    ])
+    audit.record(request.user, 'transaction.create', 'transaction', parent_transaction.pk,
+                 after=audit.snapshot(parent_transaction, audit.TRANSACTION_FIELDS))
         
     messages.success(request, f"Specific offering of ₱{total_offering:,.2f} successfully split across {num_funds} funds.")
-    return redirect(reverse('index') + '#funds-page')
\ No newline at end of file
+    return redirect(reverse('index') + '#funds-page')
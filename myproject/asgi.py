@@ -3,6 +3,15 @@ ASGI config for myproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is what production serves, for the whole site (Procfile, render.yaml,
+railway.json: gunicorn with uvicorn workers). /funds/events/ holds a
+server-sent events stream open for minutes per dashboard. Under WSGI each
+stream would hold a whole sync worker, and Render and Railway give a service
+a single port, so the events path can't be split off to a separate ASGI
+server without adding a proxy. Sync views still work: Django runs them, one
+at a time per worker, on that worker's sync thread. That is the same
+concurrency as a gunicorn sync worker, plus a thread hop per request.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
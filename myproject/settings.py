@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -30,7 +31,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'myapp.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'myapp.routers.PrimaryPinMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -51,15 +54,74 @@ TEMPLATES = [
     },
 ]
 
+# --- JINJA2 TEMPLATES ---
+# Optional second engine for the hot pages (index, transactions, profile):
+# their Jinja2 ports live in templates/jinja2/ (see myapp.jinja2). Compiled
+# templates are kept as bytecode in the cache dir.
+JINJA2_TEMPLATES = os.environ.get('JINJA2_TEMPLATES', 'False') == 'True'
+JINJA2_BYTECODE_CACHE_DIR = os.environ.get('JINJA2_BYTECODE_CACHE_DIR', os.path.join(BASE_DIR, '.jinja2_cache'))
+
+# Also used as is by `manage.py benchmark_templates` when the engine is off
+JINJA2_TEMPLATE_ENGINE = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'NAME': 'jinja2',
+    'DIRS': [os.path.join(BASE_DIR, 'templates', 'jinja2')],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'environment': 'myapp.jinja2.environment',
+        'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+    },
+}
+
+if JINJA2_TEMPLATES:
+    TEMPLATES.append(JINJA2_TEMPLATE_ENGINE)
+
 WSGI_APPLICATION = 'myproject.wsgi.application'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Seconds a writer waits for the database lock before "database is locked"
+            'timeout': float(os.environ.get('SQLITE_TIMEOUT', '5')),
+        },
     }
 }
 
+# --- READ REPLICA ---
+# Dashboards, reports and exports read from the `replica` alias when one is
+# configured (see myapp.routers). Locally a second SQLite file refreshed with
+# `manage.py sync_replica` stands in for it.
+DB_REPLICA_PATH = os.environ.get('DB_REPLICA_PATH')
+
+if DB_REPLICA_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DB_REPLICA_PATH,
+        # Tests read from the primary's test database
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['myapp.routers.ReplicaRouter']
+
+# Seconds a client reads from the primary after a write
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+# Fall back to the primary when the replica is further behind than this (seconds)
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', '10'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '5'))
+
+# --- BACKUPS ---
+# `manage.py backup` archives (see myapp.backups); only the newest BACKUP_KEEP are kept
+BACKUP_DIR = os.environ.get('BACKUP_DIR', os.path.join(BASE_DIR, 'backups'))
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '14'))
+# SQLite online backup: pages copied per step and the pause (seconds) that lets writers in between steps
+BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', '256'))
+BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', '0.05'))
+# Postgres dump / restore executables; point these at a stand-in to test without a server
+PG_DUMP = os.environ.get('PG_DUMP', 'pg_dump')
+PSQL = os.environ.get('PSQL', 'psql')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -91,9 +153,157 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# --- STATIC BUILD STAGE ---
+# Outside DEBUG, collectstatic minifies, bundles, hashes and pre-compresses the
+# static files (see myapp/staticfiles.py) and WhiteNoise serves the hashed
+# names with immutable cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'myapp.staticfiles.PipelineStaticFilesStorage'
+        ),
+    },
+}
+
+STATIC_MINIFY_PATTERNS = ['css/*.css', 'javascript/*.js']
+
+# Bundle name -> member files, concatenated in order
+STATIC_BUNDLES = {
+    'css/transaction.bundle.css': ['css/profile.css', 'css/transaction.css'],
+}
+
+# Image -> widths of the WebP variants to generate
+STATIC_RESPONSIVE_IMAGES = {
+    'img/poster.jpg': [480, 960, 1448],
+    'img/Church_fund_logo.png': [120, 250, 500],
+    'img/profile.png': [160, 320],
+}
+
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Square thumbnails (pixels) generated for every uploaded profile picture
+PROFILE_THUMBNAIL_SIZES = {
+    'sm': 64,
+    'md': 160,
+    'lg': 320,
+}
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', '2'))
+
+# Year-end giving statements (manage.py generate_statements)
+STATEMENTS_DIR = os.environ.get('STATEMENTS_DIR', os.path.join(BASE_DIR, 'statements'))
+STATEMENT_WORKERS = int(os.environ.get('STATEMENT_WORKERS', str(os.cpu_count() or 2)))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
+
+# --- CACHE ---
+# The cache is shared by every gunicorn worker: Redis when REDIS_URL is set,
+# otherwise a file-based cache on the local disk of the host.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'church_fund_cache')),
+        }
+    }
+
+# --- FORECASTING ---
+# Closed periods of history fitted by myapp.forecasting (monthly and weekly series)
+FORECAST_HISTORY_MONTHS = int(os.environ.get('FORECAST_HISTORY_MONTHS', '36'))
+FORECAST_HISTORY_WEEKS = int(os.environ.get('FORECAST_HISTORY_WEEKS', '156'))
+
+# --- AUDIT TRAIL ---
+# Audit entries are buffered per worker thread and written in batches of this size
+AUDIT_BUFFER_SIZE = int(os.environ.get('AUDIT_BUFFER_SIZE', '100'))
+
+# --- DJANGO ADMIN ---
+# Unfiltered ledger changelists count rows exactly only up to this many;
+# beyond it they show the planner's row estimate. Filtered lists are always
+# counted exactly.
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', '10000'))
+
+# --- LIVE DASHBOARD EVENTS ---
+# Server-sent events from the ASGI app (see myapp.events). The whole site runs
+# under ASGI (gunicorn -k uvicorn.workers.UvicornWorker) so open streams don't
+# hold sync workers; see myproject/asgi.py for what that costs sync views.
+LIVE_EVENTS_POLL_INTERVAL = float(os.environ.get('LIVE_EVENTS_POLL_INTERVAL', '0.5'))
+# Relaying events between workers needs Redis's atomic incr(); without it every
+# worker only reaches the dashboards connected to it
+LIVE_EVENTS_RELAY = os.environ.get('LIVE_EVENTS_RELAY', str(bool(REDIS_URL))) == 'True'
+LIVE_EVENTS_KEEPALIVE = 15
+LIVE_EVENTS_STREAM_SECONDS = 60 * 5
+
+# --- REQUEST PATH OPTIMIZATION ---
+# When enabled, sessions and messages live in signed cookies and the logged-in
+# Treasurer is served from the cache, so a typical request makes no database
+# queries before the view runs.
+FAST_REQUEST_PATH = os.environ.get('FAST_REQUEST_PATH', 'True') == 'True'
+
+# Seconds a cached Treasurer is trusted before it is reloaded.
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', '60'))
+
+if FAST_REQUEST_PATH:
+    SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+    AUTHENTICATION_BACKENDS = ['myapp.backends.CachedModelBackend']
+
+# --- LOGIN THROTTLING ---
+# Token buckets in front of login/register: (burst capacity, tokens refilled per
+# minute). Kept in the database (ThrottleBucket) so every worker shares them.
+AUTH_THROTTLE_IP_RATE = (20, 10)
+AUTH_THROTTLE_USERNAME_RATE = (5, 2)
+# Share of allowed attempts that also delete buckets which have refilled
+AUTH_THROTTLE_PRUNE_PROBABILITY = 0.01
+# Behind Render/Railway's proxy REMOTE_ADDR is the proxy, so read X-Forwarded-For
+AUTH_THROTTLE_TRUST_FORWARDED_FOR = os.environ.get('AUTH_THROTTLE_TRUST_FORWARDED_FOR', str(not DEBUG)) == 'True'
+# Proxies in front of the app; the client is the entry that many places from the right
+AUTH_THROTTLE_PROXY_HOPS = int(os.environ.get('AUTH_THROTTLE_PROXY_HOPS', '1'))
+
+# --- REQUEST PROFILER ---
+# Superusers can profile a single request by adding ?_profile=1 (cProfile) or
+# ?_profile=sample, or an X-Profile header. Results are kept in memory, per
+# worker process, and listed at /super-admin/profiles/ (see myapp.profiling).
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'True') == 'True'
+PROFILER_QUERY_PARAM = '_profile'
+PROFILER_RING_SIZE = int(os.environ.get('PROFILER_RING_SIZE', '50'))
+PROFILER_TOP_N = 30
+PROFILER_SAMPLE_INTERVAL = 0.001
+
+# --- FUND BALANCE SHARDS ---
+# With more than one shard, offerings add to one of N FundBalanceShard rows of
+# the fund instead of updating the hot Fund row; run compact_balances
+# periodically to fold them back (see myapp.balances). 1 turns sharding off.
+FUND_BALANCE_SHARDS = int(os.environ.get('FUND_BALANCE_SHARDS', '1'))
+# Seconds the combined balances are cached; every committed change drops them
+BALANCE_CACHE_TIMEOUT = int(os.environ.get('BALANCE_CACHE_TIMEOUT', '30'))
+
+# --- DATABASE MAINTENANCE ---
+# `manage.py dbmaintain --interval 900` keeps SQLite healthy (see myapp.maintenance):
+# statistics, incremental vacuum and WAL checkpoints, only inside the window
+# (local hours, start-end) and once nothing was recorded for DB_QUIET_SECONDS.
+# The web start command (Procfile, render.yaml, railway.json) launches it in the
+# background: the database file is on the web service's own disk, which a
+# separate worker service or cron job would not see.
+DB_MAINTENANCE_WINDOW = os.environ.get('DB_MAINTENANCE_WINDOW', '1-5')
+DB_QUIET_SECONDS = int(os.environ.get('DB_QUIET_SECONDS', '600'))
+# Free pages handed back per round, so one round never holds the write lock for long
+DB_VACUUM_PAGES = int(os.environ.get('DB_VACUUM_PAGES', '2000'))
+# Rows ANALYZE samples per index (PRAGMA analysis_limit); 0 reads everything
+DB_ANALYSIS_LIMIT = int(os.environ.get('DB_ANALYSIS_LIMIT', '1000'))
+# Days of maintenance snapshots kept for the health page's trends
+DB_HEALTH_KEEP_DAYS = int(os.environ.get('DB_HEALTH_KEEP_DAYS', '90'))
@@ -14,6 +14,9 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('transactions/', views.transactions_list_view, name='transactions_list'),
+    path('transactions/export.csv', views.transactions_csv_view, name='transactions_csv'),
+    path('reports/', views.reports_view, name='reports'),
+    path('reports/export.csv', views.reports_csv_view, name='reports_csv'),
 
     # FUNDS & TRANSACTION PATHS (Explicitly matching client-side calls)
     path('funds/quick-split/', views.quick_split_transaction, name='quick_split_transaction'),  
@@ -21,13 +24,26 @@ urlpatterns = [
     path('funds/transaction/', views.handle_transaction, name='handle_transaction'),          
     path('funds/create/', views.create_fund, name='create_fund'),
     path('funds/deposit/', views.deposit_to_funds, name='deposit_to_funds'),
+    path('funds/batch/', views.batch_entries_view, name='batch_entries'),
     path('funds/save_split/', views.save_default_split, name='save_default_split'),
+    path('funds/forecast/', views.fund_forecast_view, name='fund_forecast'),
+    path('funds/<int:pk>/ledger/', views.fund_ledger_view, name='fund_ledger'),
+    path('funds/<int:pk>/ledger.json', views.fund_ledger_json_view, name='fund_ledger_json'),
+    path('funds/timeseries.json', views.funds_timeseries_view, name='funds_timeseries'),
+    path('funds/<int:pk>/timeseries.json', views.fund_timeseries_view, name='fund_timeseries'),
+    path('funds/events/', views.fund_events_view, name='fund_events'),
     path('transactions/delete/<int:pk>/', views.delete_transaction_view, name='delete_transaction'),
     path('transactions/undo/<int:transaction_id>/', views.undo_transaction, name='undo_transaction'),
 
     path('super-admin/transactions/', views.admin_transactions_view, name='admin_transactions_dashboard'),
     path('super-admin/approve/<int:pk>/', views.approve_treasurer, name='approve_treasurer'),
+    path('super-admin/treasurers/', views.treasurer_directory_view, name='treasurer_directory'),
+    path('super-admin/treasurers/bulk/', views.treasurer_bulk_action_view, name='treasurer_bulk_action'),
+    path('super-admin/profiles/', views.profiles_view, name='profiles'),
+    path('super-admin/database/', views.database_health_view, name='database_health'),
+    path('super-admin/profiles/<str:profile_id>/', views.profile_detail_view, name='profile_detail'),
     path('super-admin/treasurer/<int:pk>/view/', views.admin_view_treasurer_profile, name='admin_view_treasurer_profile'),
+    path('super-admin/treasurer/<int:pk>/timeseries.json', views.treasurer_timeseries_view, name='treasurer_timeseries'),
     path('treasurers/<int:pk>/disable/', views.disable_treasurer_view, name='disable_treasurer'),
     path('treasurers/enable/<int:pk>/', views.enable_treasurer, name='enable_treasurer'),
     path('create-admin/', views.create_admin_view, name='create_admin'),
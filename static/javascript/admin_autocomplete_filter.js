@@ -0,0 +1,10 @@
+'use strict';
+// Applies an AutocompleteFilter (myapp/admin.py) as soon as a value is picked or cleared.
+// select2 fires jQuery events, so listen through django.jQuery.
+django.jQuery(document).on('change', 'select.autocomplete-filter', function() {
+    const params = new URLSearchParams(this.dataset.queryString);
+    if (this.value) {
+        params.set(this.dataset.lookupKwarg, this.value);
+    }
+    window.location.search = params.toString();
+});
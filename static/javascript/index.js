@@ -232,14 +232,146 @@ if (addFundForm) {
     });
 }
 
-// **QUICK SPLIT ADJUSTMENT**
-// 
-// The previous AJAX logic for quick split has been REMOVED here.
-// The form submission is now handled by the browser as a standard POST,
-// which directs the user to the Django view, which correctly returns a redirect 
-// after performing the single atomic transaction.
-// The code block starting with 'if (quickSplitBtn && offeringsInput)' is GONE.
-// 
+// --- OFFLINE ENTRY QUEUE ---
+// Offerings are queued in IndexedDB and submitted to /funds/batch/ in batches,
+// so a hall with poor connectivity can keep counting and fifty entries cost a
+// single request. Each entry has a client id; the server ignores repeats.
+// The database belongs to the browser, not the treasurer, so entries record
+// who queued them and only the logged-in treasurer's entries are sent.
+
+const ENTRY_DB_NAME = 'church-fund-entries';
+const ENTRY_STORE = 'entries';
+const ENTRY_USER_INDEX = 'user';
+const ENTRY_BATCH_SIZE = 50;
+const ENTRY_USER_ID = typeof CURRENT_USER_ID !== 'undefined' ? CURRENT_USER_ID : null;
+let entryFlushInProgress = false;
+
+function openEntryDb() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(ENTRY_DB_NAME, 2);
+        request.onupgradeneeded = event => {
+            const store = event.oldVersion < 1
+                ? request.result.createObjectStore(ENTRY_STORE, { keyPath: 'client_id' })
+                : request.transaction.objectStore(ENTRY_STORE);
+            if (event.oldVersion < 2) store.createIndex(ENTRY_USER_INDEX, 'user');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function entryStoreRequest(mode, action) {
+    return openEntryDb().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(ENTRY_STORE, mode);
+        const request = action(tx.objectStore(ENTRY_STORE));
+        tx.oncomplete = () => resolve(request ? request.result : undefined);
+        tx.onerror = () => reject(tx.error);
+    }));
+}
+
+function newClientId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+function updateEntryQueueStatus() {
+    const status = document.getElementById('entryQueueStatus');
+    if (!status || !window.indexedDB || ENTRY_USER_ID === null) return;
+    entryStoreRequest('readonly', store => store.index(ENTRY_USER_INDEX).count(ENTRY_USER_ID)).then(count => {
+        status.hidden = count === 0;
+        status.textContent = `${count} entr${count === 1 ? 'y' : 'ies'} waiting to sync${navigator.onLine ? '…' : ' (offline)'}`;
+    });
+}
+
+function queueEntry(entry) {
+    entry.client_id = newClientId();
+    entry.user = ENTRY_USER_ID;
+    entry.queued_at = Date.now();
+    return entryStoreRequest('readwrite', store => store.put(entry)).then(() => {
+        updateEntryQueueStatus();
+        flushEntries();
+    });
+}
+
+async function flushEntries() {
+    if (entryFlushInProgress || !navigator.onLine || !window.indexedDB || ENTRY_USER_ID === null) return;
+    entryFlushInProgress = true;
+    try {
+        while (true) {
+            const queued = await entryStoreRequest(
+                'readonly', store => store.index(ENTRY_USER_INDEX).getAll(ENTRY_USER_ID, ENTRY_BATCH_SIZE),
+            );
+            if (!queued.length) break;
+
+            const response = await fetch('/funds/batch/', {
+                method: 'POST',
+                headers: { 'X-CSRFToken': csrftoken, 'Content-Type': 'application/json' },
+                body: JSON.stringify({ entries: queued }),
+            });
+            const contentType = response.headers.get('Content-Type') || '';
+            if (!response.ok || !contentType.includes('application/json')) break; // keep them queued
+
+            const body = await response.json();
+            const failed = body.results.filter(result => result.status === 'error');
+            // Applied, duplicate and rejected entries are all final: drop them from the queue
+            await entryStoreRequest('readwrite', store => {
+                body.results.forEach(result => store.delete(result.client_id));
+            });
+
+            applyLiveBalances(body.balances);
+            if (failed.length) {
+                alert(`ERROR: ${failed.length} queued entr${failed.length === 1 ? 'y was' : 'ies were'} rejected:\n` +
+                      failed.map(result => `• ${result.message}`).join('\n'));
+            }
+        }
+    } catch (error) {
+        console.error('Entry sync failed; entries stay queued:', error);
+    } finally {
+        entryFlushInProgress = false;
+        updateEntryQueueStatus();
+    }
+}
+
+if (window.indexedDB && ENTRY_USER_ID !== null) {
+    window.addEventListener('online', flushEntries);
+    window.addEventListener('offline', updateEntryQueueStatus);
+    document.addEventListener('DOMContentLoaded', flushEntries);
+
+    const quickSplitForm = document.getElementById('quickSplitForm');
+    if (quickSplitForm && offeringsInput) {
+        quickSplitForm.addEventListener('submit', function (e) {
+            e.preventDefault();
+            const amount = parseFloat(offeringsInput.value);
+            if (isNaN(amount) || amount <= 0) {
+                alert('Total offering must be a positive amount.');
+                return;
+            }
+            queueEntry({ kind: 'quick', amount: amount.toFixed(2) });
+            quickSplitForm.reset();
+        });
+    }
+
+    if (editFundsForm) {
+        editFundsForm.addEventListener('submit', function (e) {
+            e.preventDefault();
+            const allocations = {};
+            editFundsForm.querySelectorAll('input[name^="fund_"]').forEach(input => {
+                const amount = parseFloat(input.value);
+                if (!isNaN(amount) && amount > 0) {
+                    allocations[input.name.split('_')[1]] = amount.toFixed(2);
+                }
+            });
+            if (!Object.keys(allocations).length) {
+                alert('Total offering must be a positive amount.');
+                return;
+            }
+            queueEntry({ kind: 'specific', allocations: allocations });
+            editFundsForm.reset();
+            if (editFundsModal) editFundsModal.style.display = 'none';
+        });
+    }
+}
+
 
 // Withdrawal Logic (Expense Transaction)
 const withdrawBtn = document.querySelector('.withdraw-btn');
@@ -257,6 +389,15 @@ if (withdrawBtn && fundSelect && withdrawAmountInput) {
             alert('Please select a fund and enter a valid amount.');
             return;
         }
+
+        // Offline: queue it; the balance is checked when the queue syncs
+        if (!navigator.onLine && window.indexedDB) {
+            queueEntry({ kind: 'withdrawal', fund: fundId, amount: amount.toFixed(2), description: description || 'Withdrawal/Expense' });
+            alert('You are offline. The withdrawal was queued and will be submitted when the connection returns.');
+            withdrawAmountInput.value = '';
+            withdrawReasonInput.value = '';
+            return;
+        }
         
         // DEBUG 8: Withdrawal data prepared
         console.log(`DEBUG 8: Preparing withdrawal for Fund ${fundId}. Amount: ${amount}`);
@@ -454,6 +595,58 @@ function filterChartData(fundLabel) {
     monthlyTrendChart.update();
 }
 
+// --- LIVE UPDATES (SERVER-SENT EVENTS) ---
+// One shared stream per dashboard instead of polling; the server sends a
+// balance snapshot on connect and after every committed transaction.
+
+function applyLiveBalances(balances) {
+    Object.entries(balances).forEach(([fundId, balance]) => {
+        const amountElement = document.querySelector(`.fund-card[data-fund-id="${fundId}"] .fund-amount span`);
+        if (amountElement) {
+            amountElement.textContent = formatMoney(balance);
+        }
+        if (typeof DYNAMIC_FUNDS_DATA !== 'undefined') {
+            const fundData = DYNAMIC_FUNDS_DATA.find(f => f.id == fundId);
+            if (fundData) {
+                fundData.balance = parseFloat(balance);
+            }
+        }
+    });
+    updateFundStatistics();
+}
+
+function applyLiveTransaction(delta) {
+    const list = document.querySelector('.recent-list');
+    if (!list || delta.deleted) return;
+
+    const isOffering = delta.type === 'OFFERING';
+    const label = delta.type.charAt(0) + delta.type.slice(1).toLowerCase();
+    const amount = Math.round(parseFloat(delta.amount)).toLocaleString('en-US');
+
+    const item = document.createElement('li');
+    item.className = `list-item transaction-${delta.type.toLowerCase()}`;
+    item.innerHTML = `
+        <div class="transaction-info">
+            <span class="list-type">${label.slice(0, 8)}</span>
+            <span class="list-amount">${isOffering ? '+' : '-'} ₱${amount}</span>
+        </div>`;
+    list.prepend(item);
+
+    while (list.children.length > 4) {
+        list.lastElementChild.remove();
+    }
+}
+
+function connectLiveUpdates() {
+    if (!window.EventSource || !document.querySelector('.funds-grid')) return;
+
+    const source = new EventSource('/funds/events/');
+    source.addEventListener('balances', event => applyLiveBalances(JSON.parse(event.data)));
+    source.addEventListener('transaction', event => applyLiveTransaction(JSON.parse(event.data)));
+}
+
+document.addEventListener('DOMContentLoaded', connectLiveUpdates);
+
 // --- CHART INITIALIZATION ---
 
 function initializeCharts() {